@@ -0,0 +1,256 @@
+# --- modular_analyzer/batch_runner.py ---
+"""Headless batch runs over many PDFs with one warm worker pool.
+
+Usage:
+    python -m modular_analyzer.batch_runner scans/ extra/Lindamood_0412.pdf
+    python -m modular_analyzer.batch_runner scans/ --fields ticket_number --resume
+
+Each PDF is matched to a vendor config by file name, like ``main`` does, but
+without dialogs or prompts; PDFs without a match are skipped with an error.
+Every page of every document goes into one task stream served by a single
+pool whose workers load the models once and hold the compiled layout of
+each vendor in the batch.  A document's outputs are written as soon as its
+last page comes back, and each page is journaled so ``--resume`` continues
+an interrupted batch.  A page that raises is journaled with a ``PAGE_ERROR``
+issue instead of stopping the other documents.
+"""
+
+import argparse
+import logging
+import os
+from collections import Counter
+from pathlib import Path
+
+from modular_analyzer.cpu_budget import AUTO_TUNE, ThroughputTuner, plan_cpu_budget
+from modular_analyzer.crop_memo import get_crop_memo
+from modular_analyzer.field_plan import compile_field_plan, log_field_plan
+from modular_analyzer.file_utils import (
+    is_dir_writable, list_yaml_configs, save_csv, save_entries_to_excel, zip_folder
+)
+from modular_analyzer.model_registry import prepare_onnx_models
+from modular_analyzer.orientation import plan_document_orientation
+from modular_analyzer.page_journal import PageJournal, journal_path
+from modular_analyzer.page_processor import (
+    ORIENTATION_METHOD, PRELOAD_MODELS, PROXY_DPI, WARMUP_MODELS, init_page_worker, process_page_safely
+)
+from modular_analyzer.pdf_utils import close_cached_document, get_page_count, imap_pages
+from modular_analyzer.reporting_utils import collect_summary_report
+from modular_analyzer.result_cache import PAGE_CACHE_ENABLED, PageResultCache, page_cache_key, run_fingerprint
+from modular_analyzer.types import DocumentRun, PageTask
+from modular_analyzer.vendor_layout import load_vendor_layout
+
+CONFIGS_DIR = "modular_analyzer/configs"
+OUTPUT_DIR = "output"
+
+
+def vendor_configs(configs_dir=CONFIGS_DIR):
+    return [f for f in list_yaml_configs(configs_dir) if f.lower() != "ocr_config.yaml"]
+
+
+def match_vendor(structured_name, yaml_files, configs_dir=CONFIGS_DIR):
+    """
+    Return ``(vendor, yaml_path)`` for the first vendor config whose name appears
+    in the PDF name, or ``(None, None)``.
+    """
+    for yaml_file in yaml_files:
+        base = os.path.splitext(yaml_file)[0]
+        if base.lower() in structured_name.lower():
+            return base, os.path.join(configs_dir, yaml_file)
+    return None, None
+
+
+def page_key(pdf_path, page_idx):
+    return os.path.abspath(pdf_path), page_idx
+
+
+def write_outputs(results, output_dir, structured_name):
+    """Write the Excel/CSV reports, summary and zip for a run's page results (in page order)."""
+    entries = [r["entry"] for r in results]
+    ticket_issues = [(r["entry"].get("Page"), r["ticket_issue"]) for r in results if r["ticket_issue"]]
+    thumbnails = [thumb for r in results for thumb in r["thumbnails"]]
+    timings = [r["timing"] for r in results]
+
+    save_entries_to_excel(entries, output_dir, structured_name)
+    save_csv(ticket_issues, columns=["Page", "Issue"],
+             filepath=os.path.join(output_dir, "ticket_issues.csv"))
+    save_csv(thumbnails, columns=["Page", "Field", "ThumbnailPath"],
+             filepath=os.path.join(output_dir, "thumbnail_index.csv"))
+    save_csv(timings, columns=["Page", "DurationSeconds"],
+             filepath=os.path.join(output_dir, "process_analysis.csv"))
+
+    collect_summary_report(output_dir, entries)
+    zip_folder(os.path.join(output_dir, "valid"), os.path.join(output_dir, "valid_pages.zip"))
+
+
+def collect_pdfs(paths):
+    """Expand directories to the PDFs directly inside them (sorted); keep files as given."""
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdfs += sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(".pdf"))
+        elif path.lower().endswith(".pdf") and os.path.isfile(path):
+            pdfs.append(path)
+        else:
+            logging.warning(f"⚠️ Skipping {path}: not a PDF or directory")
+    return list(dict.fromkeys(pdfs))
+
+
+def compile_vendor(vendor, yaml_path, only_fields=None):
+    """
+    Load the vendor's compiled layout and build its field plan.
+    :return: ``(layout, plan, fingerprint)``, or None when the vendor has no templates
+             or none of ``only_fields`` exist for it.
+    """
+    layout = load_vendor_layout(vendor, yaml_path)
+    if not layout.template_paths:
+        logging.error(f"🛑 No templates for vendor '{vendor}'; skipping its PDFs.")
+        return None
+    try:
+        plan = compile_field_plan(layout.fields, vendor, only_fields=only_fields)
+    except ValueError as e:
+        logging.error(f"🛑 {e}; skipping its PDFs.")
+        return None
+    log_field_plan(plan)
+    return layout, plan, run_fingerprint(layout, plan)
+
+
+def prepare_document(pdf_path, vendor, fingerprint, output_root=OUTPUT_DIR, resume=False, plan=None):
+    """
+    Plan orientation, open the page journal and build the tasks for one PDF.
+    ``plan`` is attached to every task when it differs from the one the workers hold.
+    :return: ``(DocumentRun, tasks)`` where ``tasks`` covers the pages not yet journaled.
+    """
+    name = Path(pdf_path).stem
+    output_dir = os.path.join(output_root, vendor, name)
+    os.makedirs(output_dir, exist_ok=True)
+    page_count = get_page_count(pdf_path)
+    rotations = plan_document_orientation(pdf_path, method=ORIENTATION_METHOD, proxy_dpi=PROXY_DPI)
+    journal = PageJournal(journal_path(output_dir), pdf_path, page_count, fingerprint, resume=resume)
+    doc = DocumentRun(pdf_path=pdf_path, name=name, vendor=vendor, output_dir=output_dir,
+                      page_count=page_count, journal=journal, remaining=page_count - len(journal.pages))
+    tasks = [
+        PageTask(page_idx=idx, img=None, fields={}, output_dir=output_dir, vendor=vendor,
+                 date="20250101", pdf_path=pdf_path, rotation=rotations[idx], plan=plan)
+        for idx in range(page_count)
+        if idx not in journal.pages
+    ]
+    logging.info(f"🗂️ Queued {doc.remaining} of {page_count} pages from {name} ({vendor})")
+    return doc, tasks
+
+
+def finish_document(doc):
+    doc.journal.close()
+    write_outputs(doc.journal.results(), doc.output_dir, doc.name)
+    logging.info(f"📦 Outputs written for {doc.name} ({doc.page_count} pages) in {doc.output_dir}")
+
+
+def run_batch(pdf_paths, only_fields=None, resume=False, configs_dir=CONFIGS_DIR, output_root=OUTPUT_DIR):
+    """
+    Process every PDF in ``pdf_paths`` through one pool.
+    :return: List of ``DocumentRun`` for the documents that were processed.
+    """
+    yaml_files = vendor_configs(configs_dir)
+    layouts, docs, tasks = {}, [], []
+    for pdf_path in pdf_paths:
+        name = Path(pdf_path).stem
+        vendor, yaml_path = match_vendor(name, yaml_files, configs_dir)
+        if not vendor:
+            logging.error(f"🛑 No vendor config matches {pdf_path}; skipping.")
+            continue
+        if vendor not in layouts:
+            layouts[vendor] = compile_vendor(vendor, yaml_path, only_fields)
+        if layouts[vendor] is None:
+            continue
+        doc, doc_tasks = prepare_document(pdf_path, vendor, layouts[vendor][2], output_root, resume)
+        docs.append(doc)
+        tasks += [(doc, task) for task in doc_tasks]
+    close_cached_document()
+
+    for doc in docs:
+        if doc.remaining == 0:
+            finish_document(doc)  # everything was journaled by an earlier run
+    if not tasks:
+        return docs
+
+    layouts = {vendor: entry for vendor, entry in layouts.items() if entry is not None}
+    fingerprints = {vendor: fingerprint for vendor, (_, _, fingerprint) in layouts.items()}
+    pending = {page_key(task.pdf_path, task.page_idx): doc for doc, task in tasks}
+    prepare_onnx_models(PRELOAD_MODELS)
+    budget = plan_cpu_budget()
+    cache = PageResultCache() if PAGE_CACHE_ENABLED else None
+    model_loads = Counter()
+    failed = 0
+    try:
+        results = imap_pages(
+            [task for _, task in tasks], process_page_safely,
+            initializer=init_page_worker,
+            initargs=(PRELOAD_MODELS, WARMUP_MODELS, budget.threads, None, None,
+                      [(layout, plan) for layout, plan, _ in layouts.values()]),
+            budget=budget, tuner=ThroughputTuner(budget) if AUTO_TUNE else None,
+            cache=cache, cache_key=lambda task: page_cache_key(task, fingerprints[task.vendor]),
+        )
+        # Match each result to its page by identity, not position, so a missing result cannot shift the rest.
+        for result in results:
+            doc = pending.pop(page_key(result["pdf_path"], result["page_idx"]), None)
+            if doc is None:
+                logging.warning(f"⚠️ Ignoring unexpected result for page {result['page_idx'] + 1} "
+                                f"of {result['pdf_path']}")
+                continue
+            if result.get("error"):
+                failed += 1
+                logging.error(f"❌ Page {result['page_idx'] + 1} of {doc.name} failed: {result['error']}")
+            doc.journal.append(result["page_idx"], result)
+            model_loads.update(result.get("model_loads", {}))
+            doc.remaining -= 1
+            if doc.remaining == 0:
+                finish_document(doc)
+    finally:
+        for doc in docs:
+            doc.journal.close()
+        if cache is not None:
+            cache.close()
+    for doc in {id(doc): doc for doc in pending.values()}.values():
+        logging.error(f"❌ {doc.remaining} page(s) of {doc.name} returned no result; writing what was processed.")
+        finish_document(doc)
+    if failed:
+        logging.error(f"❌ {failed} page(s) failed this batch; see the page issues in each report.")
+    crop_memo = get_crop_memo()
+    if crop_memo is not None:
+        crop_memo.evict()
+    logging.info(f"🧠 Model loads this batch: {dict(model_loads)}")
+    return docs
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze many ticket PDFs without prompts")
+    parser.add_argument("paths", nargs="+", help="PDF files and/or directories of PDFs")
+    parser.add_argument(
+        "--fields", nargs="+", metavar="FIELD",
+        help="Only process these fields (e.g. ticket_number) for a fast reconciliation run"
+    )
+    parser.add_argument("--resume", action="store_true", help="Skip pages already journaled by an earlier run")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Output root (default: output)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from modular_analyzer.logger_utils import setup_logger
+
+    setup_logger()
+    args = parse_args(argv)
+    os.makedirs(args.output, exist_ok=True)
+    if not is_dir_writable(args.output):
+        logging.error(f"Output directory not writable: {args.output}")
+        return 1
+    pdfs = collect_pdfs(args.paths)
+    if not pdfs:
+        logging.error("No PDFs to process.")
+        return 1
+    logging.info(f"🚚 Batch of {len(pdfs)} PDF(s)")
+    docs = run_batch(pdfs, only_fields=args.fields, resume=args.resume, output_root=args.output)
+    logging.info(f"Batch complete: {len(docs)} of {len(pdfs)} PDF(s) processed.")
+    return 0 if len(docs) == len(pdfs) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,9 @@
+# --- modular_analyzer/config.py ---
+
+import os
+
+from modular_analyzer.file_utils import load_yaml
+
+# Load OCR configuration
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "configs", "ocr_config.yaml")
+OCR_CONFIG = (load_yaml(CONFIG_PATH) or {}) if os.path.exists(CONFIG_PATH) else {}
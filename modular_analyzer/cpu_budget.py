@@ -0,0 +1,144 @@
+# --- modular_analyzer/cpu_budget.py ---
+"""Divide a core budget between pool workers and the libraries inside them.
+
+Every worker runs torch (DocTR), ONNX Runtime and OpenCV, and each library
+would otherwise start a thread pool as wide as the machine.  The budget
+splits ``cores`` into ``workers x threads`` and ``apply_thread_limits`` pins
+each library to ``threads`` inside a worker.  With ``auto_tune`` the number
+of pages in flight is chosen from throughput measured on the first pages.
+"""
+
+import logging
+import os
+import time
+
+from modular_analyzer.config import OCR_CONFIG
+from modular_analyzer.types import CpuBudget
+
+CPU_CONFIG = OCR_CONFIG.get("cpu_budget") or {}
+BUDGET_CORES = CPU_CONFIG.get("cores")  # None: every core this process may run on
+BUDGET_WORKERS = CPU_CONFIG.get("workers")  # None: cores // threads_per_worker
+THREADS_PER_WORKER = CPU_CONFIG.get("threads_per_worker")  # None: cores // workers, or 1 without workers
+MAX_WORKERS = CPU_CONFIG.get("max_workers")
+AUTO_TUNE = CPU_CONFIG.get("auto_tune", False)
+TUNE_PAGES = CPU_CONFIG.get("tune_pages", 4)
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+_applied_threads = None
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_cpu_budget(cores=None, workers=None, threads=None, max_workers=None):
+    """
+    Split ``cores`` into ``workers x threads``.
+    Explicit ``workers`` wins; otherwise it is derived from ``threads``.  With
+    ``workers`` alone each worker gets ``cores // workers`` threads; when both
+    are set, ``threads`` is capped so the product stays within budget.
+    """
+    cores = max(1, int(cores or BUDGET_CORES or available_cores()))
+    workers = workers or BUDGET_WORKERS
+    threads = threads or THREADS_PER_WORKER
+    max_workers = max_workers or MAX_WORKERS
+
+    if workers:
+        workers = max(1, min(int(workers), cores))
+        threads = max(1, min(int(threads or cores // workers), cores // workers))
+    else:
+        threads = max(1, min(int(threads or 1), cores))
+        workers = max(1, cores // threads)
+    if max_workers:
+        workers = max(1, min(workers, int(max_workers)))
+
+    budget = CpuBudget(cores=cores, workers=workers, threads=threads)
+    logging.info(f"⚙️ CPU budget: {cores} cores -> {workers} workers x {threads} threads")
+    return budget
+
+
+def apply_thread_limits(threads):
+    """Pin torch, OpenCV, ONNX Runtime and BLAS/OpenMP pools in this process to ``threads``."""
+    global _applied_threads
+    if not threads or threads == _applied_threads:
+        return
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads)  # honoured by libraries not initialized yet
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        if _applied_threads is None:
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass  # only settable before torch starts parallel work
+    except ImportError:
+        pass
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except ImportError:
+        pass
+
+    from modular_analyzer.onnx_sessions import set_thread_budget
+    set_thread_budget(threads)
+    _applied_threads = threads
+
+
+def run_with_threads(processor, threads, task):
+    """Pool entry point: apply the current thread split, then process ``task``."""
+    apply_thread_limits(threads)
+    return processor(task)
+
+
+class ThroughputTuner:
+    """
+    Choose how many pages are in flight from measured throughput.
+    Each candidate concurrency runs for ``tune_pages`` completed pages; the
+    fastest is kept for the rest of the run.  The per-worker thread split is
+    left alone: ONNX Runtime sessions keep the threads they were created with.
+    """
+
+    def __init__(self, budget, tune_pages=TUNE_PAGES, candidates=None):
+        self.budget = budget
+        self.tune_pages = max(1, tune_pages)
+        if candidates is None:
+            candidates = sorted({max(1, budget.workers // d) for d in (1, 2, 4)}, reverse=True)
+        self.candidates = list(candidates)
+        self.rates = {}
+        self._index = 0
+        self._done = 0
+        self._started = None
+        self.limit = self.candidates[0]
+
+    @property
+    def tuning(self):
+        return self._index < len(self.candidates)
+
+    def record(self, now=None):
+        """Call once per completed page."""
+        if not self.tuning:
+            return
+        now = time.perf_counter() if now is None else now
+        if self._started is None:
+            self._started = now
+            return  # the first completion only marks the start of the window
+        self._done += 1
+        if self._done < self.tune_pages:
+            return
+
+        elapsed = max(now - self._started, 1e-9)
+        self.rates[self.limit] = self._done / elapsed
+        logging.info(f"⏱️ {self.limit} pages in flight: {self.rates[self.limit]:.2f} pages/s")
+        self._index += 1
+        self._done = 0
+        self._started = now
+        if self.tuning:
+            self.limit = self.candidates[self._index]
+        else:
+            self.limit = max(self.rates, key=self.rates.get)
+            logging.info(f"⚙️ Auto-tuned to {self.limit} pages in flight")
@@ -0,0 +1,180 @@
+# --- modular_analyzer/crop_memo.py ---
+"""Reuse OCR results for crops whose content never changes.
+
+Fields such as a vendor logo, its address or a pre-printed header look the
+same on every ticket.  For fields marked ``static_content: true`` (or listed
+in ``crop_memo.fields``) a difference hash of the crop is computed before
+OCR; when a crop within ``max_distance`` bits of an earlier one was already
+recognized, its text is returned instead of running an engine again.
+
+Each process keeps an LRU of recent hashes per field in front of a SQLite
+file that every pool worker, and every later run, reads and writes.  Entries
+are scoped by vendor, field config and engine config, so editing either one
+starts from an empty memo for that field.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+from modular_analyzer.config import OCR_CONFIG
+
+CROP_MEMO_CONFIG = OCR_CONFIG.get("crop_memo") or {}
+CROP_MEMO_ENABLED = CROP_MEMO_CONFIG.get("enabled", True)
+CROP_MEMO_PATH = CROP_MEMO_CONFIG.get("path", os.path.join("output", "cache", "crop_memo.sqlite"))
+STATIC_FIELDS = CROP_MEMO_CONFIG.get("fields", ["logo", "address"])
+HASH_SIZE = CROP_MEMO_CONFIG.get("hash_size", 16)
+MAX_DISTANCE = CROP_MEMO_CONFIG.get("max_distance", 4)
+LRU_SIZE = CROP_MEMO_CONFIG.get("lru_size", 32)  # hashes kept in memory per field
+MAX_ENTRIES = CROP_MEMO_CONFIG.get("max_entries", 20000)
+# Brightness steps smaller than this count as flat, so scanner noise on blank paper does not flip bits.
+MIN_GRADIENT = CROP_MEMO_CONFIG.get("min_gradient", 2)
+
+_memo = {"instance": None}
+
+
+def crop_hash(region_array, hash_size=HASH_SIZE):
+    """
+    Difference hash of a crop: compare neighbouring pixels of a
+    ``(hash_size + 1) x hash_size`` grayscale thumbnail.
+    :return: Hash as an int of ``hash_size * hash_size`` bits.
+    """
+    import cv2
+    import numpy as np
+
+    gray = cv2.cvtColor(region_array, cv2.COLOR_RGB2GRAY) if region_array.ndim == 3 else region_array
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] - small[:, :-1] > MIN_GRADIENT).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")  # int.bit_count() needs Python 3.10
+
+
+def memo_scope(vendor, field_plan):
+    """Identify the field and everything that decides its OCR result."""
+    parts = [
+        vendor,
+        field_plan.name,
+        json.dumps(field_plan.conf, sort_keys=True, default=str),
+        field_plan.engine,
+        field_plan.printed_backend,
+        field_plan.decoder,
+        json.dumps(OCR_CONFIG, sort_keys=True, default=str),
+        HASH_SIZE,
+    ]
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class CropMemo:
+    """``(scope, crop hash) -> (engine, text, confidence)`` with near-duplicate lookup."""
+
+    def __init__(self, path=CROP_MEMO_PATH, max_distance=MAX_DISTANCE, lru_size=LRU_SIZE,
+                 max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_distance = max_distance
+        self.lru_size = lru_size
+        self.max_entries = max_entries
+        self._lru = {}  # scope -> OrderedDict(hash -> (engine, text, confidence))
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # workers read while another one writes
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS crop_memo ("
+            " scope TEXT NOT NULL, hash TEXT NOT NULL, engine TEXT NOT NULL, text TEXT NOT NULL,"
+            " confidence REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (scope, hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_crop_memo_last_used ON crop_memo (last_used)")
+        self._conn.commit()
+
+    def _nearest(self, entries, crop_hash_value):
+        best = None
+        for known, value in entries.items():
+            distance = hamming(known, crop_hash_value)
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, known, value)
+                if distance == 0:
+                    break
+        return best
+
+    def _remember(self, scope, crop_hash_value, value):
+        entries = self._lru.setdefault(scope, OrderedDict())
+        entries[crop_hash_value] = value
+        entries.move_to_end(crop_hash_value)
+        while len(entries) > self.lru_size:
+            entries.popitem(last=False)
+
+    def _load_scope(self, scope):
+        rows = self._conn.execute(
+            "SELECT hash, engine, text, confidence FROM crop_memo WHERE scope = ? ORDER BY last_used DESC LIMIT ?",
+            (scope, self.lru_size),
+        ).fetchall()
+        entries = OrderedDict((int(h, 16), (engine, text, conf)) for h, engine, text, conf in reversed(rows))
+        self._lru[scope] = entries
+        return entries
+
+    def lookup(self, scope, crop_hash_value):
+        """
+        Return ``(engine, text, confidence)`` for a near-identical crop, or None.
+        On a local miss the scope is reloaded from SQLite to pick up what other
+        workers recognized since.
+        """
+        found = self._nearest(self._lru.get(scope, {}), crop_hash_value)
+        if found is None:
+            found = self._nearest(self._load_scope(scope), crop_hash_value)
+        if found is None:
+            return None
+        _, known, value = found
+        self._remember(scope, known, value)
+        self._conn.execute("UPDATE crop_memo SET last_used = ? WHERE scope = ? AND hash = ?",
+                           (time.time(), scope, format(known, "x")))
+        self._conn.commit()
+        return value
+
+    def store(self, scope, crop_hash_value, engine, text, confidence):
+        value = (engine, text, float(confidence))
+        self._remember(scope, crop_hash_value, value)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO crop_memo (scope, hash, engine, text, confidence, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (scope, format(crop_hash_value, "x"), *value, time.time()),
+        )
+        self._conn.commit()
+
+    def evict(self):
+        """Drop the least recently used rows beyond ``max_entries``."""
+        if not self.max_entries:
+            return 0
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM crop_memo").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM crop_memo WHERE rowid IN (SELECT rowid FROM crop_memo ORDER BY last_used, rowid LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+        logging.info(f"🧹 Evicted {excess} memoized crops")
+        return excess
+
+    def close(self):
+        self._conn.close()
+
+
+def get_crop_memo():
+    """This process's ``CropMemo``, or None when the memo is disabled or unavailable."""
+    if not CROP_MEMO_ENABLED:
+        return None
+    if _memo["instance"] is None:
+        try:
+            _memo["instance"] = CropMemo()
+        except sqlite3.Error as e:
+            logging.warning(f"⚠️ Crop memo unavailable ({CROP_MEMO_PATH}): {e}")
+            return None
+    return _memo["instance"]
@@ -0,0 +1,118 @@
+# --- modular_analyzer/ctc_decoding.py ---
+"""CTC decoding for the handwriting ICR model.
+
+The model emits ``(N, T, C)`` scores over ``ALPHABET`` plus one blank class.
+``greedy_decode`` handles a whole batch with array operations (argmax,
+collapse repeats, drop blanks).  ``beam_decode`` runs a prefix beam search of
+bounded width for fields where the extra accuracy is worth the cost.  Both
+return ``(text, char_confidences)`` per row.
+"""
+
+import string
+
+import numpy as np
+
+from modular_analyzer.config import OCR_CONFIG
+
+CTC_CONFIG = OCR_CONFIG.get("ctc_decoding") or {}
+ALPHABET = CTC_CONFIG.get("alphabet", string.ascii_uppercase + string.digits + "-")
+DECODER = CTC_CONFIG.get("decoder", "greedy")
+BEAM_WIDTH = CTC_CONFIG.get("beam_width", 8)
+DECODERS = ("greedy", "beam")
+
+
+def to_probabilities(preds):
+    """Return ``preds`` as per-timestep probabilities, applying softmax to raw logits."""
+    preds = np.asarray(preds, dtype=np.float32)
+    if preds.min() >= 0 and np.allclose(preds.sum(axis=-1), 1.0, atol=1e-3):
+        return preds
+    shifted = preds - preds.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def greedy_decode(preds, alphabet=ALPHABET, blank=None):
+    """
+    Best-path decode every row of ``preds`` (``(N, T, C)``) at once.
+    :return: List of ``(text, char_confidences)``; a character's confidence is
+             the probability of the timestep that emitted it.
+    """
+    probs = to_probabilities(preds)
+    if probs.shape[0] == 0:
+        return []
+    blank = len(alphabet) if blank is None else blank
+    best = probs.argmax(axis=2)
+    best_prob = np.take_along_axis(probs, best[..., None], axis=2)[..., 0]
+
+    prev = np.concatenate([np.full((best.shape[0], 1), blank), best[:, :-1]], axis=1)
+    keep = (best != prev) & (best != blank) & (best < len(alphabet))
+
+    chars = np.array(list(alphabet))[best[keep]]
+    confs = best_prob[keep]
+    bounds = np.cumsum(keep.sum(axis=1))[:-1]
+    return [
+        ("".join(row_chars), row_confs.tolist())
+        for row_chars, row_confs in zip(np.split(chars, bounds), np.split(confs, bounds))
+    ]
+
+
+def _beam_decode_row(log_probs, alphabet, blank, beam_width):
+    # Each beam: prefix -> (log P ending in blank, log P ending in non-blank, char confidences)
+    neg_inf = -np.inf
+    beams = {(): (0.0, neg_inf, ())}
+    num_chars = len(alphabet)
+    top_k = min(beam_width, log_probs.shape[1])
+
+    for step in log_probs:
+        candidates = [c for c in np.argpartition(step, -top_k)[-top_k:] if c == blank or c < num_chars]
+        next_beams = {}
+
+        def add(prefix, p_blank, p_char, confs):
+            old_blank, old_char, old_confs = next_beams.get(prefix, (neg_inf, neg_inf, confs))
+            next_beams[prefix] = (np.logaddexp(old_blank, p_blank), np.logaddexp(old_char, p_char), old_confs)
+
+        for prefix, (p_blank, p_char, confs) in beams.items():
+            total = np.logaddexp(p_blank, p_char)
+            for c in candidates:
+                p = step[c]
+                if c == blank:
+                    add(prefix, total + p, neg_inf, confs)
+                    continue
+                extended = prefix + (c,)
+                conf = confs + (float(np.exp(p)),)
+                if prefix and prefix[-1] == c:
+                    # A repeat only extends the prefix after a blank separates it.
+                    add(extended, neg_inf, p_blank + p, conf)
+                    add(prefix, neg_inf, p_char + p, confs)
+                else:
+                    add(extended, neg_inf, total + p, conf)
+
+        beams = dict(sorted(next_beams.items(), key=lambda kv: -np.logaddexp(kv[1][0], kv[1][1]))[:beam_width])
+
+    prefix, (_, _, confs) = max(beams.items(), key=lambda kv: np.logaddexp(kv[1][0], kv[1][1]))
+    return "".join(alphabet[c] for c in prefix), list(confs)
+
+
+def beam_decode(preds, alphabet=ALPHABET, blank=None, beam_width=BEAM_WIDTH):
+    """
+    CTC prefix beam search keeping at most ``beam_width`` prefixes and trying
+    only the ``beam_width`` most likely classes per timestep.
+    :return: List of ``(text, char_confidences)``, one per row of ``preds``.
+    """
+    blank = len(alphabet) if blank is None else blank
+    log_probs = np.log(np.clip(to_probabilities(preds), 1e-12, 1.0))
+    return [_beam_decode_row(row, alphabet, blank, max(1, beam_width)) for row in log_probs]
+
+
+def decode(preds, decoder=DECODER, beam_width=BEAM_WIDTH, alphabet=ALPHABET):
+    """Decode a batch with the named decoder (``greedy`` or ``beam``)."""
+    if decoder == "beam":
+        return beam_decode(preds, alphabet=alphabet, beam_width=beam_width)
+    if decoder != "greedy":
+        raise ValueError(f"Unknown CTC decoder '{decoder}'. Expected one of {DECODERS}")
+    return greedy_decode(preds, alphabet=alphabet)
+
+
+def text_confidence(char_confidences):
+    """Mean character confidence, or 0.0 for an empty decode."""
+    return float(np.mean(char_confidences)) if len(char_confidences) else 0.0
@@ -0,0 +1,146 @@
+# --- modular_analyzer/engines.py ---
+"""OCR engine strategies for field crops.
+
+Every OCR'd field gets an ordered list of engines to try.  The pipeline runs
+in rounds: each pending field asks for its next engine, requests are grouped
+per engine and run in batches, and a field is done as soon as an engine
+returns text.  Results are memoized per crop, so an engine never runs twice
+on the same crop regardless of how many decisions need its output.
+"""
+
+import logging
+
+from modular_analyzer.ctc_decoding import decode, text_confidence
+from modular_analyzer.handwriting import run_onnx_batch
+from modular_analyzer.image_preprocessing import TensorBuffer, preprocess_batch_for_onnx, to_onnx_gray
+from modular_analyzer.model_registry import get_model
+from modular_analyzer.ocr_utils import read_text_batch
+from modular_analyzer.types import EngineResult
+
+PRINTED = "printed"
+HANDWRITING = "handwriting"
+
+_handwriting_buffer = TensorBuffer((1, 32, 128))
+
+
+def field_strategy(field_plan, handwriting_score=0.0, threshold=0.5, use_onnx_fallback=True):
+    """Return the engines to try for a field, in order."""
+    if field_plan.engine == PRINTED:
+        return [PRINTED]
+    if field_plan.engine == HANDWRITING or handwriting_score >= threshold:
+        return [HANDWRITING, PRINTED]
+    return [PRINTED, HANDWRITING] if use_onnx_fallback else [PRINTED]
+
+
+class CropResultMemo:
+    """Engine results keyed by (crop key, engine)."""
+
+    def __init__(self):
+        self._results = {}
+
+    def has(self, key, engine):
+        return (key, engine) in self._results
+
+    def get(self, key, engine):
+        return self._results.get((key, engine))
+
+    def put(self, key, engine, result):
+        self._results[(key, engine)] = result
+
+    def results_for(self, key):
+        return {engine: result for (k, engine), result in self._results.items() if k == key}
+
+
+def _run_printed(crops, plans):
+    by_backend = {}
+    for key in crops:
+        by_backend.setdefault(plans[key].printed_backend, []).append(key)
+
+    results = {}
+    for backend, keys in by_backend.items():
+        try:
+            texts = read_text_batch({key: crops[key] for key in keys}, backend=backend)
+            for key in keys:
+                results[key] = EngineResult(*texts[key])
+        except Exception as e:
+            logging.error(f"❌ Batched {backend} OCR failed for {keys}: {e}")
+            for key in keys:
+                results[key] = EngineResult("", 0.0, error=str(e))
+    return results
+
+
+def _run_handwriting(crops, plans):
+    results = {}
+    grays = {}
+    for key, region_array in crops.items():
+        try:
+            grays[key] = to_onnx_gray(region_array)
+        except ValueError as e:
+            logging.error(f"❌ ONNX handwriting OCR failed for {key}: {e}")
+            results[key] = EngineResult("", 0.0, error=str(e))
+    if not grays:
+        return results
+
+    keys = list(grays)
+    try:
+        batch = preprocess_batch_for_onnx(list(grays.values()), out=_handwriting_buffer.take(len(keys)))
+        preds = run_onnx_batch(get_model("onnxruntime"), batch)
+    except Exception as e:
+        logging.error(f"❌ Batched ONNX handwriting OCR failed for {keys}: {e}")
+        results.update({key: EngineResult("", 0.0, error=str(e)) for key in keys})
+        return results
+
+    rows_by_decoder = {}
+    for i, key in enumerate(keys):
+        decoder = plans[key].decoder if key in plans else "greedy"
+        rows_by_decoder.setdefault(decoder, []).append(i)
+    for decoder, rows in rows_by_decoder.items():
+        for i, (text, char_confidences) in zip(rows, decode(preds[rows], decoder=decoder)):
+            results[keys[i]] = EngineResult(text, text_confidence(char_confidences))
+    return results
+
+
+ENGINE_RUNNERS = {
+    PRINTED: _run_printed,
+    HANDWRITING: _run_handwriting,
+}
+
+
+def run_strategies(crops, strategies, plans, memo=None):
+    """
+    Run each crop through its strategy until an engine returns text.
+    :param crops: Mapping of key -> ``np.ndarray`` crop.
+    :param strategies: Mapping of key -> list of engine names.
+    :param plans: Mapping of key -> ``FieldPlan``.
+    :return: ``(accepted, memo)`` where ``accepted`` maps each resolved key to
+             ``(engine, EngineResult)`` and ``memo`` holds every engine result.
+    """
+    memo = memo or CropResultMemo()
+    position = {key: 0 for key in strategies}
+    pending = [key for key in strategies if strategies[key]]
+    accepted = {}
+
+    while pending:
+        requests = {}
+        for key in pending:
+            engine = strategies[key][position[key]]
+            if not memo.has(key, engine):
+                requests.setdefault(engine, {})[key] = crops[key]
+
+        for engine, engine_crops in requests.items():
+            for key, result in ENGINE_RUNNERS[engine](engine_crops, plans).items():
+                memo.put(key, engine, result)
+
+        still_pending = []
+        for key in pending:
+            engine = strategies[key][position[key]]
+            result = memo.get(key, engine)
+            if result.text:
+                accepted[key] = (engine, result)
+                continue
+            position[key] += 1
+            if position[key] < len(strategies[key]):
+                still_pending.append(key)
+        pending = still_pending
+
+    return accepted, memo
@@ -0,0 +1,108 @@
+# --- modular_analyzer/field_plan.py ---
+"""Compile a vendor's field config into a per-field execution plan.
+
+The plan is built once per run and decides, for every field, whether it is
+OCR'd, only cropped for review, or skipped entirely, and which engine reads
+it.  It is driven by the ``export_to_excel`` and ``ocr_instruction`` keys of
+the vendor YAML, with optional ``ocr_engine`` overrides per field.
+"""
+
+import logging
+
+from modular_analyzer.config import OCR_CONFIG
+from modular_analyzer.crop_memo import STATIC_FIELDS
+from modular_analyzer.ctc_decoding import DECODER, DECODERS
+from modular_analyzer.types import FieldPlan
+
+PRINTED_BACKEND = OCR_CONFIG.get("printed_backend", "doctr")
+VENDOR_BACKENDS = OCR_CONFIG.get("vendor_backends") or {}
+ENGINES = ("auto", "printed", "handwriting")
+
+
+def simplify_field_name(field_name: str) -> str:
+    return field_name.split(".")[-1]
+
+
+def resolve_printed_backend(vendor: str, field_name: str) -> str:
+    """Return the printed-text backend for a field, honoring vendor/field overrides."""
+    override = VENDOR_BACKENDS.get(vendor) or {}
+    field_overrides = override.get("fields") or {}
+    short_name = simplify_field_name(field_name)
+    return field_overrides.get(short_name) or override.get("backend") or PRINTED_BACKEND
+
+
+def _field_action(field_conf: dict) -> str:
+    if field_conf.get("ocr_engine") == "none":
+        return "skip"
+    if field_conf.get("export_to_excel", True):
+        return "ocr"
+    # Not exported: keep the crop for review only if the YAML asks for something.
+    return "crop" if field_conf.get("ocr_instruction") else "skip"
+
+
+def _field_engine(field_name: str, field_conf: dict) -> str:
+    engine = field_conf.get("ocr_engine")
+    if engine in ENGINES:
+        return engine
+    if engine:
+        logging.warning(f"⚠️ Unknown ocr_engine '{engine}' for {field_name}; using 'auto'.")
+    if "ticket_number" in field_name or "ocr" in str(field_conf.get("ocr_instruction", "")).lower():
+        return "printed"
+    return "auto"
+
+
+def _field_decoder(field_name: str, field_conf: dict) -> str:
+    decoder = field_conf.get("ctc_decoder", DECODER)
+    if decoder not in DECODERS:
+        logging.warning(f"⚠️ Unknown ctc_decoder '{decoder}' for {field_name}; using '{DECODER}'.")
+        return DECODER
+    return decoder
+
+
+def _is_static(field_name: str, field_conf: dict) -> bool:
+    return bool(field_conf.get("static_content", simplify_field_name(field_name) in STATIC_FIELDS))
+
+
+def _is_selected(field_name: str, only_fields) -> bool:
+    return not only_fields or field_name in only_fields or simplify_field_name(field_name) in only_fields
+
+
+def compile_field_plan(fields: dict, vendor: str, only_fields=None) -> dict:
+    """
+    Build a ``FieldPlan`` for every flattened field.
+    :param only_fields: Optional field names (short or dotted) to restrict the run to;
+                        every other field is skipped.
+    :raises ValueError: When none of ``only_fields`` names a field of this vendor.
+    """
+    if only_fields:
+        known = set(fields) | {simplify_field_name(name) for name in fields}
+        unknown = [name for name in only_fields if name not in known]
+        if len(unknown) == len(only_fields):
+            raise ValueError(f"None of the requested fields {unknown} exist for vendor '{vendor}'")
+        if unknown:
+            logging.warning(f"⚠️ Ignoring unknown field(s) for vendor '{vendor}': {unknown}")
+    plan = {}
+    for field_name, field_conf in fields.items():
+        field_conf = field_conf if isinstance(field_conf, dict) else {}
+        action = _field_action(field_conf) if _is_selected(field_name, only_fields) else "skip"
+        plan[field_name] = FieldPlan(
+            name=field_name,
+            short_name=simplify_field_name(field_name),
+            conf=field_conf,
+            action=action,
+            engine=_field_engine(field_name, field_conf),
+            printed_backend=resolve_printed_backend(vendor, field_name),
+            template_fallback="ticket_number" in field_name,
+            decoder=_field_decoder(field_name, field_conf),
+            static_content=_is_static(field_name, field_conf),
+        )
+    return plan
+
+
+def log_field_plan(plan: dict):
+    counts = {}
+    for field in plan.values():
+        counts[field.action] = counts.get(field.action, 0) + 1
+        detail = f" via {field.engine}" if field.action == "ocr" else ""
+        logging.info(f"🗺️ Field '{field.name}': {field.action}{detail}")
+    logging.info(f"🗺️ Field plan: {counts}")
@@ -6,11 +6,12 @@ import os
 import tempfile
 import zipfile
 
-import pandas as pd
 import yaml
-from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 
+# Cell text -> fill color, checked in this order (first match wins).
+HIGHLIGHTS = (("missing", "FFFF99"), ("template", "FF9999"))
+
 
 def list_yaml_configs(config_dir):
     return [f for f in os.listdir(config_dir) if f.endswith(".yaml")]
@@ -31,26 +32,95 @@ def save_csv(data, columns, filepath):
         writer.writerows(data)
 
 
-def color_code_excel(csv_path):
-    """Convert a CSV of ticket numbers to an Excel file with highlights."""
-    try:
-        df = pd.read_csv(csv_path)
-        xlsx_path = csv_path.replace(".csv", ".xlsx")
-        df.to_excel(xlsx_path, index=False)
+def add_highlight_rules(ws, n_cols, n_rows):
+    """
+    Highlight cells containing "missing" (yellow) or "template" (red) with native
+    conditional-formatting rules over the data range instead of per-cell fills.
+    """
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.utils import get_column_letter
+
+    if not n_cols or not n_rows:
+        return
+    cell_range = f"A2:{get_column_letter(n_cols)}{n_rows + 1}"
+    for text, color in HIGHLIGHTS:
+        fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
+        # SEARCH is case-insensitive and errors (-> FALSE) on cells without the text.
+        ws.conditional_formatting.add(
+            cell_range, FormulaRule(formula=[f'ISNUMBER(SEARCH("{text}",A2))'], fill=fill, stopIfTrue=True)
+        )
+
+
+class EntryWriter:
+    """
+    Stream ticket entries into ``<base>_ticket_numbers.csv`` and a write-only
+    ``.xlsx`` with highlight rules, one row at a time.
+    """
+
+    def __init__(self, output_dir, base_name, columns):
+        from openpyxl import Workbook
 
-        wb = load_workbook(xlsx_path)
-        ws = wb.active
+        self.csv_path = os.path.join(output_dir, f"{base_name}_ticket_numbers.csv")
+        self.xlsx_path = self.csv_path.replace(".csv", ".xlsx")
+        self.columns = list(columns)
+        self.rows = 0
+        self._csv_file = open(self.csv_path, mode="w", newline="", encoding="utf-8")
+        self._csv = csv.DictWriter(self._csv_file, fieldnames=self.columns, extrasaction="ignore")
+        self._csv.writeheader()
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Sheet1")
+        self._ws.append(self.columns)
 
-        red_fill = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
-        yellow_fill = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")
+    def add(self, entry):
+        self._csv.writerow(entry)
+        self._ws.append([entry.get(column) for column in self.columns])
+        self.rows += 1
 
-        for row in ws.iter_rows(min_row=2):
-            for cell in row:
-                if isinstance(cell.value, str) and "missing" in cell.value.lower():
-                    cell.fill = yellow_fill
-                elif isinstance(cell.value, str) and "template" in cell.value.lower():
-                    cell.fill = red_fill
+    def close(self):
+        self._csv_file.close()
+        add_highlight_rules(self._ws, len(self.columns), self.rows)
+        self._wb.save(self.xlsx_path)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def entry_columns(entries):
+    """Every key of ``entries`` in order of first appearance."""
+    return list(dict.fromkeys(key for entry in entries for key in entry))
+
+
+def _csv_value(value):
+    if value == "":
+        return None
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def color_code_excel(csv_path):
+    """Convert a CSV of ticket numbers to an Excel file with highlights."""
+    from openpyxl import Workbook
+
+    try:
+        xlsx_path = csv_path.replace(".csv", ".xlsx")
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("Sheet1")
+            ws.append(header)
+            n_rows = 0
+            for row in reader:
+                ws.append([_csv_value(value) for value in row])
+                n_rows += 1
+        add_highlight_rules(ws, len(header), n_rows)
         wb.save(xlsx_path)
         logging.info(f"Excel file saved with highlights: {xlsx_path}")
     except Exception as e:
@@ -105,19 +175,22 @@ def is_dir_writable(path):
         return False
 
 
-def save_entries_to_excel(entries, output_dir, base_name):
+def save_entries_to_excel(entries, output_dir, base_name, columns=None):
     """
-    Save extracted ticket entries to an Excel file.
+    Save extracted ticket entries to a CSV and a highlighted Excel file in one pass.
+    :param entries: Iterable of entry dicts; may be a generator.
+    :param columns: Column order; defaults to every key in order of first appearance
+                    (which needs the entries up front).
     """
-    if not entries:
+    if columns is None:
+        entries = list(entries)
+        columns = entry_columns(entries)
+    if not columns:
         logging.warning("No entries to write to Excel.")
         return
 
-    df = pd.DataFrame(entries)
-    csv_path = os.path.join(output_dir, f"{base_name}_ticket_numbers.csv")
-    xlsx_path = csv_path.replace(".csv", ".xlsx")
-
-    df.to_csv(csv_path, index=False)
-    df.to_excel(xlsx_path, index=False)
+    with EntryWriter(output_dir, base_name, columns) as writer:
+        for entry in entries:
+            writer.add(entry)
 
-    logging.info(f"Saved ticket data to:\n  CSV: {csv_path}\n  Excel: {xlsx_path}")
+    logging.info(f"Saved ticket data to:\n  CSV: {writer.csv_path}\n  Excel: {writer.xlsx_path}")
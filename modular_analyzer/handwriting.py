@@ -0,0 +1,101 @@
+# --- modular_analyzer/handwriting.py ---
+"""Handwriting triage for the field crops of a page.
+
+A cheap edge/contrast heuristic runs on downscaled crops first.  Crops it
+does not flag are sent to the ONNX classifier together in one batched
+inference.  The result is a handwriting score per field in ``[0, 1]``.
+"""
+
+import logging
+
+import cv2
+import numpy as np
+
+from modular_analyzer.config import OCR_CONFIG
+from modular_analyzer.image_preprocessing import TensorBuffer, preprocess_batch_for_handwriting_classification
+from modular_analyzer.model_registry import get_model
+
+TRIAGE_CONFIG = OCR_CONFIG.get("handwriting_triage") or {}
+TRIAGE_MAX_HEIGHT = TRIAGE_CONFIG.get("max_height", 48)
+HANDWRITING_THRESHOLD = TRIAGE_CONFIG.get("threshold", 0.5)
+
+_classifier_buffer = TensorBuffer((1, 32, 96))
+
+
+def _to_gray(img_array):
+    if img_array.ndim == 3:
+        return cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+    return img_array
+
+
+def downscale_for_triage(gray, max_height=TRIAGE_MAX_HEIGHT):
+    """Shrink a grayscale crop so its height is at most ``max_height`` pixels."""
+    h, w = gray.shape[:2]
+    if not max_height or h <= max_height:
+        return gray
+    scale = max_height / h
+    return cv2.resize(gray, (max(1, int(w * scale)), max_height), interpolation=cv2.INTER_AREA)
+
+
+def heuristic_handwriting(gray):
+    """Edge-density / contrast heuristic; True when the crop looks handwritten."""
+    blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blur, 30, 150)
+    edge_density = np.count_nonzero(edges) / edges.size
+    return edge_density > 0.02 or np.std(gray) > 50
+
+
+def run_onnx_batch(session, batch):
+    """
+    Run ``batch`` through ``session`` in as few calls as the model allows.
+    Models exported with a fixed batch dimension are fed chunks of that size
+    (see ``model_tools.make_batch_dynamic`` to re-export them with a dynamic one).
+    """
+    input_meta = session.get_inputs()[0]
+    fixed = input_meta.shape[0] if input_meta.shape else None
+    if not isinstance(fixed, int) or fixed <= 0 or fixed >= len(batch):
+        return session.run(None, {input_meta.name: batch})[0]
+
+    # Chunks are copied out as they arrive: IO-bound sessions reuse one output buffer per shape.
+    out = None
+    for start in range(0, len(batch), fixed):
+        chunk = session.run(None, {input_meta.name: batch[start:start + fixed]})[0]
+        if out is None:
+            out = np.empty((len(batch), *chunk.shape[1:]), dtype=chunk.dtype)
+        out[start:start + len(chunk)] = chunk
+    return out
+
+
+def classify_handwriting_batch(arrays):
+    """Return the classifier's handwriting probability for each crop."""
+    if not arrays:
+        return np.zeros(0, dtype=np.float32)
+    batch = preprocess_batch_for_handwriting_classification(arrays, out=_classifier_buffer.take(len(arrays)))
+    preds = run_onnx_batch(get_model("handwriting_classifier"), batch)
+    return preds.reshape(len(arrays), -1)[:, 0].astype(np.float32)
+
+
+def triage_handwriting(crops):
+    """
+    Score every crop for handwriting.
+    :param crops: Mapping of field name -> RGB or grayscale ``np.ndarray``.
+    :return: Mapping of field name -> score; 1.0 when the heuristic fires,
+             otherwise the classifier probability (0.0 if it fails).
+    """
+    scores = {}
+    candidates = {}
+    for name, img_array in crops.items():
+        gray = downscale_for_triage(_to_gray(img_array))
+        if heuristic_handwriting(gray):
+            scores[name] = 1.0
+        else:
+            candidates[name] = gray
+
+    if candidates:
+        try:
+            probs = classify_handwriting_batch(list(candidates.values()))
+            scores.update({name: float(p) for name, p in zip(candidates, probs)})
+        except Exception as e:
+            logging.exception(f"❌ ONNX handwriting classifier failed: {e}")
+            scores.update({name: 0.0 for name in candidates})
+    return scores
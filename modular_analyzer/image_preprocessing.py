@@ -33,10 +33,49 @@ def preprocess_for_handwriting_classification(img_array):
         return None
 
 
-def preprocess_for_onnx(region_array):
+class TensorBuffer:
+    """Grow-only float32 buffer so batches of the same item shape reuse one allocation."""
+
+    def __init__(self, item_shape):
+        self.item_shape = tuple(item_shape)
+        self._buf = None
+
+    def take(self, n):
+        if self._buf is None or self._buf.shape[0] < n:
+            self._buf = np.empty((n, *self.item_shape), dtype=np.float32)
+        return self._buf[:n]
+
+
+def _fill_batch(gray_arrays, out, width, height):
+    for i, gray in enumerate(gray_arrays):
+        resized = cv2.resize(gray, (width, height), interpolation=cv2.INTER_LINEAR)
+        np.multiply(resized, 1.0 / 255.0, out=out[i, 0], casting="unsafe")
+    return out
+
+
+def preprocess_batch_for_handwriting_classification(img_arrays, out=None):
     """
-    Prepare an image for ONNX handwriting OCR inference.
-    Converts to grayscale, resizes, normalizes, and reshapes.
+    Fill one ``(N, 1, 32, 96)`` float32 tensor from N RGB or grayscale crops.
+    Pass ``out`` (e.g. ``TensorBuffer.take(N)``) to write into a preallocated buffer.
+    """
+    if out is None:
+        out = np.empty((len(img_arrays), 1, 32, 96), dtype=np.float32)
+    grays = [cv2.cvtColor(a, cv2.COLOR_RGB2GRAY) if a.ndim == 3 else a for a in img_arrays]
+    return _fill_batch(grays, out, 96, 32)
+
+
+def is_blank_page(img_array, dark_threshold=200, min_ink_ratio=0.0005):
+    """Return True when almost no pixels are darker than ``dark_threshold``."""
+    if img_array.ndim == 3:
+        img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+    ink_ratio = np.count_nonzero(img_array < dark_threshold) / img_array.size
+    return ink_ratio < min_ink_ratio
+
+
+def to_onnx_gray(region_array):
+    """
+    Validate a crop for ONNX handwriting OCR and return it as grayscale.
+    Raises ValueError for missing, empty or non-RGB/grayscale input.
     """
     if region_array is None:
         raise ValueError("❌ preprocess_for_onnx received NoneType image")
@@ -49,31 +88,31 @@ def preprocess_for_onnx(region_array):
         if region_array.ndim == 3 and region_array.shape[2] != 3:
             raise ValueError(f"❌ preprocess_for_onnx expected 3-channel image, got shape: {region_array.shape}")
         if region_array.ndim == 2:
-            img = region_array
-        else:
-            img = cv2.cvtColor(region_array, cv2.COLOR_RGB2GRAY)
-
-        img = cv2.resize(img, (128, 32))
-        img = img.astype(np.float32) / 255.0
-        img = img.reshape(1, 1, 32, 128)
-        return img
+            return region_array
+        return cv2.cvtColor(region_array, cv2.COLOR_RGB2GRAY)
     except Exception as e:
         raise ValueError(f"❌ Image preprocessing failed: {e}")
 
 
+def preprocess_batch_for_onnx(gray_arrays, out=None):
+    """
+    Fill one ``(N, 1, 32, 128)`` float32 tensor from N crops prepared by ``to_onnx_gray``.
+    Pass ``out`` (e.g. ``TensorBuffer.take(N)``) to write into a preallocated buffer.
+    """
+    if out is None:
+        out = np.empty((len(gray_arrays), 1, 32, 128), dtype=np.float32)
+    return _fill_batch(gray_arrays, out, 128, 32)
+
+
+def preprocess_for_onnx(region_array):
+    """
+    Prepare an image for ONNX handwriting OCR inference.
+    Converts to grayscale, resizes, normalizes, and reshapes to ``(1, 1, 32, 128)``.
+    """
+    return preprocess_batch_for_onnx([to_onnx_gray(region_array)])
+
+
 def decode_onnx_output(preds):
-    # Simple greedy decoder assuming softmax outputs over character logits
-    import string
-    alphabet = string.ascii_uppercase + string.digits + "-"
-    blank_token = len(alphabet)
-
-    best_path = np.argmax(preds[0], axis=1)
-    collapsed = []
-    prev = blank_token
-    for p in best_path:
-        if p != prev and p != blank_token:
-            collapsed.append(p)
-        prev = p
-
-    chars = [alphabet[c] for c in collapsed if c < len(alphabet)]
-    return "".join(chars)
+    """Greedy-decode the first row of the ICR model output (see ``ctc_decoding`` for batches)."""
+    from modular_analyzer.ctc_decoding import greedy_decode
+    return greedy_decode(preds[:1])[0][0]
@@ -1,26 +1,27 @@
+import argparse
+import functools
 import logging
 import os
 from pathlib import Path
 from tkinter import Tk
 from tkinter.filedialog import askopenfilename
 
-from modular_analyzer.file_utils import (
-    list_yaml_configs, load_yaml, save_csv,
-    color_code_excel, zip_folder,
-    validate_required_files, is_dir_writable,
-    find_file_case_insensitive, save_entries_to_excel
-)
+from modular_analyzer.batch_runner import CONFIGS_DIR, OUTPUT_DIR, match_vendor, vendor_configs, write_outputs
+from modular_analyzer.file_utils import is_dir_writable
+from modular_analyzer.cpu_budget import AUTO_TUNE, ThroughputTuner, plan_cpu_budget
+from modular_analyzer.crop_memo import get_crop_memo
+from modular_analyzer.field_plan import compile_field_plan, log_field_plan
 from modular_analyzer.logger_utils import setup_logger
-from modular_analyzer.ocr_utils import (
-    add_box_to_fields
+from modular_analyzer.model_registry import merge_load_counts, prepare_onnx_models
+from modular_analyzer.orientation import plan_document_orientation
+from modular_analyzer.page_journal import PageJournal, journal_path
+from modular_analyzer.page_processor import (
+    process_page, init_page_worker, PRELOAD_MODELS, WARMUP_MODELS, ORIENTATION_METHOD, PROXY_DPI
 )
-from modular_analyzer.page_processor import process_page
-from modular_analyzer.pdf_utils import convert_pdf_to_images, process_pages_concurrently
-from modular_analyzer.reporting_utils import collect_summary_report, log_yaml_fields
+from modular_analyzer.pdf_utils import get_page_count, imap_pages
+from modular_analyzer.result_cache import PAGE_CACHE_ENABLED, PageResultCache, page_cache_key, run_fingerprint
 from modular_analyzer.types import PageTask
-
-CONFIGS_DIR = "modular_analyzer/configs"
-OUTPUT_DIR = "output"
+from modular_analyzer.vendor_layout import load_vendor_layout
 
 setup_logger()
 
@@ -41,16 +42,21 @@ def custom_exception_handler(exc_type, exc_value, exc_traceback):
 sys.excepthook = custom_exception_handler
 
 
-def flatten_fields(conf):
-    flat = {}
-    for section_name, section in conf.items():
-        if isinstance(section, dict):
-            for field_name, field_conf in section.items():
-                flat[f"{section_name}.{field_name}"] = field_conf
-    return flat
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze scanned ticket PDFs")
+    parser.add_argument(
+        "--fields", nargs="+", metavar="FIELD",
+        help="Only process these fields (e.g. ticket_number) for a fast reconciliation run"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Skip pages already in the output folder's page journal and rebuild outputs from it"
+    )
+    return parser.parse_args(argv)
 
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
     logging.info("Welcome to Modular Analyzer!")
     Tk().withdraw()
     pdf_path = askopenfilename(title="Select PDF to Analyze", filetypes=[("PDF Files", "*.pdf")])
@@ -59,21 +65,14 @@ def main():
         return
 
     structured_name = Path(pdf_path).stem
-    yaml_files = list_yaml_configs(CONFIGS_DIR)
-    yaml_files = [f for f in yaml_files if f.lower() != "ocr_config.yaml"]
+    yaml_files = vendor_configs(CONFIGS_DIR)
     vendor_names = [os.path.splitext(f)[0] for f in yaml_files]
 
     print("Available Vendors:")
     for idx, vendor in enumerate(vendor_names, start=1):
         print(f"{idx}. {vendor}")
 
-    vendor_match = None
-    for yaml_file in yaml_files:
-        base = os.path.splitext(yaml_file)[0]
-        if base.lower() in structured_name.lower():
-            vendor_match = base
-            break
-
+    vendor_match, yaml_path = match_vendor(structured_name, yaml_files, CONFIGS_DIR)
     if not vendor_match:
         print(f"No YAML config matches the PDF name: {structured_name}")
         print(f"Available configs: {vendor_names}")
@@ -84,61 +83,73 @@ def main():
         print("Aborting by user.")
         return
 
-    yaml_path = find_file_case_insensitive(f"{vendor_match}.yaml", CONFIGS_DIR)
-    fields_conf = load_yaml(yaml_path)
-
     if not is_dir_writable(OUTPUT_DIR):
         logging.error(f"Output directory not writable: {OUTPUT_DIR}")
         return
 
-    ok, missing = validate_required_files(
-        vendor_match, CONFIGS_DIR, ["ticket_template.jpg"], "modular_analyzer/templates"
-    )
-    if not ok:
-        logging.error("Missing required files:\n" + "\n".join(missing))
+    layout = load_vendor_layout(vendor_match, yaml_path)
+    if not layout.template_paths:
+        logging.error(f"Missing required files:\nTemplate for vendor '{vendor_match}'")
         return
 
-    add_box_to_fields(fields_conf)
-    log_yaml_fields(fields_conf, yaml_path)
-
     output_dir = os.path.join(OUTPUT_DIR, vendor_match, structured_name)
     os.makedirs(output_dir, exist_ok=True)
 
-    images = convert_pdf_to_images(pdf_path)
-    logging.info(f"Converted {len(images)} pages from PDF.")
+    page_count = get_page_count(pdf_path)
+    logging.info(f"PDF has {page_count} pages; rendering them inside the workers.")
+
+    rotations = plan_document_orientation(pdf_path, method=ORIENTATION_METHOD, proxy_dpi=PROXY_DPI)
 
-    flat_fields = flatten_fields(fields_conf)
-    args_list = [
+    try:
+        field_plan = compile_field_plan(layout.fields, vendor_match, only_fields=args.fields)
+    except ValueError as e:
+        logging.error(f"🛑 {e}")
+        return
+    log_field_plan(field_plan)
+    fingerprint = run_fingerprint(layout, field_plan)
+    journal = PageJournal(journal_path(output_dir), pdf_path, page_count, fingerprint, resume=args.resume)
+    if journal.pages:
+        logging.info(f"⏯️ Resuming: {len(journal.pages)} of {page_count} pages already journaled.")
+    # Fields and plan reach each worker once through the initializer, not with every page.
+    args_list = (
         PageTask(
             page_idx=idx,
-            img=img,
-            fields=flat_fields,
+            img=None,
+            fields={},
             output_dir=output_dir,
             vendor=vendor_match,
-            date="20250101"
+            date="20250101",
+            pdf_path=pdf_path,
+            rotation=rotations[idx],
         )
-        for idx, img in enumerate(images)
-    ]
-    results = process_pages_concurrently(args_list, process_page)
-
-    entries = [r["entry"] for r in results]
-    ticket_issues = [(r["entry"].get("Page"), r["ticket_issue"]) for r in results if r["ticket_issue"]]
-    thumbnails = [thumb for r in results for thumb in r["thumbnails"]]
-    timings = [r["timing"] for r in results]
-
-    save_entries_to_excel(entries, output_dir, structured_name)
-    csv_path = os.path.join(output_dir, f"{structured_name}_ticket_numbers.csv")
-    save_csv(ticket_issues, columns=["Page", "Issue"],
-             filepath=os.path.join(output_dir, "ticket_issues.csv"))
-    save_csv(thumbnails, columns=["Page", "Field", "ThumbnailPath"],
-             filepath=os.path.join(output_dir, "thumbnail_index.csv"))
-    save_csv(timings, columns=["Page", "DurationSeconds"],
-             filepath=os.path.join(output_dir, "process_analysis.csv"))
-
-    collect_summary_report(output_dir, entries)
-    color_code_excel(csv_path)
-    zip_folder(os.path.join(output_dir, "valid"), os.path.join(output_dir, "valid_pages.zip"))
-
+        for idx in range(page_count)
+        if idx not in journal.pages
+    )
+    prepare_onnx_models(PRELOAD_MODELS)
+    budget = plan_cpu_budget()
+    cache = PageResultCache() if PAGE_CACHE_ENABLED else None
+    fresh_results = []
+    try:
+        # Journal each page as it finishes so an interrupted run can be resumed.
+        for result in imap_pages(
+            args_list, process_page,
+            initializer=init_page_worker,
+            initargs=(PRELOAD_MODELS, WARMUP_MODELS, budget.threads, layout, field_plan),
+            budget=budget, tuner=ThroughputTuner(budget) if AUTO_TUNE else None,
+            cache=cache, cache_key=functools.partial(page_cache_key, fingerprint=fingerprint),
+        ):
+            journal.append(result["entry"]["Page"] - 1, result)
+            fresh_results.append(result)
+    finally:
+        journal.close()
+        if cache is not None:
+            cache.close()
+    crop_memo = get_crop_memo()
+    if crop_memo is not None:
+        crop_memo.evict()
+    logging.info(f"🧠 Model loads this run: {merge_load_counts(fresh_results)}")
+
+    write_outputs(journal.results(), output_dir, structured_name)
     logging.info("Processing complete. Output saved.")
 
 
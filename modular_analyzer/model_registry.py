@@ -0,0 +1,163 @@
+# --- modular_analyzer/model_registry.py ---
+"""Per-process registry of OCR models.
+
+Models are built on first use and reused for the lifetime of the process.
+``init_worker`` is meant to be passed as the ``initializer`` of a
+``multiprocessing.Pool`` so every worker loads (and optionally warms up) its
+models once instead of on every page.  Each load is counted so the parent can
+report how many times a model was constructed during a run.
+"""
+
+import logging
+from collections import Counter
+
+_models = {}
+_load_counts = Counter()
+
+# Registry names backed by a bundled ONNX file in modular_analyzer/models/ (defaults for `model_files`).
+ONNX_MODEL_FILES = {
+    "onnxruntime": "handwriting_ocr.onnx",
+    "handwriting_classifier": "handwriting_classifier.onnx",
+}
+
+
+def model_file(name):
+    """ONNX file behind registry model ``name``; ``model_files`` in the OCR config overrides the default."""
+    from modular_analyzer.config import OCR_CONFIG
+    return (OCR_CONFIG.get("model_files") or {}).get(name, ONNX_MODEL_FILES[name])
+
+
+def _load_doctr():
+    from modular_analyzer.ocr_utils import initialize_reader
+    return initialize_reader("doctr")
+
+
+def _load_doctr_reco():
+    from modular_analyzer.ocr_utils import initialize_reader
+    return initialize_reader("doctr_reco")
+
+
+def _load_onnxruntime():
+    from modular_analyzer.ocr_utils import initialize_reader
+    return initialize_reader("onnxruntime")
+
+
+def _load_handwriting_classifier():
+    from modular_analyzer.ocr_utils import get_model_variant_path
+    from modular_analyzer.onnx_sessions import create_session
+    return create_session(get_model_variant_path(model_file("handwriting_classifier")),
+                          providers=["CPUExecutionProvider"])
+
+
+def _load_doctr_angle():
+    from doctr.models import angle_predictor
+    return angle_predictor(pretrained=True)
+
+
+def _warmup_doctr(model):
+    import numpy as np
+    model([np.zeros((32, 128, 3), dtype=np.uint8)])
+
+
+def _warmup_onnx(session):
+    import numpy as np
+    feeds = {}
+    for inp in session.get_inputs():
+        shape = [dim if isinstance(dim, int) and dim > 0 else 1 for dim in inp.shape]
+        feeds[inp.name] = np.zeros(shape, dtype=np.float32)
+    session.run(None, feeds)
+
+
+_LOADERS = {
+    "doctr": (_load_doctr, _warmup_doctr),
+    "doctr_reco": (_load_doctr_reco, _warmup_doctr),
+    "doctr_angle": (_load_doctr_angle, None),
+    "onnxruntime": (_load_onnxruntime, _warmup_onnx),
+    "handwriting_classifier": (_load_handwriting_classifier, _warmup_onnx),
+}
+
+
+def register_loader(name, loader, warmup=None):
+    """Register a model ``loader`` (and optional ``warmup`` callable) under ``name``."""
+    _LOADERS[name] = (loader, warmup)
+
+
+def get_model(name):
+    """Return the cached model for ``name``, loading it on first use."""
+    if name in _models:
+        return _models[name]
+    if name not in _LOADERS:
+        raise ValueError(f"Unknown model '{name}'. Registered: {sorted(_LOADERS)}")
+
+    loader, _ = _LOADERS[name]
+    model = loader()
+    _models[name] = model
+    _load_counts[name] += 1
+    logging.info(f"🧠 Loaded model '{name}'")
+    return model
+
+
+def warm_up(name):
+    """Run a throwaway inference so lazy allocations happen before real work."""
+    model = get_model(name)
+    _, warmup = _LOADERS[name]
+    if warmup is None:
+        return
+    try:
+        warmup(model)
+    except Exception as e:
+        logging.warning(f"⚠️ Warm-up failed for model '{name}': {e}")
+
+
+def init_worker(model_names=(), warmup=False, threads=None):
+    """
+    Pool initializer: apply the per-worker thread budget, then load each model
+    in ``model_names`` once per worker.
+    """
+    if threads:
+        from modular_analyzer.cpu_budget import apply_thread_limits
+        apply_thread_limits(threads)
+    for name in model_names:
+        try:
+            if warmup:
+                warm_up(name)
+            else:
+                get_model(name)
+        except Exception as e:
+            logging.error(f"❌ Failed to preload model '{name}': {e}")
+
+
+def prepare_onnx_models(model_names):
+    """Write the optimized graph of each ONNX-backed model once, before workers start."""
+    from modular_analyzer.ocr_utils import get_model_variant_path
+    from modular_analyzer.onnx_sessions import prepare_session_cache
+
+    paths = []
+    for name in model_names:
+        if name in ONNX_MODEL_FILES:
+            try:
+                paths.append(get_model_variant_path(model_file(name)))
+            except FileNotFoundError as e:
+                logging.warning(f"⚠️ {e}")
+    prepare_session_cache(paths)
+
+
+def drain_load_counts():
+    """Return loads recorded since the last call and reset the counter."""
+    counts = dict(_load_counts)
+    _load_counts.clear()
+    return counts
+
+
+def merge_load_counts(results):
+    """Sum the ``model_loads`` reported by each page result."""
+    total = Counter()
+    for r in results:
+        total.update(r.get("model_loads", {}))
+    return dict(total)
+
+
+def clear_models():
+    """Drop every cached model (mainly for tests)."""
+    _models.clear()
+    _load_counts.clear()
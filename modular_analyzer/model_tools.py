@@ -0,0 +1,227 @@
+# --- modular_analyzer/model_tools.py ---
+"""Offline helpers for the bundled ONNX models.
+
+Usage:
+    python -m modular_analyzer.model_tools make-batch-dynamic handwriting_ocr.onnx
+    python -m modular_analyzer.model_tools quantize handwriting_ocr.onnx --mode dynamic
+    python -m modular_analyzer.model_tools quantize handwriting_ocr.onnx --mode static --calibration crops/
+    python -m modular_analyzer.model_tools compare crops/ handwriting_ocr.onnx handwriting_ocr.int8_dynamic.onnx
+
+A labeled crop set is a directory of images plus ``labels.csv`` with
+``file,label`` rows: the expected text for the OCR model, or ``1``/``0``
+(handwritten/printed) for the classifier.
+"""
+
+import argparse
+import csv
+import logging
+import os
+import time
+
+TASKS = ("ocr", "classifier")
+
+
+def make_batch_dynamic(model_path, out_path=None, dim_name="N"):
+    """
+    Rewrite the first dimension of every graph input and output as the
+    symbolic ``dim_name`` so one session call can take any batch size.
+    Writes next to the original (``*_dynamic.onnx``) unless ``out_path`` is given.
+    """
+    import onnx
+
+    model = onnx.load(model_path)
+    for value in list(model.graph.input) + list(model.graph.output):
+        dims = value.type.tensor_type.shape.dim
+        if dims:
+            dims[0].ClearField("dim_value")
+            dims[0].dim_param = dim_name
+
+    if out_path is None:
+        root, ext = os.path.splitext(model_path)
+        out_path = f"{root}_dynamic{ext}"
+    onnx.checker.check_model(model)
+    onnx.save(model, out_path)
+    logging.info(f"💾 Saved batch-dynamic model to {out_path}")
+    return out_path
+
+
+def _preprocess(task, img_arrays):
+    from modular_analyzer.image_preprocessing import (
+        preprocess_batch_for_handwriting_classification,
+        preprocess_batch_for_onnx,
+        to_onnx_gray,
+    )
+    if task == "ocr":
+        return preprocess_batch_for_onnx([to_onnx_gray(a) for a in img_arrays])
+    return preprocess_batch_for_handwriting_classification(img_arrays)
+
+
+def load_crop_set(crops_dir, limit=None):
+    """Return ``(arrays, labels)`` for a labeled crop directory (see module docstring)."""
+    import numpy as np
+    from PIL import Image
+
+    arrays, labels = [], []
+    with open(os.path.join(crops_dir, "labels.csv"), newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            arrays.append(np.array(Image.open(os.path.join(crops_dir, row["file"])).convert("RGB")))
+            labels.append(row["label"])
+            if limit and len(arrays) >= limit:
+                break
+    return arrays, labels
+
+
+class _CropCalibrationReader:
+    """Feeds preprocessed crops to ``quantize_static`` one batch at a time."""
+
+    def __init__(self, input_name, batches):
+        self._feeds = iter([{input_name: batch} for batch in batches])
+
+    def get_next(self):
+        return next(self._feeds, None)
+
+
+def quantize_model(model_path, mode="dynamic", out_path=None, calibration_dir=None, task="ocr",
+                   calibration_limit=200):
+    """
+    Write an INT8 variant of ``model_path`` next to it (``*.int8_dynamic.onnx`` or
+    ``*.int8_static.onnx``), the names ``model_variants`` selects.
+    Static quantization calibrates activations on crops from ``calibration_dir``.
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    from modular_analyzer.onnx_sessions import variant_file_name
+
+    if out_path is None:
+        out_path = os.path.join(os.path.dirname(model_path),
+                                variant_file_name(os.path.basename(model_path), f"int8_{mode}"))
+    if mode == "dynamic":
+        quantize_dynamic(model_path, out_path, weight_type=QuantType.QInt8)
+    elif mode == "static":
+        if not calibration_dir:
+            raise ValueError("Static quantization needs --calibration with a labeled crop directory.")
+        arrays, _ = load_crop_set(calibration_dir, limit=calibration_limit)
+        input_meta = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0]
+        batch_dim = input_meta.shape[0]
+        step = batch_dim if isinstance(batch_dim, int) and batch_dim > 0 else 1
+        batches = [_preprocess(task, arrays[i:i + step]) for i in range(0, len(arrays), step)]
+        quantize_static(model_path, out_path, _CropCalibrationReader(input_meta.name, batches),
+                        quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8)
+    else:
+        raise ValueError(f"Unknown quantization mode '{mode}'. Expected 'dynamic' or 'static'.")
+    logging.info(f"💾 Saved {mode} INT8 model to {out_path}")
+    return out_path
+
+
+def edit_distance(a, b):
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i]
+        for j, cb in enumerate(b, start=1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def character_error_rate(references, hypotheses):
+    """Total edit distance over total reference length."""
+    total = sum(len(ref) for ref in references)
+    errors = sum(edit_distance(ref, hyp) for ref, hyp in zip(references, hypotheses))
+    return errors / total if total else 0.0
+
+
+def _score(task, preds, labels):
+    import numpy as np
+    if task == "ocr":
+        from modular_analyzer.ctc_decoding import greedy_decode
+        texts = [text for text, _ in greedy_decode(preds)]
+        return {"cer": character_error_rate([label.upper() for label in labels], texts)}
+    handwritten = np.asarray(preds).reshape(len(labels), -1)[:, 0] >= 0.5
+    expected = np.array([label.strip().lower() in ("1", "true", "handwritten") for label in labels])
+    return {"accuracy": float(np.mean(handwritten == expected)) if len(labels) else 0.0}
+
+
+def benchmark_model(model_path, arrays, labels, task="ocr", batch_size=16, latency_runs=20):
+    """
+    Measure one model on a labeled crop set.
+    :return: Dict with median single-crop latency (ms), batched throughput
+             (crops/s) and CER (ocr) or accuracy (classifier).
+    """
+    import numpy as np
+    from modular_analyzer.handwriting import run_onnx_batch
+    from modular_analyzer.onnx_sessions import create_session
+
+    session = create_session(model_path, providers=["CPUExecutionProvider"])
+    batch = _preprocess(task, arrays)
+    input_name = session.get_inputs()[0].name
+
+    run_onnx_batch(session, batch[:1])  # warm-up
+    latencies = []
+    for i in range(min(latency_runs, len(batch))):
+        start = time.perf_counter()
+        session.run(None, {input_name: batch[i:i + 1]})
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    preds = []
+    start = time.perf_counter()
+    for i in range(0, len(batch), batch_size):
+        preds.append(np.array(run_onnx_batch(session, batch[i:i + batch_size])))
+    elapsed = time.perf_counter() - start
+    preds = np.concatenate(preds, axis=0)
+
+    result = {
+        "model": os.path.basename(model_path),
+        "latency_ms": float(np.median(latencies)) if latencies else 0.0,
+        "throughput": len(batch) / elapsed if elapsed else 0.0,
+    }
+    result.update(_score(task, preds, labels))
+    return result
+
+
+def compare_models(model_paths, crops_dir, task="ocr", batch_size=16):
+    """Benchmark every model on the same crop set and log a side-by-side table."""
+    arrays, labels = load_crop_set(crops_dir)
+    rows = [benchmark_model(path, arrays, labels, task=task, batch_size=batch_size) for path in model_paths]
+    metric = "cer" if task == "ocr" else "accuracy"
+    lines = [f"{'model':<45} {'latency_ms':>10} {'crops/s':>10} {metric:>10}"]
+    lines += [f"{r['model']:<45} {r['latency_ms']:>10.2f} {r['throughput']:>10.1f} {r[metric]:>10.4f}" for r in rows]
+    logging.info("📊 Model comparison on %d crops:\n%s", len(arrays), "\n".join(lines))
+    return rows
+
+
+def _model_path(name):
+    from modular_analyzer.ocr_utils import get_onnx_model_path
+    return name if os.path.exists(name) else get_onnx_model_path(name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ONNX model maintenance helpers")
+    sub = parser.add_subparsers(dest="command", required=True)
+    dyn = sub.add_parser("make-batch-dynamic", help="Give a model a dynamic batch axis")
+    dyn.add_argument("model", help="Model name in modular_analyzer/models or a path")
+    dyn.add_argument("--out", default=None)
+    quant = sub.add_parser("quantize", help="Write an INT8 variant of a model")
+    quant.add_argument("model", help="Model name in modular_analyzer/models or a path")
+    quant.add_argument("--mode", choices=("dynamic", "static"), default="dynamic")
+    quant.add_argument("--calibration", default=None, help="Labeled crop directory (static mode)")
+    quant.add_argument("--task", choices=TASKS, default="ocr")
+    quant.add_argument("--out", default=None)
+    cmp_ = sub.add_parser("compare", help="Compare models on a labeled crop set")
+    cmp_.add_argument("crops_dir")
+    cmp_.add_argument("models", nargs="+", help="Model names in modular_analyzer/models or paths")
+    cmp_.add_argument("--task", choices=TASKS, default="ocr")
+    cmp_.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    if args.command == "make-batch-dynamic":
+        print(make_batch_dynamic(_model_path(args.model), args.out))
+    elif args.command == "quantize":
+        print(quantize_model(_model_path(args.model), args.mode, args.out, args.calibration, args.task))
+    elif args.command == "compare":
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        compare_models([_model_path(m) for m in args.models], args.crops_dir, args.task, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,42 +3,32 @@ import os
 
 import cv2
 import numpy as np
-import onnxruntime as ort
 from PIL import Image
 from PIL import ImageDraw
 from doctr.io import DocumentFile
 from doctr.models import ocr_predictor
-import pytesseract
-import re
 
+from modular_analyzer.config import OCR_CONFIG
+from modular_analyzer.ctc_decoding import greedy_decode, text_confidence
 from modular_analyzer.image_utils import inches_to_pixels, sanitize_box
+from modular_analyzer.model_registry import get_model
+from modular_analyzer.orientation import detect_rotations
 
-ocr_readers = {}
+DOCTR_BATCH_SIZE = OCR_CONFIG.get("doctr_batch_size", 16)
+DOCTR_RECO_ARCH = OCR_CONFIG.get("doctr_reco_arch", "crnn_vgg16_bn")
+PRINTED_BACKENDS = ("doctr", "doctr_reco")
 
 
-def correct_image_orientation(pil_img, page_num=None, method="tesseract"):
-    """Rotate a PIL image based on the chosen orientation method."""
-    if method == "none":
-        return pil_img
+def detect_rotation(pil_img, page_num=None, method="tesseract"):
+    """Return the clockwise rotation (0/90/180/270) needed to make a page upright."""
+    return detect_rotations([pil_img], method=method, page_nums=[page_num])[0]
 
-    try:
-        if method == "doctr":
-            if not hasattr(correct_image_orientation, "angle_model"):
-                from doctr.models import angle_predictor
-                correct_image_orientation.angle_model = angle_predictor(pretrained=True)
-            angle = correct_image_orientation.angle_model([pil_img])[0]
-            rotation = int(round(angle / 90.0)) * 90 % 360
-        else:  # tesseract
-            osd = pytesseract.image_to_osd(pil_img)
-            rotation_match = re.search(r"Rotate: (\d+)", osd)
-            rotation = int(rotation_match.group(1)) if rotation_match else 0
-
-        logging.info(f"Page {page_num}: rotation = {rotation} degrees")
-        if rotation in {90, 180, 270}:
-            return pil_img.rotate(-rotation, expand=True)
-    except Exception as e:
-        logging.warning(f"Orientation error (page {page_num}): {e}")
 
+def correct_image_orientation(pil_img, page_num=None, method="tesseract"):
+    """Rotate a PIL image based on the chosen orientation method."""
+    rotation = detect_rotation(pil_img, page_num=page_num, method=method)
+    if rotation:
+        return pil_img.rotate(-rotation, expand=True)
     return pil_img
 
 
@@ -54,33 +44,55 @@ def get_onnx_model_path(model_name: str = "handwriting_ocr.onnx") -> str:
     return path
 
 
+def get_model_variant_path(model_name: str) -> str:
+    """
+    Return the path of the variant of ``model_name`` selected in ``model_variants``
+    (e.g. an INT8 build), falling back to the fp32 model when it is missing.
+    """
+    from modular_analyzer.onnx_sessions import MODEL_VARIANTS, variant_file_name
+
+    variant = MODEL_VARIANTS.get(model_name, "fp32")
+    if variant != "fp32":
+        try:
+            return get_onnx_model_path(variant_file_name(model_name, variant))
+        except FileNotFoundError as e:
+            logging.warning(f"⚠️ {e} Falling back to fp32 {model_name}.")
+    return get_onnx_model_path(model_name)
+
+
 def initialize_reader(backend: str = "doctr"):
     """
-    Initialize an OCR/ICR reader based on the specified backend.
+    Build a new OCR/ICR reader for the specified backend.
+    Callers that want a shared, per-process instance should use
+    ``model_registry.get_model`` instead.
     Supported backends:
-      - "doctr": printed/text via DocTR
-      - "onnxruntime": handwriting ICR via ONNXRuntime (>=1.9)
+      - "doctr": printed/text via DocTR (text detection + recognition)
+      - "doctr_reco": DocTR recognition only, for crops that are already boxed
+      - "onnxruntime": handwriting ICR via ONNXRuntime (>=1.9), built from its
+        ``onnx_sessions`` profile
     """
     backend = backend.lower()
 
     if backend == "doctr":
-        reader = ocr_predictor(pretrained=True)
+        reader = ocr_predictor(pretrained=True, det_bs=DOCTR_BATCH_SIZE)
+    elif backend == "doctr_reco":
+        from doctr.models import recognition_predictor
+        reader = recognition_predictor(arch=DOCTR_RECO_ARCH, pretrained=True, batch_size=DOCTR_BATCH_SIZE)
     elif backend == "onnxruntime":
-        model_path = get_onnx_model_path("handwriting_ocr.onnx")
-        providers = ort.get_available_providers()
-        reader = ort.InferenceSession(model_path, providers=providers)
+        from modular_analyzer.model_registry import model_file
+        from modular_analyzer.onnx_sessions import create_session
+        reader = create_session(get_model_variant_path(model_file("onnxruntime")))
     else:
         raise ValueError(
-            f"Unsupported backend: '{backend}'. Choose 'doctr' or 'onnxruntime'."
+            f"Unsupported backend: '{backend}'. Choose 'doctr', 'doctr_reco' or 'onnxruntime'."
         )
 
-    ocr_readers[backend] = reader
     return reader
 
 
-def add_box_to_fields(fields_conf):
+def add_box_to_fields(fields_conf, dpi=72):
     """
-    Add pixel box coordinates to each field configuration based on position and size in inches.
+    Add pixel box coordinates (at ``dpi``) to each field configuration based on position and size in inches.
     Applies a defensive check to ensure config structure is valid.
     """
     for section_key, section in fields_conf.items():
@@ -99,7 +111,7 @@ def add_box_to_fields(fields_conf):
                     and "position_inches" in field
                     and "size_inches" in field
             ):
-                field["box"] = inches_to_pixels(field["position_inches"], field["size_inches"])
+                field["box"] = inches_to_pixels(field["position_inches"], field["size_inches"], dpi)
 
 
 def draw_boxes_on_image(img: Image.Image, fields: dict) -> Image.Image:
@@ -151,9 +163,13 @@ def read_text(image, backend="doctr"):
         raise TypeError(f"read_text expected np.ndarray, got {type(image)}")
     if image.ndim not in (2, 3):
         raise ValueError(f"read_text received invalid image dimensions: {image.shape}")
+    if image.size == 0:
+        raise ValueError("read_text received empty image array")
 
     backend = backend.lower()
-    reader = ocr_readers.setdefault(backend, initialize_reader(backend))
+    if backend not in ("doctr", "onnxruntime"):
+        raise ValueError(f"Unsupported backend: {backend}")
+    reader = get_model(backend)
 
     if backend == "doctr":
         if image.ndim == 2:
@@ -175,13 +191,68 @@ def read_text(image, backend="doctr"):
         input_name = reader.get_inputs()[0].name
         pred = reader.run(None, {input_name: img})[0]
 
-        chars = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-        text = "".join([chars[i] for i in np.argmax(pred, axis=2)[0] if i < len(chars)])
-        return [(None, [(None, text, 0.99)])]
+        text, char_confidences = greedy_decode(pred[:1])[0]
+        return [(None, [(None, text, text_confidence(char_confidences))])]
 
     raise ValueError(f"Unsupported backend: {backend}")
 
 
+def _doctr_page_text(page):
+    words = [
+        word
+        for block in page.blocks
+        for line in block.lines
+        for word in line.words
+    ]
+    if not words:
+        return "", 0.0
+    text = " ".join(word.value for word in words)
+    confidence = float(sum(word.confidence for word in words) / len(words))
+    return text, confidence
+
+
+def read_text_batch(images, backend="doctr", batch_size=None):
+    """
+    Run DocTR over many crops in batched predictor calls.
+    ``images`` maps any hashable key (e.g. a field name, or ``(page, field)``
+    for a window of pages) to an RGB or grayscale ``np.ndarray``.
+    With ``backend="doctr_reco"`` the crops go straight to the recognition
+    model and text detection is skipped.
+    Returns a dict mapping each key to ``(text, confidence)``; the text is an
+    empty string when nothing was recognized.
+    """
+    backend = backend.lower()
+    if backend not in PRINTED_BACKENDS:
+        raise ValueError(f"Unsupported batch backend: {backend}")
+
+    keys = []
+    pages = []
+    for key, image in images.items():
+        if not isinstance(image, np.ndarray) or image.ndim not in (2, 3) or image.size == 0:
+            raise ValueError(f"read_text_batch received invalid image for {key}")
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        keys.append(key)
+        pages.append(image)
+
+    if not pages:
+        return {}
+
+    reader = get_model(backend)
+    batch_size = batch_size or DOCTR_BATCH_SIZE
+    results = {}
+    for start in range(0, len(pages), batch_size):
+        chunk_keys = keys[start:start + batch_size]
+        result = reader(pages[start:start + batch_size])
+        if backend == "doctr_reco":
+            for key, (text, confidence) in zip(chunk_keys, result):
+                results[key] = (text.strip(), float(confidence))
+        else:
+            for key, page in zip(chunk_keys, result.pages):
+                results[key] = _doctr_page_text(page)
+    return results
+
+
 def detect_handwriting(img):
     if isinstance(img, Image.Image):
         img = np.array(img.convert("L"))
@@ -199,8 +270,7 @@ def is_handwriting_deep(img: Image.Image) -> bool:
     """
     from modular_analyzer.image_preprocessing import preprocess_for_handwriting_classification
 
-    model_path = get_onnx_model_path("handwriting_classifier.onnx")
-    session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+    session = get_model("handwriting_classifier")
     input_name = session.get_inputs()[0].name
     output_name = session.get_outputs()[0].name
 
@@ -218,12 +288,8 @@ def is_handwriting_deep(img: Image.Image) -> bool:
 
 
 def template_match(img_region, template_path, threshold=0.7):
-    template = cv2.imread(template_path, 0)
-    if template is None:
-        raise FileNotFoundError(f"Template image not found: {template_path}")
-    img_np = np.array(img_region.convert("L"))
-    res = cv2.matchTemplate(img_np, template, cv2.TM_CCOEFF_NORMED)
-    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    from modular_analyzer.template_engine import load_template, match_pyramid
+    max_val, max_loc = match_pyramid(np.array(img_region.convert("L")), load_template(template_path))
     return (max_val >= threshold), max_loc
 
 
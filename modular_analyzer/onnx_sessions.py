@@ -0,0 +1,205 @@
+# --- modular_analyzer/onnx_sessions.py ---
+"""ONNX Runtime sessions built from named profiles in ``ocr_config.yaml``.
+
+A profile sets thread counts, execution mode, graph optimization level,
+memory arena behaviour and whether runs use IO binding.  The optimized graph
+of each (model, profile) pair is written to ``cache_dir`` the first time it is
+built; later sessions, including every pool worker, load that file with
+optimization switched off instead of re-optimizing at startup.
+"""
+
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+from modular_analyzer.config import OCR_CONFIG
+
+SESSION_CONFIG = OCR_CONFIG.get("onnx_sessions") or {}
+PROFILES = SESSION_CONFIG.get("profiles") or {}
+MODEL_PROFILES = SESSION_CONFIG.get("models") or {}
+CACHE_DIR = SESSION_CONFIG.get("cache_dir", os.path.join("models", "optimized"))
+MODEL_VARIANTS = OCR_CONFIG.get("model_variants") or {}
+VARIANTS = ("fp32", "int8_dynamic", "int8_static")
+
+_thread_budget = None
+
+_OPT_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+_EXECUTION_MODES = {
+    "sequential": "ORT_SEQUENTIAL",
+    "parallel": "ORT_PARALLEL",
+}
+
+
+def variant_file_name(model_name, variant):
+    """``handwriting_ocr.onnx`` + ``int8_dynamic`` -> ``handwriting_ocr.int8_dynamic.onnx``."""
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown model variant '{variant}'. Expected one of {VARIANTS}")
+    if variant == "fp32":
+        return model_name
+    stem, ext = os.path.splitext(model_name)
+    return f"{stem}.{variant}{ext}"
+
+
+def base_model_name(file_name):
+    """Strip a variant suffix: ``handwriting_ocr.int8_static.onnx`` -> ``handwriting_ocr.onnx``."""
+    stem, ext = os.path.splitext(file_name)
+    for variant in VARIANTS[1:]:
+        if stem.endswith(f".{variant}"):
+            return stem[: -len(variant) - 1] + ext
+    return file_name
+
+
+def get_profile(model_name, profile_name=None):
+    """Return the profile for ``model_name`` (explicit name, per-model mapping, then ``default``)."""
+    profile_name = profile_name or MODEL_PROFILES.get(base_model_name(model_name), "default")
+    if profile_name not in PROFILES and profile_name != "default":
+        logging.warning(f"⚠️ Unknown ONNX session profile '{profile_name}'; using defaults.")
+    return dict(PROFILES.get(profile_name) or {})
+
+
+def set_thread_budget(threads):
+    """Intra-op threads for sessions whose profile does not set them (see ``cpu_budget``)."""
+    global _thread_budget
+    _thread_budget = threads
+
+
+def build_session_options(profile):
+    """
+    Translate a profile dict into ``ort.SessionOptions``; missing keys keep ORT's
+    defaults, except intra-op threads, which fall back to the CPU budget.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    intra_op_threads = profile.get("intra_op_threads", _thread_budget)
+    if intra_op_threads is not None:
+        options.intra_op_num_threads = int(intra_op_threads)
+    if profile.get("inter_op_threads") is not None:
+        options.inter_op_num_threads = int(profile["inter_op_threads"])
+    if profile.get("execution_mode"):
+        options.execution_mode = getattr(ort.ExecutionMode, _EXECUTION_MODES[profile["execution_mode"]])
+    if profile.get("graph_optimization_level"):
+        options.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel, _OPT_LEVELS[profile["graph_optimization_level"]]
+        )
+    if profile.get("cpu_mem_arena") is not None:
+        options.enable_cpu_mem_arena = bool(profile["cpu_mem_arena"])
+    if profile.get("mem_pattern") is not None:
+        options.enable_mem_pattern = bool(profile["mem_pattern"])
+    return options
+
+
+def _cache_dir():
+    if os.path.isabs(CACHE_DIR):
+        return CACHE_DIR
+    return os.path.join(os.path.dirname(__file__), CACHE_DIR)
+
+
+def optimized_model_path(model_path, profile):
+    """
+    Cache location of the optimized graph for ``model_path`` under ``profile``.
+    The key covers the source file (size + mtime), the optimization level and
+    the ORT version, so stale graphs are never loaded.
+    """
+    import onnxruntime as ort
+
+    stat = os.stat(model_path)
+    level = profile.get("graph_optimization_level", "all")
+    key = f"{os.path.abspath(model_path)}|{stat.st_size}|{stat.st_mtime_ns}|{level}|{ort.__version__}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(_cache_dir(), f"{stem}.{level}.{digest}.onnx")
+
+
+class SessionRunner:
+    """
+    Wrap an ``InferenceSession`` so ``run`` goes through IO binding with output
+    buffers reused per input shape.  Returned arrays are only valid until the
+    next run with the same input shape; copy them to keep them longer.
+    Every other attribute is delegated to the session.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._binding = session.io_binding()
+        self._output_names = [out.name for out in session.get_outputs()]
+        self._outputs = {}
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def run(self, output_names, feeds):
+        import onnxruntime as ort
+
+        key = tuple((name, arr.shape) for name, arr in sorted(feeds.items()))
+        if key not in self._outputs:
+            # First run at this shape: learn the output shapes, then keep buffers for reuse.
+            outputs = self.session.run(self._output_names, feeds)
+            self._outputs[key] = [np.empty_like(out) for out in outputs]
+            return self._select(output_names, outputs)
+
+        self._binding.clear_binding_inputs()
+        self._binding.clear_binding_outputs()
+        for name, arr in feeds.items():
+            self._binding.bind_cpu_input(name, np.ascontiguousarray(arr))
+        buffers = self._outputs[key]
+        for name, buf in zip(self._output_names, buffers):
+            self._binding.bind_ortvalue_output(name, ort.OrtValue.ortvalue_from_numpy(buf))
+        self.session.run_with_iobinding(self._binding)
+        return self._select(output_names, buffers)
+
+    def _select(self, output_names, outputs):
+        if not output_names:
+            return outputs
+        by_name = dict(zip(self._output_names, outputs))
+        return [by_name[name] for name in output_names]
+
+
+def create_session(model_path, profile_name=None, providers=None):
+    """
+    Build an ``InferenceSession`` for ``model_path`` using its configured profile,
+    loading the cached optimized graph when one exists and writing it otherwise.
+    """
+    import onnxruntime as ort
+
+    model_name = os.path.basename(model_path)
+    profile = get_profile(model_name, profile_name)
+    providers = providers or profile.get("providers") or ort.get_available_providers()
+    options = build_session_options(profile)
+
+    load_path = model_path
+    if profile.get("cache_optimized", True):
+        cached = optimized_model_path(model_path, profile)
+        if os.path.exists(cached):
+            load_path = cached
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        else:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            tmp_path = f"{cached}.{os.getpid()}.tmp"
+            options.optimized_model_filepath = tmp_path
+            session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, cached)  # atomic, so concurrent workers never read a partial file
+                logging.info(f"💾 Cached optimized ONNX graph at {cached}")
+            return SessionRunner(session) if profile.get("io_binding") else session
+
+    session = ort.InferenceSession(load_path, sess_options=options, providers=providers)
+    return SessionRunner(session) if profile.get("io_binding") else session
+
+
+def prepare_session_cache(model_paths):
+    """Build (and cache) the optimized graph for each model once, before workers start."""
+    for model_path in model_paths:
+        try:
+            profile = get_profile(os.path.basename(model_path))
+            if profile.get("cache_optimized", True) and not os.path.exists(optimized_model_path(model_path, profile)):
+                create_session(model_path)
+        except Exception as e:
+            logging.warning(f"⚠️ Could not pre-optimize {model_path}: {e}")
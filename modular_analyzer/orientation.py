@@ -0,0 +1,132 @@
+# --- modular_analyzer/orientation.py ---
+"""Page orientation detection.
+
+Detection is layered from cheapest to most expensive:
+
+1. A page's ``/Rotate`` metadata, when set, is trusted (PyMuPDF already
+   applies it while rendering) and no detection runs.
+2. A document-level decision: a few sampled pages are checked in the parent
+   and, if they agree, that rotation is assigned to every page.  Only pages
+   whose shape differs from the samples (portrait vs landscape) are left for
+   the workers to re-check.
+3. Per-page detection on a downscaled proxy, with the DocTR path batched
+   across all images passed in.
+"""
+
+import logging
+import re
+from collections import Counter
+
+import pytesseract
+
+from modular_analyzer.config import OCR_CONFIG
+from modular_analyzer.model_registry import get_model
+
+ORIENTATION_CONFIG = OCR_CONFIG.get("orientation") or {}
+USE_PDF_ROTATE = ORIENTATION_CONFIG.get("use_pdf_rotate", True)
+OSD_MAX_SIDE = ORIENTATION_CONFIG.get("osd_max_side", 1200)
+DOCUMENT_SAMPLE_PAGES = ORIENTATION_CONFIG.get("document_sample_pages", 5)
+
+
+def _fit_max_side(pil_img, max_side):
+    longest = max(pil_img.size)
+    if not max_side or longest <= max_side:
+        return pil_img
+    scale = max_side / longest
+    return pil_img.resize((max(1, int(pil_img.width * scale)), max(1, int(pil_img.height * scale))))
+
+
+def _normalize(rotation):
+    rotation = int(round(rotation / 90.0)) * 90 % 360
+    return rotation if rotation in {90, 180, 270} else 0
+
+
+def detect_rotations(images, method="tesseract", page_nums=None):
+    """
+    Return the clockwise rotation (0/90/180/270) needed for each image.
+    The DocTR angle model sees every image in one batched call; tesseract OSD
+    runs once per image on a copy downscaled to ``osd_max_side``.
+    """
+    page_nums = page_nums or [None] * len(images)
+    if method == "none" or not images:
+        return [0] * len(images)
+
+    if method == "doctr":
+        try:
+            angles = get_model("doctr_angle")(list(images))
+            rotations = [_normalize(angle) for angle in angles]
+        except Exception as e:
+            logging.warning(f"Orientation error (pages {page_nums}): {e}")
+            return [0] * len(images)
+    else:  # tesseract
+        rotations = []
+        for img, page_num in zip(images, page_nums):
+            try:
+                osd = pytesseract.image_to_osd(_fit_max_side(img, OSD_MAX_SIDE))
+                rotation_match = re.search(r"Rotate: (\d+)", osd)
+                rotations.append(_normalize(int(rotation_match.group(1))) if rotation_match else 0)
+            except Exception as e:
+                logging.warning(f"Orientation error (page {page_num}): {e}")
+                rotations.append(0)
+
+    for page_num, rotation in zip(page_nums, rotations):
+        logging.info(f"Page {page_num}: rotation = {rotation} degrees")
+    return rotations
+
+
+def _is_landscape(width, height):
+    return width > height
+
+
+def plan_document_orientation(pdf_path, method="tesseract", sample_pages=None, proxy_dpi=72):
+    """
+    Decide orientation for a whole PDF from a handful of sampled pages.
+    Returns one entry per page: a rotation in degrees, or None when the page
+    must still be checked individually by the worker.
+    """
+    from modular_analyzer.pdf_utils import get_page_geometry, render_page
+
+    geometry = get_page_geometry(pdf_path)
+    plan = [None] * len(geometry)
+    if method == "none":
+        return [0] * len(geometry)
+
+    candidates = []
+    for idx, (pdf_rotate, width, height) in enumerate(geometry):
+        if USE_PDF_ROTATE and pdf_rotate:
+            plan[idx] = 0
+        else:
+            candidates.append(idx)
+
+    sample_pages = DOCUMENT_SAMPLE_PAGES if sample_pages is None else sample_pages
+    if not candidates or sample_pages <= 0:
+        return plan
+
+    step = max(1, len(candidates) // sample_pages)
+    sampled = candidates[::step][:sample_pages]
+    proxies = [render_page(pdf_path, idx, dpi=proxy_dpi) for idx in sampled]
+    rotations = detect_rotations(proxies, method=method, page_nums=[idx + 1 for idx in sampled])
+    for idx, rotation in zip(sampled, rotations):
+        plan[idx] = rotation
+
+    if len(set(rotations)) != 1:
+        logging.info(f"🧭 Sampled pages disagree on rotation {rotations}; checking every page.")
+        return plan
+
+    doc_rotation = rotations[0]
+    shape_counts = Counter(_is_landscape(geometry[idx][1], geometry[idx][2]) for idx in sampled)
+    doc_shape = shape_counts.most_common(1)[0][0]
+    outliers = 0
+    for idx in candidates:
+        if plan[idx] is not None:
+            continue
+        if _is_landscape(geometry[idx][1], geometry[idx][2]) == doc_shape:
+            plan[idx] = doc_rotation
+        else:
+            outliers += 1
+
+    logging.info(
+        f"🧭 Document orientation {doc_rotation}° from {len(sampled)} sampled pages; "
+        f"{outliers} outlier pages will be re-checked."
+    )
+    return plan
@@ -0,0 +1,98 @@
+# --- modular_analyzer/page_journal.py ---
+"""Crash-safe, append-only journal of finished pages.
+
+Every page result is written to ``page_journal.jsonl`` in the run's output
+folder (and fsynced) as soon as the page is done, so a crash or Ctrl-C only
+loses pages that were still in flight.  The first line records the PDF, page
+count and run fingerprint; ``--resume`` reuses a journal only when they
+still match, skips the journaled pages and rebuilds every output from the
+journal plus the newly processed pages.  Pages journaled with a
+``PAGE_ERROR`` (the page raised) are processed again on resume.
+"""
+
+import json
+import logging
+import os
+
+JOURNAL_NAME = "page_journal.jsonl"
+JOURNAL_FORMAT = 1
+RESULT_KEYS = ("entry", "ticket_issue", "thumbnails", "timing", "issue_log")
+RETRY_ISSUE = "PAGE_ERROR"  # failures that may be transient, like in the page cache
+
+
+def journal_path(output_dir):
+    return os.path.join(output_dir, JOURNAL_NAME)
+
+
+def _header(pdf_path, page_count, fingerprint):
+    return {"journal": JOURNAL_FORMAT, "pdf_path": os.path.abspath(pdf_path),
+            "page_count": page_count, "fingerprint": fingerprint}
+
+
+def load_journal(path, pdf_path, page_count, fingerprint):
+    """
+    Read the pages journaled by an earlier run.
+    :return: Dict of page_idx -> result, empty when there is no usable journal.
+    """
+    if not os.path.exists(path):
+        return {}
+    pages = {}
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    try:
+        header = json.loads(lines[0]) if lines else None
+    except json.JSONDecodeError:
+        header = None
+    if header != _header(pdf_path, page_count, fingerprint):
+        logging.warning(f"⚠️ Journal {path} belongs to another PDF or configuration; starting over.")
+        return {}
+    for line_no, line in enumerate(lines[1:], start=2):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # Only the last line can be cut short by a crash; anything after it is ignored too.
+            logging.warning(f"⚠️ Ignoring truncated journal line {line_no} in {path}")
+            break
+        pages[record["page_idx"]] = record["result"]
+    return {idx: result for idx, result in pages.items() if result.get("ticket_issue") != RETRY_ISSUE}
+
+
+class PageJournal:
+    """Appends one fsynced JSON line per finished page."""
+
+    def __init__(self, path, pdf_path, page_count, fingerprint, resume=False):
+        self.path = path
+        header = _header(pdf_path, page_count, fingerprint)
+        self.pages = load_journal(path, pdf_path, page_count, fingerprint) if resume else {}
+        # Rewrite the kept pages atomically so a resumed run never appends after a torn line.
+        tmp_path = f"{path}.tmp"
+        self._file = open(tmp_path, "w", encoding="utf-8")
+        self._write(header)
+        for page_idx in sorted(self.pages):
+            self._write({"page_idx": page_idx, "result": self.pages[page_idx]})
+        self._file.close()
+        os.replace(tmp_path, path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, page_idx, result):
+        result = {key: result.get(key) for key in RESULT_KEYS}
+        self.pages[page_idx] = result
+        self._write({"page_idx": page_idx, "result": result})
+
+    def results(self):
+        """Every journaled result in page order."""
+        return [self.pages[page_idx] for page_idx in sorted(self.pages)]
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,48 +1,172 @@
 import logging
 import os
 
-from modular_analyzer.file_utils import load_yaml
-
-import cv2
 import numpy as np
-from modular_analyzer.file_utils import find_file_case_insensitive
-from modular_analyzer.image_utils import save_crop_and_thumbnail, save_field, sanitize_box
-from modular_analyzer.ocr_utils import (
-    initialize_reader,
-    read_text,
-    detect_handwriting,
-    is_handwriting_deep,
-    template_match,
-    ensure_region_array,
-    correct_image_orientation
+from modular_analyzer.config import OCR_CONFIG
+from modular_analyzer.crop_memo import crop_hash, get_crop_memo, memo_scope
+from modular_analyzer.engines import HANDWRITING, field_strategy, run_strategies
+from modular_analyzer.field_plan import compile_field_plan
+from modular_analyzer.handwriting import triage_handwriting, HANDWRITING_THRESHOLD
+from modular_analyzer.image_preprocessing import is_blank_page
+from modular_analyzer.image_utils import save_crop_and_thumbnail
+from modular_analyzer.model_registry import drain_load_counts, init_worker
+from modular_analyzer.orientation import USE_PDF_ROTATE
+from modular_analyzer.ocr_utils import ensure_region_array, detect_rotation
+from modular_analyzer.template_engine import match_vendor_templates
+from modular_analyzer.types import EngineResult, PageTask
+from modular_analyzer.vendor_layout import (
+    clamp_boxes,
+    field_pixel_boxes,
+    install_worker_layout,
+    layout_from_fields,
+    worker_layout,
 )
-from modular_analyzer.types import PageTask
 
-# Load OCR configuration
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), "configs", "ocr_config.yaml")
-OCR_CONFIG = load_yaml(CONFIG_PATH) if os.path.exists(CONFIG_PATH) else {}
 USE_ONNX_FALLBACK = OCR_CONFIG.get("use_onnx_fallback", True)
 ORIENTATION_METHOD = OCR_CONFIG.get("orientation_check", "tesseract")
+PRELOAD_MODELS = OCR_CONFIG.get("preload_models", ["doctr", "onnxruntime"] if USE_ONNX_FALLBACK else ["doctr"])
+WARMUP_MODELS = OCR_CONFIG.get("warmup_models", True)
+RENDER_MODE = OCR_CONFIG.get("render_mode", "page")
+STAGE_DPI = OCR_CONFIG.get("stage_dpi") or {}
+PROXY_DPI = STAGE_DPI.get("proxy", 72)
+OCR_DPI = STAGE_DPI.get("ocr", 200)
+SKIP_BLANK_PAGES = OCR_CONFIG.get("skip_blank_pages", False)
 
 logger = logging.getLogger(__name__)
 
-def simplify_field_name(field_name: str) -> str:
-    return field_name.split(".")[-1]
+
+def init_page_worker(model_names=(), warmup=False, threads=None, layout=None, plan=None, layouts=()):
+    """
+    Pool initializer: load models (see ``init_worker``) and keep the run's vendor layout and plan.
+    ``layouts`` holds extra ``(layout, plan)`` pairs when one pool serves several vendors.
+    """
+    init_worker(model_names, warmup, threads)
+    install_worker_layout(layout, plan)
+    for extra_layout, extra_plan in layouts:
+        install_worker_layout(extra_layout, extra_plan)
+
+
+def _as_image(region, region_array):
+    if region is not None:
+        return region
+    from PIL import Image
+    return Image.fromarray(region_array)
+
+
+def _recall_static_crops(crops, plan, vendor):
+    """
+    Look up static-content crops in the crop memo.
+    :return: ``(recalled, pending)``: name -> (engine, EngineResult) for hits, and
+             name -> (scope, hash) for static crops that still need OCR.
+    """
+    recalled, pending = {}, {}
+    static = [name for name in crops if plan[name].static_content]
+    memo = get_crop_memo() if static else None
+    if memo is None:
+        return recalled, pending
+    for name in static:
+        try:
+            scope, value = memo_scope(vendor, plan[name]), crop_hash(crops[name][1])
+            hit = memo.lookup(scope, value)
+        except Exception as e:
+            logging.warning(f"⚠️ Crop memo lookup failed for {name}: {e}")
+            continue
+        if hit:
+            engine, text, confidence = hit
+            recalled[name] = (engine, EngineResult(text, confidence))
+        else:
+            pending[name] = (scope, value)
+    return recalled, pending
+
+
+def _memoize_static_crops(pending, accepted):
+    memo = get_crop_memo() if pending else None
+    for name, (scope, value) in pending.items():
+        if name not in accepted:
+            continue
+        engine, result = accepted[name]
+        try:
+            memo.store(scope, value, engine, result.text, result.confidence)
+        except Exception as e:
+            logging.warning(f"⚠️ Could not memoize crop for {name}: {e}")
+
+
+def field_clip_regions(fields: dict) -> dict:
+    """Map each field with inch geometry to its clip rectangle (inches) and render DPI."""
+    regions = {}
+    for field_name, field_conf in fields.items():
+        if "position_inches" in field_conf and "size_inches" in field_conf:
+            x, y = field_conf["position_inches"]
+            w, h = field_conf["size_inches"]
+            dpi = field_conf.get("render_dpi", OCR_DPI)
+            regions[field_name] = ((x, y, x + w, y + h), dpi)
+    return regions
+
+
+def _downscale(img, from_dpi, to_dpi):
+    if from_dpi <= to_dpi:
+        return img
+    scale = to_dpi / from_dpi
+    return img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+
+
+def prepare_page_images(task: PageTask, fields: dict, page_num: int):
+    """
+    Produce the images each stage needs at its own resolution.
+    Orientation and blank checks look at a PROXY_DPI render; OCR crops come from
+    a page or clip render at OCR_DPI (or the caller's image at task.dpi).
+    Returns (img, img_dpi, clips, is_blank); img is None when the page is blank
+    or when every field was clip-rendered.
+    """
+    rotation = task.rotation
+    if rotation is None and task.pdf_path and USE_PDF_ROTATE:
+        from modular_analyzer.pdf_utils import get_page_rotation
+        if get_page_rotation(task.pdf_path, task.page_idx):
+            rotation = 0  # /Rotate is already applied when the page is rendered
+
+    needs_detection = rotation is None and ORIENTATION_METHOD != "none"
+    if needs_detection or SKIP_BLANK_PAGES:
+        if task.img is not None:
+            proxy = _downscale(task.img, task.dpi, PROXY_DPI)
+        else:
+            from modular_analyzer.pdf_utils import render_page
+            proxy = render_page(task.pdf_path, task.page_idx, dpi=PROXY_DPI)
+        if needs_detection:
+            rotation = detect_rotation(proxy, page_num=page_num, method=ORIENTATION_METHOD)
+        if SKIP_BLANK_PAGES and is_blank_page(np.array(proxy.convert("L"))):
+            return None, OCR_DPI, {}, True
+
+    rotation = rotation or 0
+    if task.img is not None:
+        img, img_dpi = task.img, task.dpi
+    elif RENDER_MODE == "clips" and rotation == 0:
+        from modular_analyzer.pdf_utils import render_clips
+        return None, OCR_DPI, render_clips(task.pdf_path, task.page_idx, field_clip_regions(fields)), False
+    else:
+        from modular_analyzer.pdf_utils import render_page
+        img, img_dpi = render_page(task.pdf_path, task.page_idx, dpi=OCR_DPI), OCR_DPI
+
+    if rotation:
+        img = img.rotate(-rotation, expand=True)
+    return img, img_dpi, {}, False
 
 
 def process_page(task: PageTask):
     import time
 
     page_idx = task.page_idx
-    img = task.img
-    fields = task.fields
     output_dir = task.output_dir
-
-    reader_std = initialize_reader("doctr")
-    reader_hand = initialize_reader("onnxruntime") if USE_ONNX_FALLBACK else None
+    layout, layout_plan = worker_layout(task.vendor)
+    if task.plan is not None:
+        plan = task.plan
+    elif layout_plan is not None:
+        plan = layout_plan
+    else:
+        plan = compile_field_plan(task.fields, task.vendor)
+    fields = {name: fp.conf for name, fp in plan.items() if fp.action != "skip"}
 
     page_num = page_idx + 1
-    img = correct_image_orientation(img, page_num=page_num, method=ORIENTATION_METHOD)
+    img, img_dpi, clips, is_blank = prepare_page_images(task, fields, page_num)
     crops_dir = os.path.join(output_dir, "crops")
     thumbnails_dir = os.path.join(output_dir, "thumbnails")
     logs_dir = os.path.join(output_dir, "logs")
@@ -65,32 +189,50 @@ def process_page(task: PageTask):
     logging.info(f"📄 Processing page {page_num}")
     start_time = time.time()
 
-    for field_name, field_conf in fields.items():
-        short_name = simplify_field_name(field_name)
-
-        if "box" not in field_conf:
+    if is_blank:
+        logging.info(f"⬜ Page {page_num} is blank, skipping OCR.")
+        ticket_issue = "BLANK_PAGE"
+        log_issue("BLANK_PAGE", "")
+        fields = {}
+
+    crops = {}
+    names = list(fields)
+    if names:
+        if layout is None or not set(names) <= set(layout.names):
+            layout = layout_from_fields(fields, task.vendor)
+        raw_boxes, has_box = field_pixel_boxes(layout, names, img_dpi)
+    page_array = boxes = valid = None
+
+    for i, field_name in enumerate(names):
+        if not has_box[i]:
             logging.warning(f"⚠️ Field '{field_name}' missing 'box', skipping.")
             log_issue("MISSING_BOX", field_name)
             continue
 
-        box = sanitize_box(field_conf["box"], *img.size)
-        if box is None:
-            logging.error(f"❌ Invalid sanitized box for {field_name} on page {page_num}: {field_conf['box']}")
-            entry[field_name] = "BOX_INVALID"
-            log_issue("BOX_INVALID", field_name)
-            continue
-
-        region = img.crop(box)
-        if region is None:
-            logging.error(f"❌ Cropped region is None for {field_name} on page {page_num}")
-            entry[field_name] = "REGION_NONE"
-            log_issue("REGION_NONE", field_name)
-            continue
-
-        region_array = ensure_region_array(region, field_name, page_num, entry)
-        if region_array is None:
-            log_issue("REGION_ARRAY_NONE", field_name)
-            continue
+        region = clips.get(field_name)
+        if region is not None:
+            region_array = ensure_region_array(region, field_name, page_num, entry)
+            if region_array is None:
+                log_issue("REGION_ARRAY_NONE", field_name)
+                continue
+        else:
+            if img is None:
+                # Field has no inch geometry to clip; fall back to the full page.
+                from modular_analyzer.pdf_utils import render_page
+                img = render_page(task.pdf_path, page_idx, dpi=img_dpi)
+            if boxes is None:
+                # Clamp every field box in one step and cut crops as views of one page array.
+                boxes, valid = clamp_boxes(raw_boxes, *img.size)
+                page_array = np.asarray(img)
+
+            if not valid[i]:
+                logging.error(f"❌ Invalid sanitized box for {field_name} on page {page_num}: "
+                              f"{tuple(raw_boxes[i])}")
+                entry[field_name] = "BOX_INVALID"
+                log_issue("BOX_INVALID", field_name)
+                continue
+            x0, y0, x1, y1 = boxes[i]
+            region_array = page_array[y0:y1, x0:x1]
         if not isinstance(region_array, np.ndarray):
             logging.error(f"❌ region_array is not ndarray for {field_name} on page {page_num}")
             entry[field_name] = "INVALID_ARRAY_TYPE"
@@ -102,31 +244,62 @@ def process_page(task: PageTask):
             log_issue("EMPTY_ARRAY", field_name)
             continue
 
-        if "ticket_number" in field_name:
-            try:
-                region_bgr = cv2.cvtColor(region_array, cv2.COLOR_RGB2BGR)
-            except Exception as e:
-                logging.error(f"❌ cvtColor failed for {field_name} on page {page_num}: {e}")
-                entry[field_name] = "CVTCOLOR_FAIL"
-                continue
+        if plan[field_name].action == "crop":
+            save_crop_and_thumbnail(_as_image(region, region_array), crops_dir,
+                                    f"{plan[field_name].short_name}_{page_num}", thumbnails_dir, thumbnail_log)
+            continue
 
-            if region_bgr is None or not isinstance(region_bgr, np.ndarray):
-                logging.error(f"❌ region_bgr is None or invalid for {field_name} on page {page_num}")
-                entry[field_name] = "BGR_INVALID"
-                continue
+        entry[field_name] = None  # keep column order; filled in once OCR has run
+        crops[field_name] = (region, region_array)
 
-            texts = read_text(region_bgr, backend="doctr")
-            if texts:
-                entry[field_name] = texts[0][1]
-                logging.info(f"✅ Found ticket number: {texts[0][1]} on page {page_num}")
-            else:
+    recalled, memo_pending = _recall_static_crops(crops, plan, task.vendor)
+    if recalled:
+        logging.info(f"♻️ Reused OCR for {len(recalled)} static field(s) on page {page_num}")
+    to_read = {name: arr for name, (_, arr) in crops.items() if name not in recalled}
+
+    handwriting_scores = {}
+    if USE_ONNX_FALLBACK:
+        try:
+            handwriting_scores = triage_handwriting(
+                {name: arr for name, arr in to_read.items() if plan[name].engine == "auto"}
+            )
+        except Exception as e:
+            logging.exception(f"❌ Handwriting triage failed on page {page_num}: {e}")
+
+    strategies = {
+        name: field_strategy(plan[name], handwriting_scores.get(name, 0.0), HANDWRITING_THRESHOLD, USE_ONNX_FALLBACK)
+        for name in to_read
+    }
+    accepted, memo = run_strategies(to_read, strategies, plan)
+    _memoize_static_crops(memo_pending, accepted)
+    accepted.update(recalled)
+
+    for field_name, (region, region_array) in crops.items():
+        short_name = plan[field_name].short_name
+        try:
+            attempts = memo.results_for(field_name)
+            for engine, result in attempts.items():
+                if result.error:
+                    log_issue("HANDWRITING_ERROR" if engine == HANDWRITING else "OCR_ERROR", field_name)
+                elif engine == HANDWRITING and not result.text:
+                    logging.warning(f"⚠️ Handwriting OCR unreadable for: {field_name}")
+                    log_issue("HANDWRITING_UNREADABLE", field_name)
+
+            if field_name in accepted:
+                engine, result = accepted[field_name]
+                entry[field_name] = result.text
+                if engine == HANDWRITING:
+                    logging.info(f"✍️ Handwritten field '{field_name}': {result.text}")
+                else:
+                    logging.info(f"📝 Printed field '{field_name}': {result.text}")
+            elif plan[field_name].template_fallback:
                 logging.warning(f"❌ Ticket number missing on page {page_num}, trying template match.")
-                template_path = find_file_case_insensitive("ticket_template.jpg", "modular_analyzer/templates")
+                matched, template_path, score, _ = match_vendor_templates(region_array, task.vendor)
                 if template_path:
-                    matched, _ = template_match(region, template_path)
                     if matched:
                         entry[field_name] = "TemplateMatch"
-                        logging.info(f"🔍 Template match succeeded for page {page_num}")
+                        logging.info(f"🔍 Template match succeeded for page {page_num} "
+                                     f"({os.path.basename(template_path)}, score {score:.2f})")
                     else:
                         entry[field_name] = "MISSING"
                         ticket_issue = "MISSING"
@@ -135,98 +308,17 @@ def process_page(task: PageTask):
                 else:
                     entry[field_name] = "MISSING"
                     ticket_issue = "MISSING"
-                    logging.error("🛑 Template file 'ticket_template.jpg' not found.")
+                    logging.error(f"🛑 No template files found for vendor '{task.vendor}'.")
                     log_issue("TEMPLATE_NOT_FOUND", field_name)
-
-            save_crop_and_thumbnail(region, crops_dir, f"{short_name}_{page_num}", thumbnails_dir, thumbnail_log)
-            continue
-
-        try:
-            is_handwritten = False
-            if USE_ONNX_FALLBACK:
-                is_handwritten = detect_handwriting(region) or is_handwriting_deep(region)
-            text_value = None
-
-            if is_handwritten and reader_hand is not None:
-                from modular_analyzer.image_preprocessing import preprocess_for_onnx, decode_onnx_output
-
-                region_for_onnx = region_array
-                if region_for_onnx.ndim == 2 or region_for_onnx.shape[2] != 3:
-                    region_for_onnx = cv2.cvtColor(region_for_onnx, cv2.COLOR_GRAY2BGR)
-                    logging.warning(f"⚠️ Converted grayscale to BGR for {field_name} on page {page_num}")
-
-                try:
-                    preprocessed = preprocess_for_onnx(region_for_onnx)
-                    preds = reader_hand.run(None, {reader_hand.get_inputs()[0].name: preprocessed})[0]
-                    decoded = decode_onnx_output(preds)
-                    if decoded:
-                        text_value = decoded
-                        logging.info(f"✍️ Handwritten field '{field_name}': {decoded}")
-                    else:
-                        logging.warning(f"⚠️ Handwriting OCR unreadable for: {field_name}")
-                        log_issue("HANDWRITING_UNREADABLE", field_name)
-                except Exception as e:
-                    logging.error(f"❌ ONNX handwriting OCR failed for {field_name} on page {page_num}: {e}")
-                    log_issue("HANDWRITING_ERROR", field_name)
-
-            if text_value is None:
-                try:
-                    region_bgr = cv2.cvtColor(region_array, cv2.COLOR_RGB2BGR) if region_array.ndim == 3 else cv2.cvtColor(region_array, cv2.COLOR_GRAY2BGR)
-                    texts = read_text(region_bgr, backend="doctr")
-                    if texts:
-                        text_value = texts[0][1]
-                        logging.info(f"📝 Printed field '{field_name}': {text_value}")
-                    else:
-                        text_value = "TEXT_NOT_FOUND"
-                        logging.warning(f"⚠️ Printed OCR failed for: {field_name}")
-                except Exception as e:
-                    text_value = "OCR_ERROR"
-                    logging.error(f"❌ Printed OCR failed for {field_name} on page {page_num}: {e}")
-                    entry[field_name] = "HANDWRITING_ERROR"
-                    logging.error(f"❌ Exception while processing handwriting for {field_name} on page {page_num}: {e}")
-                    log_issue("HANDWRITING_ERROR", field_name)
-
-            entry[field_name] = text_value
-            if is_handwritten:
-                save_field(region, crops_dir, f"{short_name}_{page_num}")
-                save_crop_and_thumbnail(region, crops_dir, f"{short_name}_{page_num}", thumbnails_dir, thumbnail_log)
-            if USE_ONNX_FALLBACK and reader_hand is not None:
-                logging.debug(f"🧪 Calling preprocess_for_onnx on shape={region_array.shape}, dtype={region_array.dtype}")
-                try:
-                    if not isinstance(region_array, np.ndarray) or region_array.ndim != 3:
-                        raise ValueError(f"Invalid image shape: {getattr(region_array, 'shape', None)}")
-
-                    if region_array.shape[2] != 3:
-                        region_array = cv2.cvtColor(region_array, cv2.COLOR_GRAY2BGR)
-                        logging.warning(f"⚠️ Converted grayscale to BGR for {field_name} on page {page_num}")
-
-                    from modular_analyzer.image_preprocessing import preprocess_for_onnx, decode_onnx_output
-
-                    preprocessed = preprocess_for_onnx(region_array)
-                    preds = reader_hand.run(None, {reader_hand.get_inputs()[0].name: preprocessed})[0]
-                    decoded = decode_onnx_output(preds)
-
-                    if decoded:
-                        entry[field_name] = decoded
-                        logging.info(f"✍️ Handwritten field '{field_name}': {decoded}")
-                    else:
-                        entry[field_name] = "HANDWRITING_UNREADABLE"
-                        logging.warning(f"⚠️ Handwriting OCR unreadable for: {field_name}")
-                        log_issue("HANDWRITING_UNREADABLE", field_name)
-                except Exception as e:
-                    entry[field_name] = "HANDWRITING_ERROR"
-                    logging.error(f"❌ Exception while processing handwriting for {field_name} on page {page_num}: {e}")
-                    log_issue("HANDWRITING_ERROR", field_name)
+            elif attempts and all(result.error for result in attempts.values()):
+                entry[field_name] = "OCR_ERROR"
             else:
-                texts = read_text(region_array, backend="doctr")
-                if texts:
-                    entry[field_name] = texts[0][1]
-                    logging.info(f"📝 Printed field '{field_name}': {texts[0][1]}")
-                else:
-                    entry[field_name] = "TEXT_NOT_FOUND"
-                    logging.warning(f"⚠️ Printed OCR failed for: {field_name}")
-                    log_issue("TEXT_NOT_FOUND", field_name)
-                save_crop_and_thumbnail(region, crops_dir, f"{short_name}_{page_num}", thumbnails_dir, thumbnail_log)
+                entry[field_name] = "TEXT_NOT_FOUND"
+                logging.warning(f"⚠️ OCR found no text for: {field_name}")
+                log_issue("TEXT_NOT_FOUND", field_name)
+
+            save_crop_and_thumbnail(_as_image(region, region_array), crops_dir, f"{short_name}_{page_num}",
+                                    thumbnails_dir, thumbnail_log)
 
         except Exception as e:
             entry[field_name] = "GENERAL_ERROR"
@@ -242,4 +334,35 @@ def process_page(task: PageTask):
         "thumbnails": thumbnail_log,
         "timing": {"Page": page_num, "DurationSeconds": duration},
         "issue_log": issue_log,
+        "model_loads": drain_load_counts(),
     }
+
+
+def page_error_result(task: PageTask, error):
+    """Result for a page whose processing raised, shaped like a normal page result."""
+    page_num = task.page_idx + 1
+    return {
+        "entry": {"Page": page_num},
+        "ticket_issue": "PAGE_ERROR",
+        "thumbnails": [],
+        "timing": {"Page": page_num, "DurationSeconds": 0},
+        "issue_log": [{"Page": page_num, "IssueType": "PAGE_ERROR", "FieldName": ""}],
+        "model_loads": drain_load_counts(),
+        "error": str(error),
+    }
+
+
+def process_page_safely(task: PageTask):
+    """
+    ``process_page`` for multi-document runs: a page that raises comes back as a
+    ``page_error_result`` instead of ending the pool run, and every result is
+    tagged with its task's ``pdf_path`` and ``page_idx``.
+    """
+    try:
+        result = process_page(task)
+    except Exception as e:
+        logging.exception(f"❌ Page {task.page_idx + 1} of {task.pdf_path} failed: {e}")
+        result = page_error_result(task, e)
+    result["pdf_path"] = task.pdf_path
+    result["page_idx"] = task.page_idx
+    return result
@@ -1,8 +1,13 @@
 # --- modular_analyzer/pdf_utils.py ---
 
+import logging
+
 import fitz
 from PIL import Image
 
+# Per-process handle so a worker opens each PDF once, not once per page.
+_open_doc = {"path": None, "doc": None}
+
 
 def convert_pdf_to_images(pdf_path):
     """
@@ -19,15 +24,172 @@ def convert_pdf_to_images(pdf_path):
     return images
 
 
+def get_page_count(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def get_page_geometry(pdf_path):
+    """Return ``(rotate, width, height)`` per page without rendering anything."""
+    with fitz.open(pdf_path) as doc:
+        return [(page.rotation, page.rect.width, page.rect.height) for page in doc]
+
+
+def get_page_rotation(pdf_path, page_idx):
+    """Return the ``/Rotate`` value of one page using the per-process document handle."""
+    return _get_document(pdf_path).load_page(page_idx).rotation
+
+
+def _get_document(pdf_path):
+    if _open_doc["path"] != pdf_path:
+        close_cached_document()
+        _open_doc["doc"] = fitz.open(pdf_path)
+        _open_doc["path"] = pdf_path
+    return _open_doc["doc"]
+
+
+def page_content_hash(pdf_path, page_idx):
+    """
+    Hash what a page draws without rendering it: its geometry, content
+    stream(s) and the raw streams of the images it references.
+    """
+    import hashlib
+
+    doc = _get_document(pdf_path)
+    page = doc.load_page(page_idx)
+    h = hashlib.sha256()
+    h.update(f"{page.rect}|{page.rotation}".encode("utf-8"))
+    h.update(page.read_contents())
+    for image in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(image[0]) or b"")
+    return h.hexdigest()
+
+
+def close_cached_document():
+    if _open_doc["doc"] is not None:
+        _open_doc["doc"].close()
+    _open_doc["path"] = None
+    _open_doc["doc"] = None
+
+
+def render_page(pdf_path, page_idx, dpi=72):
+    """
+    Render a single page to a PIL Image at ``dpi`` inside the calling process.
+    The document handle is cached, so consecutive pages of the same PDF
+    handled by one worker reuse it.
+    """
+    page = _get_document(pdf_path).load_page(page_idx)
+    zoom = dpi / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+def render_clips(pdf_path, page_idx, clips):
+    """
+    Rasterize only the given regions of a page, each at its own DPI.
+    :param clips: Mapping of key -> ((x0, y0, x1, y1) in inches, dpi).
+    :return: Mapping of key -> PIL Image; keys whose region is empty are omitted.
+    """
+    page = _get_document(pdf_path).load_page(page_idx)
+    page_rect = page.rect
+    images = {}
+    for key, (rect_inches, dpi) in clips.items():
+        rect = fitz.Rect(*(v * 72 for v in rect_inches)) & page_rect
+        if rect.is_empty:
+            continue
+        zoom = dpi / 72
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=rect)
+        images[key] = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    return images
+
+
 # === IMPROVEMENT: pdf_utils.py > process_pages_concurrently ===
+from collections import deque
 from multiprocessing import Pool
 
 
-def process_pages_concurrently(args_list, processor):
-    with Pool() as pool:
-        results = pool.map(processor, args_list)
+def _imap_governed(pool, tasks, processor, budget, tuner):
+    # Keep at most `limit` pages in flight and yield them in task order.
+    from modular_analyzer.cpu_budget import run_with_threads
+
+    pending = deque()
+    for task in tasks:
+        while len(pending) >= (tuner.limit if tuner else budget.workers):
+            yield pending.popleft().get()
+            if tuner:
+                tuner.record()
+        pending.append(pool.apply_async(run_with_threads, (processor, budget.threads, task)))
+    while pending:
+        yield pending.popleft().get()
+        if tuner:
+            tuner.record()
+
+
+def _imap_on(pool, tasks, processor, chunksize, budget, tuner):
+    if budget:
+        return _imap_governed(pool, tasks, processor, budget, tuner)
+    return pool.imap(processor, tasks, chunksize=chunksize)
+
+
+def _run_pool(tasks, processor, initializer, initargs, chunksize, budget, tuner, pool=None):
+    if pool is not None:
+        yield from _imap_on(pool, tasks, processor, chunksize, budget, tuner)
+        return
+    # Forked workers would inherit an open handle and share its file offset, so their renders race.
+    close_cached_document()
+    processes = budget.workers if budget else None
+    with Pool(processes=processes, initializer=initializer, initargs=initargs) as pool:
+        yield from _imap_on(pool, tasks, processor, chunksize, budget, tuner)
+
+
+def _imap_cached(tasks, run, cache, cache_key):
+    # Serve cached pages directly and send only the misses to the pool, keeping task order.
+    from modular_analyzer.result_cache import IDENTITY_KEYS
+    tasks = list(tasks)
+    keys = [cache_key(task) for task in tasks]
+    close_cached_document()  # hashing opened the PDF here; a pool forked later must not inherit it
+    cached = cache.get_many(keys)
+    misses = [task for task, key in zip(tasks, keys) if key not in cached]
+    logging.info(f"♻️ Page cache: {len(tasks) - len(misses)} hits, {len(misses)} pages to process")
+
+    computed = run(misses) if misses else iter(())
+    for task, key in zip(tasks, keys):
+        if key in cached:
+            hit = dict(cached[key])
+            for name in IDENTITY_KEYS:
+                if hasattr(task, name):
+                    hit[name] = getattr(task, name)
+            yield hit
+            continue
+        result = next(computed)
+        cache.put(key, result)
+        yield result
+    cache.evict()
+
+
+def imap_pages(tasks, processor, initializer=None, initargs=(), chunksize=1, budget=None, tuner=None,
+               cache=None, cache_key=None, pool=None):
+    """
+    Yield page results in task order as soon as each one is ready.
+    ``tasks`` may be a lazy iterable; only small task objects cross the
+    process boundary when they carry a ``pdf_path`` instead of an image.
+    With a ``CpuBudget`` the pool has ``budget.workers`` processes and each page
+    runs with the budget's thread split; a ``ThroughputTuner`` additionally
+    picks how many pages are in flight.
+    With a ``PageResultCache`` and a ``cache_key(task)`` callable, pages whose key
+    already has a result are not processed again.
+    An existing ``pool`` (already initialized, e.g. by a long-running service) is
+    used as is and left open; otherwise a pool is created for this call.
+    """
+    def run(pending):
+        return _run_pool(pending, processor, initializer, initargs, chunksize, budget, tuner, pool)
 
-    # Filter out None results
-    return [r for r in results if r is not None]
+    results = _imap_cached(tasks, run, cache, cache_key) if cache is not None else run(tasks)
+    for result in results:
+        if result is not None:
+            yield result
 
 
+def process_pages_concurrently(args_list, processor, initializer=None, initargs=(), chunksize=1,
+                               budget=None, tuner=None, cache=None, cache_key=None):
+    return list(imap_pages(args_list, processor, initializer, initargs, chunksize, budget, tuner, cache, cache_key))
@@ -0,0 +1,147 @@
+# --- modular_analyzer/result_cache.py ---
+"""Persistent, content-addressed cache of page results.
+
+A page's key hashes three things: its content (the PDF page's content
+stream plus the raw streams of the images it draws), the run fingerprint
+(compiled vendor layout, field plan and engine configuration) and a format
+version.  Re-running a PDF after changing one vendor config or fixing one
+page therefore only re-processes pages whose key changed.  Results live in
+SQLite under ``output/`` and the least recently used rows are evicted once
+the cache grows past ``max_entries``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from modular_analyzer.config import OCR_CONFIG
+
+PAGE_CACHE_CONFIG = OCR_CONFIG.get("page_cache") or {}
+PAGE_CACHE_ENABLED = PAGE_CACHE_CONFIG.get("enabled", True)
+PAGE_CACHE_PATH = PAGE_CACHE_CONFIG.get("path", os.path.join("output", "cache", "page_results.sqlite"))
+PAGE_CACHE_MAX_ENTRIES = PAGE_CACHE_CONFIG.get("max_entries", 50000)
+CACHE_FORMAT = 1
+
+# Results with these issues may be transient (e.g. a model failed to load) and are never cached.
+UNCACHEABLE_ISSUES = {"OCR_ERROR", "HANDWRITING_ERROR", "GENERAL_ERROR", "PAGE_ERROR"}
+# Which task a result came from; keys follow page content, so a hit is re-tagged for the task that asked.
+IDENTITY_KEYS = ("pdf_path", "page_idx")
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+        return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    except (OSError, TypeError):
+        return f"{path}:missing"
+
+
+def run_fingerprint(layout, plan):
+    """Hash everything besides the page itself that decides a page's result."""
+    plan_rows = sorted(
+        (fp.name, fp.action, fp.engine, fp.printed_backend, fp.decoder, fp.template_fallback)
+        for fp in plan.values()
+    )
+    model_stamps = sorted(_file_stamp(p) for p in (layout.model_paths or {}).values())
+    template_stamps = sorted(_file_stamp(p) for p in layout.template_paths)
+    engine_config = json.dumps(OCR_CONFIG, sort_keys=True, default=str)
+    return _digest(CACHE_FORMAT, layout.yaml_hash, plan_rows, model_stamps, template_stamps, engine_config)
+
+
+def page_cache_key(task, fingerprint):
+    """
+    Key for one ``PageTask``. Page number, rotation and output folder are part of
+    the key because results name their crops and thumbnails after them.
+    """
+    from modular_analyzer.pdf_utils import page_content_hash
+    content = page_content_hash(task.pdf_path, task.page_idx)
+    return _digest(content, task.page_idx, task.rotation, os.path.abspath(task.output_dir), fingerprint)
+
+
+def is_cacheable(result):
+    if not result:
+        return False
+    return not any(issue.get("IssueType") in UNCACHEABLE_ISSUES for issue in result.get("issue_log", []))
+
+
+class PageResultCache:
+    """SQLite-backed ``key -> page result`` store with LRU eviction."""
+
+    def __init__(self, path=PAGE_CACHE_PATH, max_entries=PAGE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS page_results ("
+            " key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON page_results (last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """Return ``{key: result}`` for the keys that are cached and still usable."""
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, result FROM page_results WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, payload in rows:
+                result = json.loads(payload)
+                # Crops/thumbnails are files in the output folder; a result is only reusable while they exist.
+                if all(os.path.exists(t["ThumbnailPath"]) for t in result.get("thumbnails", [])):
+                    found[key] = result
+        if found:
+            now = time.time()
+            self._conn.executemany("UPDATE page_results SET last_used = ? WHERE key = ?",
+                                   [(now, key) for key in found])
+            self._conn.commit()
+        return found
+
+    def put(self, key, result):
+        if not is_cacheable(result):
+            return
+        stored = {k: v for k, v in result.items() if k not in IDENTITY_KEYS}
+        stored["model_loads"] = {}
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO page_results (key, result, created, last_used) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(stored, default=str), now, now),
+        )
+        self._conn.commit()
+
+    def evict(self):
+        """Drop the least recently used rows beyond ``max_entries``."""
+        if not self.max_entries:
+            return 0
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM page_results").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM page_results WHERE key IN (SELECT key FROM page_results ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+        logging.info(f"🧹 Evicted {excess} cached page results")
+        return excess
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM page_results").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
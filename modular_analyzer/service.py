@@ -0,0 +1,271 @@
+# --- modular_analyzer/service.py ---
+"""Local analysis service that keeps the worker pool and models resident.
+
+Usage:
+    python -m modular_analyzer.service serve
+    python -m modular_analyzer.service submit scans/Lindamood_0412.pdf [--vendor Lindamood] [--fields ticket_number]
+
+The server listens on ``service.host``/``service.port`` (localhost by
+default).  At startup it compiles every vendor layout and starts one warm
+pool; each ``POST /jobs`` with ``{"pdf_path": ..., "vendor": ..., "fields": [...]}``
+runs on that pool and streams NDJSON events back as pages finish:
+``job``, then one ``page`` per page (in page order), then ``done``; a failed
+job ends with ``error``.  Jobs run one at a time.  ``GET /health`` reports
+the loaded vendors.  Editing a vendor YAML restarts the workers on the next
+job for that vendor.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Pool
+from pathlib import Path
+
+from modular_analyzer.batch_runner import (
+    CONFIGS_DIR, OUTPUT_DIR, compile_vendor, match_vendor, prepare_document, vendor_configs, write_outputs
+)
+from modular_analyzer.config import OCR_CONFIG
+from modular_analyzer.cpu_budget import plan_cpu_budget
+from modular_analyzer.field_plan import compile_field_plan
+from modular_analyzer.model_registry import prepare_onnx_models
+from modular_analyzer.page_journal import RESULT_KEYS
+from modular_analyzer.page_processor import PRELOAD_MODELS, WARMUP_MODELS, init_page_worker, process_page_safely
+from modular_analyzer.pdf_utils import close_cached_document, imap_pages
+from modular_analyzer.result_cache import PAGE_CACHE_ENABLED, PageResultCache, page_cache_key, run_fingerprint
+
+SERVICE_CONFIG = OCR_CONFIG.get("service") or {}
+HOST = SERVICE_CONFIG.get("host", "127.0.0.1")
+PORT = SERVICE_CONFIG.get("port", 8765)
+
+
+class AnalysisService:
+    """Owns the vendor layouts and the warm pool; runs jobs one at a time."""
+
+    def __init__(self, configs_dir=CONFIGS_DIR, output_root=OUTPUT_DIR, budget=None):
+        self.configs_dir = configs_dir
+        self.output_root = output_root
+        self.budget = budget or plan_cpu_budget()
+        self.layouts = {}  # vendor -> (layout, plan, fingerprint)
+        self.pool = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        for yaml_file in vendor_configs(self.configs_dir):
+            vendor = os.path.splitext(yaml_file)[0]
+            entry = compile_vendor(vendor, os.path.join(self.configs_dir, yaml_file))
+            if entry is not None:
+                self.layouts[vendor] = entry
+        prepare_onnx_models(PRELOAD_MODELS)
+        self._start_pool()
+        logging.info(f"🟢 Service ready: {len(self.layouts)} vendor(s), {self.budget.workers} worker(s)")
+
+    def _start_pool(self):
+        close_cached_document()  # workers must open PDFs themselves, not share the parent's handle
+        self.pool = Pool(
+            processes=self.budget.workers, initializer=init_page_worker,
+            initargs=(PRELOAD_MODELS, WARMUP_MODELS, self.budget.threads, None, None,
+                      [(layout, plan) for layout, plan, _ in self.layouts.values()]),
+        )
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def _vendor_entry(self, vendor, yaml_path):
+        entry = compile_vendor(vendor, yaml_path)
+        if entry is None:
+            raise ValueError(f"Vendor '{vendor}' has no templates")
+        current = self.layouts.get(vendor)
+        if current is None or current[2] != entry[2]:
+            # Workers only learn layouts at startup, so a changed YAML needs fresh workers.
+            logging.info(f"🔁 Layout for '{vendor}' changed; restarting workers")
+            self.layouts[vendor] = entry
+            self.stop()
+            self._start_pool()
+        return self.layouts[vendor]
+
+    def _resolve_vendor(self, pdf_path, vendor):
+        if vendor:
+            yaml_path = os.path.join(self.configs_dir, f"{vendor}.yaml")
+            if not os.path.exists(yaml_path):
+                raise ValueError(f"Unknown vendor '{vendor}'")
+            return vendor, yaml_path
+        vendor, yaml_path = match_vendor(Path(pdf_path).stem, vendor_configs(self.configs_dir), self.configs_dir)
+        if not vendor:
+            raise ValueError(f"No vendor config matches {os.path.basename(pdf_path)}")
+        return vendor, yaml_path
+
+    def run_job(self, pdf_path, vendor=None, fields=None, write=True):
+        """
+        Process one PDF on the warm pool.
+        :return: Generator of event dicts; it raises ``ValueError`` on the first
+                 ``next()`` when the job is invalid.
+        """
+        with self._lock:
+            start = time.time()
+            pdf_path = os.path.abspath(pdf_path or "")
+            if not os.path.isfile(pdf_path):
+                raise ValueError(f"PDF not found: {pdf_path}")
+            vendor, yaml_path = self._resolve_vendor(pdf_path, vendor)
+            layout, plan, fingerprint = self._vendor_entry(vendor, yaml_path)
+            job_plan = None
+            if fields:
+                job_plan = compile_field_plan(layout.fields, vendor, only_fields=fields)
+                fingerprint = run_fingerprint(layout, job_plan)
+            doc, tasks = prepare_document(pdf_path, vendor, fingerprint, self.output_root, plan=job_plan)
+            yield {"event": "job", "pdf_path": pdf_path, "vendor": vendor, "pages": doc.page_count,
+                   "output_dir": doc.output_dir}
+
+            cache = PageResultCache() if PAGE_CACHE_ENABLED else None
+            try:
+                results = imap_pages(
+                    tasks, process_page_safely, budget=self.budget, pool=self.pool,
+                    cache=cache, cache_key=lambda task: page_cache_key(task, fingerprint),
+                )
+                pending = {task.page_idx for task in tasks}
+                for result in results:
+                    if result["page_idx"] not in pending:
+                        continue
+                    pending.discard(result["page_idx"])
+                    doc.journal.append(result["page_idx"], result)
+                    event = {"event": "page", "page": result["page_idx"] + 1,
+                             "result": {key: result.get(key) for key in RESULT_KEYS}}
+                    if result.get("error"):
+                        event["error"] = result["error"]
+                    yield event
+                if pending:
+                    logging.error(f"❌ {len(pending)} page(s) of {doc.name} returned no result")
+            finally:
+                doc.journal.close()
+                close_cached_document()
+                if cache is not None:
+                    cache.close()
+            if write:
+                write_outputs(doc.journal.results(), doc.output_dir, doc.name)
+            yield {"event": "done", "pages": doc.page_count, "output_dir": doc.output_dir,
+                   "seconds": round(time.time() - start, 2)}
+
+
+def _handler_for(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._send_json(404, {"error": "not found"})
+            self._send_json(200, {"status": "ok", "vendors": sorted(service.layouts),
+                                  "workers": service.budget.workers})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                return self._send_json(404, {"error": "not found"})
+            try:
+                job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                events = service.run_job(job.get("pdf_path"), job.get("vendor"), job.get("fields"),
+                                         job.get("write_outputs", True))
+                first = next(events)
+            except (ValueError, TypeError, AttributeError) as e:
+                return self._send_json(400, {"error": str(e)})
+            except Exception as e:  # e.g. a corrupt PDF or an unwritable output folder
+                logging.exception(f"❌ Job could not start: {e}")
+                return self._send_json(500, {"error": str(e)})
+
+            # HTTP/1.0 without Content-Length: the stream ends when the connection closes.
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            try:
+                self._stream(first)
+                for event in events:
+                    self._stream(event)
+            except (BrokenPipeError, ConnectionResetError):
+                logging.warning("⚠️ Client disconnected; abandoning job")
+            except Exception as e:
+                logging.exception(f"❌ Job failed: {e}")
+                self._stream({"event": "error", "message": str(e)})
+            finally:
+                events.close()
+
+        def _stream(self, event):
+            self.wfile.write((json.dumps(event, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            logging.debug("service: " + format, *args)
+
+    return Handler
+
+
+def make_server(service, host=HOST, port=PORT):
+    return ThreadingHTTPServer((host, port), _handler_for(service))
+
+
+def serve(host=HOST, port=PORT):
+    service = AnalysisService()
+    service.start()
+    server = make_server(service, host, port)
+    logging.info(f"🌐 Listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+def submit_job(pdf_path, vendor=None, fields=None, host=HOST, port=PORT, write=True):
+    """Send a job to a running service and yield its events as they arrive."""
+    import urllib.request
+
+    payload = {"pdf_path": os.path.abspath(pdf_path), "vendor": vendor, "fields": fields, "write_outputs": write}
+    request = urllib.request.Request(f"http://{host}:{port}/jobs", data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request) as response:
+        for line in response:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resident analysis service")
+    sub = parser.add_subparsers(dest="command", required=True)
+    srv = sub.add_parser("serve", help="Start the service")
+    srv.add_argument("--host", default=HOST)
+    srv.add_argument("--port", type=int, default=PORT)
+    job = sub.add_parser("submit", help="Analyze a PDF on a running service")
+    job.add_argument("pdf_path")
+    job.add_argument("--vendor", default=None)
+    job.add_argument("--fields", nargs="+", metavar="FIELD")
+    job.add_argument("--host", default=HOST)
+    job.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        from modular_analyzer.logger_utils import setup_logger
+        setup_logger()
+        serve(args.host, args.port)
+    else:
+        import urllib.error
+        try:
+            for event in submit_job(args.pdf_path, args.vendor, args.fields, args.host, args.port):
+                print(json.dumps(event), flush=True)
+        except urllib.error.HTTPError as e:
+            print(e.read().decode("utf-8"))
+            return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
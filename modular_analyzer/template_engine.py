@@ -0,0 +1,166 @@
+# --- modular_analyzer/template_engine.py ---
+"""Coarse-to-fine template matching with per-worker template caches.
+
+Each template is read from disk once per process and stored as a small
+image pyramid.  Matching runs ``matchTemplate`` on a downscaled crop first and
+then only refines a window around the coarse peak at full resolution.  A
+vendor may have several templates: those listed under
+``template_matching.vendor_templates``, or every image in
+``templates/<vendor>/``, falling back to ``ticket_template.jpg``.
+"""
+
+import logging
+import os
+
+import cv2
+import numpy as np
+
+from modular_analyzer.config import OCR_CONFIG
+
+TEMPLATE_CONFIG = OCR_CONFIG.get("template_matching") or {}
+TEMPLATE_DIR = TEMPLATE_CONFIG.get("template_dir", os.path.join(os.path.dirname(__file__), "templates"))
+DEFAULT_TEMPLATES = TEMPLATE_CONFIG.get("default_templates", ["ticket_template.jpg"])
+VENDOR_TEMPLATES = TEMPLATE_CONFIG.get("vendor_templates") or {}
+MATCH_THRESHOLD = TEMPLATE_CONFIG.get("threshold", 0.7)
+PYRAMID_LEVELS = TEMPLATE_CONFIG.get("pyramid_levels", 2)
+MIN_COARSE_SIDE = TEMPLATE_CONFIG.get("min_coarse_side", 12)
+REFINE_MARGIN = TEMPLATE_CONFIG.get("refine_margin", 2)
+
+_IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+_templates = {}  # path -> list of pyramid levels (level 0 = full resolution)
+_vendor_paths = {}  # vendor -> template paths
+
+
+def build_pyramid(gray, levels=PYRAMID_LEVELS):
+    pyramid = [gray]
+    for _ in range(levels):
+        prev = pyramid[-1]
+        if min(prev.shape[:2]) < 2 * MIN_COARSE_SIDE:
+            break
+        pyramid.append(cv2.pyrDown(prev))
+    return pyramid
+
+
+def load_template(path):
+    """Return the cached grayscale pyramid for ``path``, reading the file on first use."""
+    if path not in _templates:
+        template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if template is None:
+            raise FileNotFoundError(f"Template image not found: {path}")
+        _templates[path] = build_pyramid(template)
+    return _templates[path]
+
+
+def _find_case_insensitive(directory, name):
+    try:
+        entries = os.listdir(directory)
+    except OSError:
+        return None
+    for entry in entries:
+        if entry.lower() == name.lower():
+            return os.path.join(directory, entry)
+    return None
+
+
+def resolve_template_paths(vendor):
+    """Look up the template files used for ``vendor`` on disk."""
+    names = VENDOR_TEMPLATES.get(vendor)
+    vendor_dir = _find_case_insensitive(TEMPLATE_DIR, vendor) if vendor else None
+    if names:
+        paths = [_find_case_insensitive(TEMPLATE_DIR, name) for name in names]
+    elif vendor_dir and os.path.isdir(vendor_dir):
+        paths = [os.path.join(vendor_dir, f) for f in sorted(os.listdir(vendor_dir)) if f.lower().endswith(_IMAGE_EXTS)]
+    else:
+        paths = [_find_case_insensitive(TEMPLATE_DIR, name) for name in DEFAULT_TEMPLATES]
+
+    paths = [p for p in paths if p]
+    if not paths:
+        logging.error(f"🛑 No templates found for vendor '{vendor}' in {TEMPLATE_DIR}")
+    return paths
+
+
+def template_paths(vendor):
+    """Resolve (once per process) the template files used for ``vendor``."""
+    if vendor not in _vendor_paths:
+        _vendor_paths[vendor] = resolve_template_paths(vendor)
+    return _vendor_paths[vendor]
+
+
+def prime_template_paths(vendor, paths):
+    """Reuse template paths resolved elsewhere (e.g. in a compiled vendor layout)."""
+    _vendor_paths[vendor] = list(paths)
+
+
+def _best_match(image, template):
+    res = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return max_val, max_loc
+
+
+def match_pyramid(image_gray, template_pyramid):
+    """
+    Locate a template in ``image_gray``.
+    :return: ``(score, (x, y))`` at full resolution, or ``(-1.0, None)`` when the
+             template does not fit inside the image.
+    """
+    template = template_pyramid[0]
+    th, tw = template.shape[:2]
+    ih, iw = image_gray.shape[:2]
+    if th > ih or tw > iw:
+        return -1.0, None
+
+    # Coarsest level where the template still keeps some detail.
+    level = len(template_pyramid) - 1
+    while level > 0 and min(template_pyramid[level].shape[:2]) < MIN_COARSE_SIDE:
+        level -= 1
+    if level == 0:
+        return _best_match(image_gray, template)
+
+    coarse_image = image_gray
+    for _ in range(level):
+        coarse_image = cv2.pyrDown(coarse_image)
+    coarse_template = template_pyramid[level]
+    if coarse_template.shape[0] > coarse_image.shape[0] or coarse_template.shape[1] > coarse_image.shape[1]:
+        return _best_match(image_gray, template)
+    _, (cx, cy) = _best_match(coarse_image, coarse_template)
+
+    scale = 2 ** level
+    margin = REFINE_MARGIN * scale
+    x0, y0 = max(0, cx * scale - margin), max(0, cy * scale - margin)
+    x1, y1 = min(iw, cx * scale + tw + margin), min(ih, cy * scale + th + margin)
+    score, (rx, ry) = _best_match(image_gray[y0:y1, x0:x1], template)
+    return score, (x0 + rx, y0 + ry)
+
+
+def _to_gray(img_region):
+    if isinstance(img_region, np.ndarray):
+        return cv2.cvtColor(img_region, cv2.COLOR_RGB2GRAY) if img_region.ndim == 3 else img_region
+    return np.array(img_region.convert("L"))
+
+
+def match_vendor_templates(img_region, vendor, threshold=MATCH_THRESHOLD):
+    """
+    Match every template of ``vendor`` against a crop.
+    :return: ``(matched, template_path, score, location)`` for the first template
+             that matches, else the best-scoring one; ``template_path`` is None
+             when the vendor has no templates.
+    """
+    paths = template_paths(vendor)
+    if not paths:
+        return False, None, -1.0, None
+
+    gray = _to_gray(img_region)
+    best = (False, paths[0], -1.0, None)
+    for path in paths:
+        score, loc = match_pyramid(gray, load_template(path))
+        if score > best[2]:
+            best = (score >= threshold, path, score, loc)
+            if best[0]:
+                break
+    return best
+
+
+def clear_template_cache():
+    """Forget loaded templates and vendor lookups (mainly for tests)."""
+    _templates.clear()
+    _vendor_paths.clear()
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, field
+from typing import Any, Optional
 
 from PIL import Image
 
@@ -7,8 +7,66 @@ from PIL import Image
 @dataclass
 class PageTask:
     page_idx: int
-    img: Image.Image
+    img: Optional[Image.Image]
     fields: dict
     output_dir: str
     vendor: str
     date: str
+    pdf_path: Optional[str] = None  # when img is None the worker renders this page itself
+    dpi: int = 72  # resolution of img when it is supplied by the caller
+    rotation: Optional[int] = None  # decided up front (e.g. document-level); None means detect per page
+    plan: Optional[dict] = None  # field name -> FieldPlan; compiled from fields when missing
+
+
+@dataclass
+class FieldPlan:
+    name: str
+    short_name: str
+    conf: dict
+    action: str  # "ocr", "crop" (save the crop only) or "skip"
+    engine: str = "auto"  # "auto" (handwriting triage), "printed" or "handwriting"
+    printed_backend: str = "doctr"
+    template_fallback: bool = False
+    decoder: str = "greedy"  # CTC decoder for handwriting ICR: "greedy" or "beam"
+    static_content: bool = False  # same pixels on every ticket; OCR results are memoized by crop hash
+
+
+@dataclass
+class VendorLayout:
+    vendor: str
+    yaml_path: str
+    yaml_mtime: float
+    yaml_hash: str
+    fields: dict  # flattened field name -> field config
+    names: tuple  # row order of the box tables
+    boxes_inches: Any  # np.ndarray (N, 4): x0, y0, x1, y1 in inches
+    has_box: Any  # np.ndarray (N,) bool: False for fields without usable geometry
+    template_paths: list
+    model_paths: dict  # model registry name -> resolved ONNX path (None if missing)
+    pixel_boxes: dict = field(default_factory=dict)  # dpi -> (N, 4) int pixel boxes, filled on demand
+    index: dict = field(default_factory=dict)  # field name -> row
+
+
+@dataclass
+class CpuBudget:
+    cores: int
+    workers: int  # pool processes
+    threads: int  # per-library thread pool size inside each worker
+
+
+@dataclass
+class EngineResult:
+    text: str
+    confidence: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class DocumentRun:
+    pdf_path: str
+    name: str  # PDF file stem; names the output files
+    vendor: str
+    output_dir: str
+    page_count: int
+    journal: Any  # PageJournal for this document
+    remaining: int  # pages still to come back from the pool
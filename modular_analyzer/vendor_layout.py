@@ -0,0 +1,226 @@
+# --- modular_analyzer/vendor_layout.py ---
+"""Compiled vendor layouts.
+
+A vendor YAML is loaded, flattened and validated once into a ``VendorLayout``:
+the field metadata, an ``(N, 4)`` table of field boxes in inches (converted to
+pixel tables per render DPI on demand), and the resolved template and model
+paths.  Compiled layouts are pickled under ``layout_cache_dir`` and reused
+until the YAML's mtime and content hash change; template and model paths are
+looked up again on every load, so files added since are picked up.  ``main`` ships the layout to
+each pool worker once through the initializer, so page tasks stay small.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+
+import numpy as np
+
+from modular_analyzer.config import OCR_CONFIG
+from modular_analyzer.types import VendorLayout
+
+LAYOUT_CACHE_DIR = OCR_CONFIG.get("layout_cache_dir", os.path.join("output", "cache", "layouts"))
+BOX_DPI = OCR_CONFIG.get("box_dpi", 300)
+LAYOUT_FORMAT = 1  # bump when VendorLayout changes shape so stale pickles are rebuilt
+
+_worker_layouts = {}  # vendor -> (layout, plan) installed in this worker
+
+
+def flatten_fields(conf):
+    flat = {}
+    for section_name, section in (conf or {}).items():
+        if isinstance(section, dict):
+            for field_name, field_conf in section.items():
+                flat[f"{section_name}.{field_name}"] = field_conf
+        else:
+            logging.warning(f"⚠️ Expected dict in section '{section_name}', but got {type(section).__name__}")
+    return flat
+
+
+def _pair(value):
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ValueError(f"expected [x, y], got {value!r}")
+    return float(value[0]), float(value[1])
+
+
+def _field_inches(field_name, field_conf, box_dpi):
+    """Return ``(x0, y0, x1, y1)`` in inches, or None when the field has no usable geometry."""
+    try:
+        if "position_inches" in field_conf and "size_inches" in field_conf:
+            x, y = _pair(field_conf["position_inches"])
+            w, h = _pair(field_conf["size_inches"])
+            if w <= 0 or h <= 0:
+                raise ValueError(f"size must be positive, got {field_conf['size_inches']!r}")
+            return x, y, x + w, y + h
+        if "box" in field_conf:
+            box = [float(v) for v in field_conf["box"]]
+            if len(box) != 4:
+                raise ValueError(f"expected [x0, y0, x1, y1], got {field_conf['box']!r}")
+            return tuple(v / box_dpi for v in box)
+    except (TypeError, ValueError) as e:
+        logging.warning(f"⚠️ Invalid geometry for field '{field_name}': {e}")
+    return None
+
+
+def build_box_table(fields, box_dpi=BOX_DPI):
+    """
+    Turn flattened field configs into ``(names, boxes_inches, has_box)``.
+    Rows without usable geometry are zero-filled and flagged False in ``has_box``.
+    """
+    names = tuple(fields)
+    boxes = np.zeros((len(names), 4), dtype=np.float64)
+    has_box = np.zeros(len(names), dtype=bool)
+    for i, name in enumerate(names):
+        field_conf = fields[name] if isinstance(fields[name], dict) else {}
+        inches = _field_inches(name, field_conf, box_dpi)
+        if inches is not None:
+            boxes[i] = inches
+            has_box[i] = True
+    return names, boxes, has_box
+
+
+def _resolve_model_paths():
+    from modular_analyzer.model_registry import ONNX_MODEL_FILES, model_file
+    from modular_analyzer.ocr_utils import get_model_variant_path
+
+    paths = {}
+    for name in ONNX_MODEL_FILES:
+        try:
+            paths[name] = get_model_variant_path(model_file(name))
+        except FileNotFoundError:
+            paths[name] = None
+    return paths
+
+
+def compile_vendor_layout(vendor, yaml_path, yaml_bytes=None):
+    """Load, validate and compile a vendor YAML into a ``VendorLayout``."""
+    import yaml
+    from modular_analyzer.reporting_utils import log_yaml_fields
+    from modular_analyzer.template_engine import resolve_template_paths
+
+    if yaml_bytes is None:
+        with open(yaml_path, "rb") as f:
+            yaml_bytes = f.read()
+    conf = yaml.safe_load(yaml_bytes) or {}
+    log_yaml_fields(conf, yaml_path)
+
+    fields = flatten_fields(conf)
+    names, boxes, has_box = build_box_table(fields)
+    return VendorLayout(
+        vendor=vendor,
+        yaml_path=yaml_path,
+        yaml_mtime=os.path.getmtime(yaml_path),
+        yaml_hash=hashlib.sha1(yaml_bytes).hexdigest(),
+        fields=fields,
+        names=names,
+        boxes_inches=boxes,
+        has_box=has_box,
+        template_paths=resolve_template_paths(vendor),
+        model_paths=_resolve_model_paths(),
+    )
+
+
+def _refresh_paths(layout):
+    # Templates and models live outside the YAML, so a cached layout's copies may be stale.
+    from modular_analyzer.template_engine import resolve_template_paths
+
+    layout.template_paths = resolve_template_paths(layout.vendor)
+    layout.model_paths = _resolve_model_paths()
+    return layout
+
+
+def load_vendor_layout(vendor, yaml_path, cache_dir=LAYOUT_CACHE_DIR):
+    """
+    Return the compiled layout for ``vendor``, reusing the on-disk copy when the
+    YAML's mtime matches, or its content hash does after a touch.
+    """
+    cache_path = os.path.join(cache_dir, f"{vendor}.pkl") if cache_dir else None
+    cached = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                fmt, cached = pickle.load(f)
+            if fmt != LAYOUT_FORMAT or cached.yaml_path != yaml_path:
+                cached = None
+        except Exception as e:
+            logging.warning(f"⚠️ Ignoring unreadable layout cache {cache_path}: {e}")
+            cached = None
+
+    mtime = os.path.getmtime(yaml_path)
+    if cached is not None and cached.yaml_mtime == mtime:
+        logging.info(f"📦 Using compiled layout for {vendor} ({len(cached.names)} fields)")
+        return _refresh_paths(cached)
+
+    with open(yaml_path, "rb") as f:
+        yaml_bytes = f.read()
+    if cached is not None and cached.yaml_hash == hashlib.sha1(yaml_bytes).hexdigest():
+        cached.yaml_mtime = mtime
+        layout = _refresh_paths(cached)
+        logging.info(f"📦 Using compiled layout for {vendor} (YAML touched, content unchanged)")
+    else:
+        layout = compile_vendor_layout(vendor, yaml_path, yaml_bytes)
+        logging.info(f"🛠️ Compiled layout for {vendor} ({len(layout.names)} fields)")
+
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump((LAYOUT_FORMAT, layout), f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logging.warning(f"⚠️ Could not write layout cache {cache_path}: {e}")
+    return layout
+
+
+def field_pixel_boxes(layout, names, dpi):
+    """
+    Pixel boxes at ``dpi`` for ``names`` (rows in the given order).
+    :return: ``(boxes, has_box)``: an ``(len(names), 4)`` int array and a bool mask.
+    """
+    table = layout.pixel_boxes.get(dpi)
+    if table is None:
+        table = np.floor(layout.boxes_inches * dpi).astype(np.int64)
+        layout.pixel_boxes[dpi] = table
+    index = layout.index or {name: i for i, name in enumerate(layout.names)}
+    layout.index = index
+    rows = np.array([index[name] for name in names], dtype=np.int64)
+    return table[rows], layout.has_box[rows]
+
+
+def clamp_boxes(boxes, width, height):
+    """
+    Clamp every box to the image at once.
+    :return: ``(clamped, valid)``; a box is valid when at least 1px wide and tall.
+    """
+    clamped = np.empty_like(boxes)
+    clamped[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+    clamped[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+    valid = (clamped[:, 2] - clamped[:, 0] >= 1) & (clamped[:, 3] - clamped[:, 1] >= 1)
+    return clamped, valid
+
+
+def layout_from_fields(fields, vendor=""):
+    """In-memory layout for callers that pass flattened fields directly (no YAML, no cache)."""
+    names, boxes, has_box = build_box_table(fields)
+    return VendorLayout(vendor=vendor, yaml_path="", yaml_mtime=0.0, yaml_hash="", fields=fields,
+                        names=names, boxes_inches=boxes, has_box=has_box, template_paths=[], model_paths={})
+
+
+def install_worker_layout(layout, plan=None):
+    """
+    Keep a vendor layout (and its field plan) for every page of that vendor this
+    worker processes. A worker may hold one layout per vendor (see ``batch_runner``).
+    """
+    if layout is None:
+        return
+    _worker_layouts[layout.vendor] = (layout, plan)
+    if layout.template_paths:
+        from modular_analyzer.template_engine import prime_template_paths
+        prime_template_paths(layout.vendor, layout.template_paths)
+
+
+def worker_layout(vendor):
+    """Return ``(layout, plan)`` installed for ``vendor`` in this worker, or ``(None, None)``."""
+    return _worker_layouts.get(vendor, (None, None))
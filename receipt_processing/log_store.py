@@ -0,0 +1,106 @@
+"""Append-only receipt log backed by SQLite.
+
+Each batch inserts its records in one transaction, so the cost of a batch no
+longer depends on how many receipts were processed before it.  The Excel log
+is produced on demand by :func:`ReceiptLogStore.export_excel`, optionally
+limited to a date range.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Iterable
+
+COLUMNS = ["filename", "vendor", "date", "total", "category", "processed_time"]
+DATE_COLUMNS = {"receipt": "receipt_day", "processed": "processed_time"}
+
+_DATE_RE = re.compile(r"^\s*(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})\s*$")
+
+
+def normalize_date(text: str | None) -> str | None:
+    """Turn an OCR'd ``MM/DD/YYYY`` (or ``MM-DD-YY``) date into ``YYYY-MM-DD``, else None."""
+    match = _DATE_RE.match(text or "")
+    if not match:
+        return None
+    month, day, year = (int(part) for part in match.groups())
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+class ReceiptLogStore:
+    """Receipt records in a SQLite table that is only ever appended to."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS receipts ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " filename TEXT, vendor TEXT, date TEXT, total TEXT, category TEXT, processed_time TEXT,"
+            " receipt_day TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_receipts_day ON receipts (receipt_day)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_receipts_processed ON receipts (processed_time)")
+        self._conn.commit()
+
+    def append(self, records: Iterable[dict]) -> int:
+        """Insert ``records`` in one transaction and return how many were added."""
+        rows = [
+            tuple("" if record.get(col) is None else str(record.get(col)) for col in COLUMNS)
+            + (normalize_date(record.get("date")),)
+            for record in records
+        ]
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO receipts ({', '.join(COLUMNS)}, receipt_day) VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def query(self, start: date | None = None, end: date | None = None, by: str = "receipt") -> list[dict]:
+        """
+        Records in insertion order, optionally limited to ``start``..``end`` (inclusive).
+        ``by`` picks the date filtered on: the receipt's own date or when it was processed.
+        Receipts whose date could not be read are left out of receipt-date ranges.
+        """
+        column = DATE_COLUMNS[by]
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            # processed_time carries a time of day, so only its date part is compared.
+            clauses.append(f"substr({column}, 1, 10) <= ?")
+            params.append(end.isoformat())
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        cursor = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM receipts{where} ORDER BY id", params)
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM receipts").fetchone()[0]
+
+    def export_excel(self, xlsx_path: Path, start: date | None = None, end: date | None = None,
+                     by: str = "receipt") -> int:
+        """Write the (filtered) log to ``xlsx_path`` and return the number of rows."""
+        import pandas as pd
+
+        records = self.query(start, end, by)
+        pd.DataFrame(records, columns=COLUMNS).to_excel(xlsx_path, index=False)
+        return len(records)
+
+    def import_excel(self, xlsx_path: Path) -> int:
+        """Append the rows of a legacy ``receipt_log.xlsx`` (one-time migration)."""
+        import pandas as pd
+
+        df = pd.read_excel(xlsx_path, dtype=str).fillna("")
+        return self.append(df.to_dict("records"))
+
+    def close(self) -> None:
+        self._conn.close()
@@ -2,23 +2,35 @@
 
 from __future__ import annotations
 
+import argparse
+import os
 import shutil
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+from multiprocessing import Pool
 from pathlib import Path
 from typing import Iterable
 
-import pandas as pd
-
+from .log_store import ReceiptLogStore
 from .utils import CATEGORY_MAP, ReceiptFields, extract_fields
 
 
 # --- Configuration ---
 INPUT_DIR = Path("C:/Receipts/input")
 OUTPUT_DIR = Path("C:/Receipts/processed")
-LOG_FILE = Path("C:/Receipts/receipt_log.xlsx")
+LOG_FILE = Path("C:/Receipts/receipt_log.xlsx")  # on-demand export (and legacy log, imported once)
+LOG_DB = Path("C:/Receipts/receipt_log.sqlite")
+
 
+# --- Parallelism ---
+SUPPORTED_SUFFIXES = {".jpg", ".jpeg", ".png", ".pdf"}
+WORKERS = max(1, (os.cpu_count() or 2) // 2)  # receipt worker processes
+FILES_PER_TASK = 8  # files handed to a worker at a time
+PAGES_PER_CALL = 16  # pages per predictor call
 
-# --- Lazy OCR initialization ---
+
+# --- Lazy OCR initialization (one model per process) ---
+@lru_cache(maxsize=None)
 def _get_ocr_model():
     from doctr.models import ocr_predictor
     return ocr_predictor(
@@ -29,70 +41,201 @@ def _get_ocr_model():
 
 
 # --- Utility: OCR processing ---
-def extract_text(filepath: Path) -> Iterable[str]:
-    """Run OCR on an image or PDF and return a list of text lines."""
+def load_pages(filepath: Path) -> list:
+    """Decode an image or PDF into page arrays for the predictor."""
     from doctr.io import DocumentFile
 
     if filepath.suffix.lower() == ".pdf":
-        doc = DocumentFile.from_pdf(str(filepath))
-    else:
-        doc = DocumentFile.from_images([str(filepath)])
+        return list(DocumentFile.from_pdf(str(filepath)))
+    return list(DocumentFile.from_images([str(filepath)]))
 
-    model = _get_ocr_model()
-    result = model(doc)
-    export = result.export()
+
+def _page_lines(page: dict) -> list[str]:
     lines: list[str] = []
-    for page in export["pages"]:
-        for block in page.get("blocks", []):
-            for line in block.get("lines", []):
-                text = "".join(word["value"] for word in line.get("words", []))
-                lines.append(text)
+    for block in page.get("blocks", []):
+        for line in block.get("lines", []):
+            lines.append("".join(word["value"] for word in line.get("words", [])))
     return lines
 
 
+def extract_text_batch(filepaths: list[Path]) -> list[list[str] | Exception]:
+    """
+    OCR several files with as few predictor calls as possible.
+    Returns one list of text lines per file, or the exception that file hit.
+    """
+    pages: list = []
+    owners: list[int] = []
+    results: list[list[str] | Exception] = [[] for _ in filepaths]
+    for idx, filepath in enumerate(filepaths):
+        try:
+            file_pages = load_pages(filepath)
+        except Exception as e:  # unreadable file: report it, keep the rest of the batch
+            results[idx] = e
+            continue
+        pages += file_pages
+        owners += [idx] * len(file_pages)
+
+    if not pages:
+        return results
+    model = _get_ocr_model()
+    for start in range(0, len(pages), PAGES_PER_CALL):
+        call_owners = owners[start:start + PAGES_PER_CALL]
+        try:
+            export = model(pages[start:start + PAGES_PER_CALL]).export()
+        except Exception as e:
+            for idx in set(call_owners):
+                results[idx] = e
+            continue
+        for idx, page in zip(call_owners, export["pages"]):
+            if not isinstance(results[idx], Exception):
+                results[idx].extend(_page_lines(page))
+    return results
+
+
+def extract_text(filepath: Path) -> Iterable[str]:
+    """Run OCR on an image or PDF and return a list of text lines."""
+    (lines,) = extract_text_batch([filepath])
+    if isinstance(lines, Exception):
+        raise lines
+    return lines
+
+
+def _init_worker(threads: int) -> None:
+    try:
+        import torch
+        torch.set_num_threads(threads)  # split the cores between workers instead of oversubscribing
+    except ImportError:
+        pass
+    _get_ocr_model()  # load the weights once, before the first task
+
+
+def _analyze_chunk(filepaths: list[Path]) -> list[tuple[Path, ReceiptFields | None, str | None]]:
+    results = []
+    for filepath, lines in zip(filepaths, extract_text_batch(filepaths)):
+        print(f"Processing {filepath.name}...")
+        if isinstance(lines, Exception):
+            results.append((filepath, None, str(lines)))
+            continue
+        try:
+            results.append((filepath, extract_fields(lines, CATEGORY_MAP), None))
+        except Exception as e:  # one odd receipt must not stop the run before anything is logged
+            results.append((filepath, None, str(e)))
+    return results
+
+
+def analyze_receipts(files: list[Path], workers: int = WORKERS, files_per_task: int = FILES_PER_TASK):
+    """
+    Read every receipt in ``files`` without touching the files themselves.
+    :return: ``(path, fields, error)`` per file, in the order of ``files``.
+    """
+    chunks = [files[i:i + files_per_task] for i in range(0, len(files), files_per_task)]
+    workers = min(workers, len(chunks))
+    if workers <= 1:
+        return [result for chunk in chunks for result in _analyze_chunk(chunk)]
+
+    threads = max(1, (os.cpu_count() or workers) // workers)
+    with Pool(workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        # imap keeps chunk order, so results come back in file order whatever finishes first.
+        return [result for chunk_results in pool.imap(_analyze_chunk, chunks) for result in chunk_results]
+
+
+def move_receipt(filepath: Path, category: str) -> Path:
+    """Move a receipt into its category folder without overwriting an earlier file."""
+    category_folder = OUTPUT_DIR / category
+    category_folder.mkdir(parents=True, exist_ok=True)
+    new_path = category_folder / filepath.name
+    counter = 1
+    while new_path.exists():
+        new_path = category_folder / f"{filepath.stem}_{counter}{filepath.suffix}"
+        counter += 1
+    shutil.move(str(filepath), str(new_path))
+    return new_path
+
+
 # --- Main receipt processor ---
 def process_receipt(filepath: Path) -> ReceiptFields:
     print(f"Processing {filepath.name}...")
     lines = extract_text(filepath)
     fields = extract_fields(lines, CATEGORY_MAP)
+    move_receipt(filepath, fields.category)
+    return fields
 
-    # Move file to output folder
-    category_folder = OUTPUT_DIR / fields.category
-    category_folder.mkdir(parents=True, exist_ok=True)
-    new_path = category_folder / filepath.name
-    shutil.move(str(filepath), str(new_path))
 
-    return fields
+def open_log_store() -> ReceiptLogStore:
+    """Open the receipt log, importing a pre-existing Excel log the first time."""
+    store = ReceiptLogStore(LOG_DB)
+    if len(store) == 0 and LOG_FILE.exists():
+        imported = store.import_excel(LOG_FILE)
+        print(f"Imported {imported} records from {LOG_FILE}")
+    return store
 
 
-def run_batch() -> None:
+def run_batch(workers: int = WORKERS) -> None:
     INPUT_DIR.mkdir(parents=True, exist_ok=True)
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+    files = sorted(file for file in INPUT_DIR.glob("*") if file.suffix.lower() in SUPPORTED_SUFFIXES)
     records: list[dict[str, str]] = []
-    for file in INPUT_DIR.glob("*"):
-        if file.suffix.lower() in {".jpg", ".jpeg", ".png", ".pdf"}:
-            try:
-                fields = process_receipt(file)
-                record = {
-                    "filename": file.name,
-                    "vendor": fields.vendor,
-                    "date": fields.date,
-                    "total": fields.total,
-                    "category": fields.category,
-                    "processed_time": datetime.now().isoformat(),
-                }
-                records.append(record)
-            except Exception as e:  # pragma: no cover - runtime protection
-                print(f"Error: {file.name} - {e}")
+    moves: list[tuple[Path, str]] = []
+    for file, fields, error in analyze_receipts(files, workers):
+        if error:
+            print(f"Error: {file.name} - {error}")
+            continue
+        records.append({
+            "filename": file.name,
+            "vendor": fields.vendor,
+            "date": fields.date,
+            "total": fields.total,
+            "category": fields.category,
+            "processed_time": datetime.now().isoformat(),
+        })
+        moves.append((file, fields.category))
 
     if records:
-        df = pd.DataFrame(records)
-        if LOG_FILE.exists():
-            existing = pd.read_excel(LOG_FILE)
-            df = pd.concat([existing, df], ignore_index=True)
-        df.to_excel(LOG_FILE, index=False)
+        store = open_log_store()
+        try:
+            store.append(records)
+        finally:
+            store.close()
+
+    # Final phase: files leave the input folder only once every receipt is read and logged.
+    for file, category in moves:
+        try:
+            move_receipt(file, category)
+        except OSError as e:
+            print(f"Error: could not move {file.name} - {e}")
+
+
+def export_log(xlsx_path: Path = LOG_FILE, start: date | None = None, end: date | None = None,
+               by: str = "receipt") -> int:
+    """Write the receipt log (optionally a date range of it) to Excel."""
+    store = open_log_store()
+    try:
+        count = store.export_excel(xlsx_path, start, end, by)
+    finally:
+        store.close()
+    print(f"Exported {count} records to {xlsx_path}")
+    return count
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Process receipts and manage the receipt log")
+    sub = parser.add_subparsers(dest="command")
+    run = sub.add_parser("run", help="Process the receipts in the input folder (default)")
+    run.add_argument("--workers", type=int, default=WORKERS, help="Worker processes (1 = no pool)")
+    export = sub.add_parser("export", help="Export the receipt log to Excel")
+    export.add_argument("--out", type=Path, default=LOG_FILE)
+    export.add_argument("--start", type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+    export.add_argument("--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD)")
+    export.add_argument("--by", choices=("receipt", "processed"), default="receipt",
+                        help="Filter on the receipt's date or on when it was processed")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_log(args.out, args.start, args.end, args.by)
+    else:
+        run_batch(getattr(args, "workers", WORKERS))
 
 
 if __name__ == "__main__":  # pragma: no cover - script entry
-    run_batch()
+    main()
@@ -7,7 +7,7 @@ from modular_analyzer.main import main as analyze_main
 def main(argv: list[str] | None = None) -> None:
     """Run the sorter followed by the analyzer."""
     sorter.main(argv)
-    analyze_main()
+    analyze_main([])
 
 
 if __name__ == "__main__":
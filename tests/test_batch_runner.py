@@ -0,0 +1,140 @@
+import os
+
+import pytest
+
+fitz = pytest.importorskip('fitz')
+pytest.importorskip('numpy')
+pytest.importorskip('yaml')
+batch_runner = pytest.importorskip('modular_analyzer.batch_runner')
+
+VENDOR_YAML = """
+ticket_format:
+  ticket_number:
+    position_inches: [0.5, 0.5]
+    size_inches: [2.0, 0.4]
+"""
+
+
+def _fake_page(task):
+    return {"entry": {"Page": task.page_idx + 1, "Source": os.path.basename(task.pdf_path)},
+            "ticket_issue": "", "thumbnails": [], "timing": {"Page": task.page_idx + 1, "DurationSeconds": 0.0},
+            "issue_log": [], "model_loads": {"doctr": 1}}
+
+
+def _no_models(*args, **kwargs):
+    from modular_analyzer.page_processor import install_worker_layout
+    for layout, plan in args[5]:
+        install_worker_layout(layout, plan)
+
+
+def _make_pdf(path, pages):
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page()
+    doc.save(str(path))
+    doc.close()
+
+
+def test_match_vendor_and_collect_pdfs(tmp_path):
+    (tmp_path / "b_Acme.pdf").write_bytes(b"%PDF")
+    (tmp_path / "a_Other.PDF").write_bytes(b"%PDF")
+    (tmp_path / "notes.txt").write_text("x")
+
+    assert batch_runner.collect_pdfs([str(tmp_path)]) == [str(tmp_path / "a_Other.PDF"), str(tmp_path / "b_Acme.pdf")]
+    assert batch_runner.match_vendor("b_acme", ["Acme.yaml"], "cfg") == ("Acme", os.path.join("cfg", "Acme.yaml"))
+    assert batch_runner.match_vendor("b_zeta", ["Acme.yaml"], "cfg") == (None, None)
+
+
+def test_run_batch_writes_each_document_and_resumes(tmp_path, monkeypatch):
+    configs = tmp_path / "configs"
+    configs.mkdir()
+    (configs / "Acme.yaml").write_text(VENDOR_YAML)
+    (configs / "ocr_config.yaml").write_text("{}")
+    scans = tmp_path / "scans"
+    scans.mkdir()
+    _make_pdf(scans / "Acme_1.pdf", 3)
+    _make_pdf(scans / "Acme_2.pdf", 2)
+    _make_pdf(scans / "Unknown.pdf", 1)
+
+    written = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("modular_analyzer.page_processor.process_page", _fake_page)
+    monkeypatch.setattr(batch_runner, "init_page_worker", _no_models)
+    monkeypatch.setattr(batch_runner, "prepare_onnx_models", lambda names: None)
+    monkeypatch.setattr(batch_runner, "PAGE_CACHE_ENABLED", False)
+    monkeypatch.setattr(batch_runner, "plan_document_orientation", lambda pdf, **kw: [0] * 3)
+    monkeypatch.setattr(batch_runner, "write_outputs",
+                        lambda results, output_dir, name: written.append((name, [r["entry"] for r in results])))
+
+    pdfs = batch_runner.collect_pdfs([str(scans)])
+    docs = batch_runner.run_batch(pdfs, configs_dir=str(configs), output_root=str(tmp_path / "out"))
+
+    assert [doc.name for doc in docs] == ["Acme_1", "Acme_2"]
+    assert written == [
+        ("Acme_1", [{"Page": p, "Source": "Acme_1.pdf"} for p in (1, 2, 3)]),
+        ("Acme_2", [{"Page": p, "Source": "Acme_2.pdf"} for p in (1, 2)]),
+    ]
+
+    # A resumed batch finds every page journaled and only rebuilds the outputs.
+    monkeypatch.setattr("modular_analyzer.page_processor.process_page", None)
+    written.clear()
+    batch_runner.run_batch(pdfs, resume=True, configs_dir=str(configs), output_root=str(tmp_path / "out"))
+    assert [name for name, _ in written] == ["Acme_1", "Acme_2"]
+
+
+def _failing_page(task):
+    if os.path.basename(task.pdf_path) == "Acme_1.pdf" and task.page_idx == 1:
+        raise RuntimeError("corrupt page")
+    return _fake_page(task)
+
+
+def _shuffled_imap(tasks, processor, **kwargs):
+    # Out of order, with one result missing: results must not be matched by position.
+    results = [processor(task) for task in tasks]
+    del results[0]
+    return reversed(results)
+
+
+def _setup_batch(tmp_path, monkeypatch, written):
+    configs = tmp_path / "configs"
+    configs.mkdir()
+    (configs / "Acme.yaml").write_text(VENDOR_YAML)
+    scans = tmp_path / "scans"
+    scans.mkdir()
+    _make_pdf(scans / "Acme_1.pdf", 3)
+    _make_pdf(scans / "Acme_2.pdf", 2)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(batch_runner, "init_page_worker", _no_models)
+    monkeypatch.setattr(batch_runner, "prepare_onnx_models", lambda names: None)
+    monkeypatch.setattr(batch_runner, "PAGE_CACHE_ENABLED", False)
+    monkeypatch.setattr(batch_runner, "plan_document_orientation", lambda pdf, **kw: [0] * 3)
+    monkeypatch.setattr(batch_runner, "write_outputs",
+                        lambda results, output_dir, name: written.append((name, results)))
+    return str(configs), batch_runner.collect_pdfs([str(scans)])
+
+
+def test_failed_page_is_journaled_and_batch_continues(tmp_path, monkeypatch):
+    written = []
+    configs, pdfs = _setup_batch(tmp_path, monkeypatch, written)
+    monkeypatch.setattr("modular_analyzer.page_processor.process_page", _failing_page)
+
+    batch_runner.run_batch(pdfs, configs_dir=configs, output_root=str(tmp_path / "out"))
+
+    assert sorted(name for name, _ in written) == ["Acme_1", "Acme_2"]
+    acme_1 = dict(written)["Acme_1"]
+    assert [r["ticket_issue"] for r in acme_1] == ["", "PAGE_ERROR", ""]
+    assert acme_1[1]["issue_log"] == [{"Page": 2, "IssueType": "PAGE_ERROR", "FieldName": ""}]
+
+
+def test_results_are_matched_to_pages_by_identity(tmp_path, monkeypatch):
+    written = []
+    configs, pdfs = _setup_batch(tmp_path, monkeypatch, written)
+    monkeypatch.setattr("modular_analyzer.page_processor.process_page", _fake_page)
+    monkeypatch.setattr(batch_runner, "imap_pages", _shuffled_imap)
+
+    batch_runner.run_batch(pdfs, configs_dir=configs, output_root=str(tmp_path / "out"))
+
+    results = dict(written)
+    assert [r["entry"] for r in results["Acme_2"]] == [{"Page": p, "Source": "Acme_2.pdf"} for p in (1, 2)]
+    # The missing first page is left out instead of shifting later pages onto it.
+    assert [r["entry"] for r in results["Acme_1"]] == [{"Page": p, "Source": "Acme_1.pdf"} for p in (2, 3)]
@@ -25,3 +25,31 @@ def test_color_code_excel_round_trip(tmp_path):
 
     xlsx_path = tmp_path / "sample_ticket_numbers.xlsx"
     assert xlsx_path.exists()
+
+
+def test_entries_stream_with_native_highlight_rules(tmp_path):
+    from modular_analyzer.file_utils import EntryWriter
+
+    with EntryWriter(str(tmp_path), "run", ["Page", "Ticket", "Date"]) as writer:
+        writer.add({"Page": 1, "Ticket": "MISSING"})
+        writer.add({"Page": 2, "Ticket": "TemplateMatch", "Date": "0412", "Extra": "ignored"})
+
+    ws = openpyxl.load_workbook(writer.xlsx_path).active
+    assert [[c.value for c in row] for row in ws.iter_rows()] == [
+        ["Page", "Ticket", "Date"], [1, "MISSING", None], [2, "TemplateMatch", "0412"]
+    ]
+    assert all(cell.fill.fill_type is None for row in ws.iter_rows() for cell in row)
+
+    rules = [(str(cf.sqref), rule.formula[0]) for cf in ws.conditional_formatting for rule in cf.rules]
+    assert rules == [("A2:C3", 'ISNUMBER(SEARCH("missing",A2))'), ("A2:C3", 'ISNUMBER(SEARCH("template",A2))')]
+    assert (tmp_path / "run_ticket_numbers.csv").read_text().splitlines() == [
+        "Page,Ticket,Date", "1,MISSING,", "2,TemplateMatch,0412"
+    ]
+
+
+def test_save_entries_accepts_a_generator_with_columns(tmp_path):
+    entries = ({"Page": page, "Ticket": str(page)} for page in range(1, 4))
+    save_entries_to_excel(entries, tmp_path, "gen", columns=["Page", "Ticket"])
+
+    ws = openpyxl.load_workbook(tmp_path / "gen_ticket_numbers.xlsx").active
+    assert ws.max_row == 4
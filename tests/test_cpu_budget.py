@@ -0,0 +1,36 @@
+import pytest
+
+cpu_budget = pytest.importorskip('modular_analyzer.cpu_budget')
+
+from modular_analyzer.types import CpuBudget
+
+
+def test_budget_splits_cores_without_oversubscribing():
+    assert cpu_budget.plan_cpu_budget(cores=32, threads=2) == CpuBudget(cores=32, workers=16, threads=2)
+    assert cpu_budget.plan_cpu_budget(cores=32, workers=8) == CpuBudget(cores=32, workers=8, threads=4)
+    assert cpu_budget.plan_cpu_budget(cores=32) == CpuBudget(cores=32, workers=32, threads=1)
+    # Explicit workers and threads are capped to the budget.
+    assert cpu_budget.plan_cpu_budget(cores=8, workers=4, threads=4) == CpuBudget(cores=8, workers=4, threads=2)
+    assert cpu_budget.plan_cpu_budget(cores=32, threads=1, max_workers=6).workers == 6
+
+
+def test_configured_workers_share_cores_unless_threads_are_set(monkeypatch):
+    monkeypatch.setattr(cpu_budget, "BUDGET_WORKERS", 8)
+    monkeypatch.setattr(cpu_budget, "THREADS_PER_WORKER", None)
+    assert cpu_budget.plan_cpu_budget(cores=32) == CpuBudget(cores=32, workers=8, threads=4)
+    monkeypatch.setattr(cpu_budget, "THREADS_PER_WORKER", 2)
+    assert cpu_budget.plan_cpu_budget(cores=32) == CpuBudget(cores=32, workers=8, threads=2)
+
+
+def test_tuner_keeps_fastest_concurrency():
+    tuner = cpu_budget.ThroughputTuner(CpuBudget(cores=16, workers=16, threads=1), tune_pages=2)
+    assert tuner.candidates == [16, 8, 4]
+    assert tuner.limit == 16
+
+    # 16 in flight: 2 pages in 4s; 8 in flight: 2 pages in 1s; 4 in flight: 2 pages in 2s.
+    for now in (0, 2, 4, 4.5, 5, 6, 7):
+        tuner.record(now)
+
+    assert not tuner.tuning
+    assert tuner.rates == {16: 0.5, 8: 2.0, 4: 1.0}
+    assert tuner.limit == 8
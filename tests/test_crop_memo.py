@@ -0,0 +1,74 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('yaml')
+
+from modular_analyzer.crop_memo import CropMemo, crop_hash, hamming, memo_scope
+from modular_analyzer.field_plan import compile_field_plan
+
+
+def _logo(shift=0):
+    img = np.full((40, 120, 3), 255, dtype=np.uint8)
+    img[10:30, 10 + shift:60 + shift] = 0
+    img[15:25, 70:110] = 80
+    return img
+
+
+def test_crop_hash_tolerates_noise_but_not_different_content():
+    rng = np.random.default_rng(0)
+    noisy = np.clip(_logo().astype(int) + rng.integers(-3, 4, _logo().shape), 0, 255).astype(np.uint8)
+    other = np.full((40, 120, 3), 255, dtype=np.uint8)
+    other[5:35, 80:115] = 0
+
+    assert hamming(crop_hash(_logo()), crop_hash(noisy)) <= 4
+    assert hamming(crop_hash(_logo()), crop_hash(other)) > 4
+
+
+def test_lookup_finds_near_duplicates_across_instances(tmp_path):
+    path = str(tmp_path / "memo.sqlite")
+    writer = CropMemo(path)
+    writer.store("scope", crop_hash(_logo()), "printed", "ACME", 0.9)
+
+    reader = CropMemo(path)  # e.g. another pool worker or a later run
+    assert reader.lookup("scope", crop_hash(_logo()) ^ 0b101) == ("printed", "ACME", 0.9)
+    assert reader.lookup("other-scope", crop_hash(_logo())) is None
+    assert reader.lookup("scope", crop_hash(_logo(shift=40))) is None
+    writer.close()
+    reader.close()
+
+
+def test_lru_and_evict_bound_the_memo(tmp_path):
+    ones = (1 << 64) - 1
+    hashes = [ones << 128, ones << 64, ones]  # 128 bits apart from each other
+    memo = CropMemo(str(tmp_path / "memo.sqlite"), lru_size=2, max_entries=2)
+    for i, value in enumerate(hashes):
+        memo.store("scope", value, "printed", str(i), 1.0)
+
+    assert len(memo._lru["scope"]) == 2
+    assert memo.evict() == 1
+    assert memo.lookup("scope", hashes[0]) is None
+    assert memo.lookup("scope", hashes[2]) == ("printed", "2", 1.0)
+    memo.close()
+
+
+def test_static_fields_and_scope():
+    plan = compile_field_plan({
+        "header.logo": {"export_to_excel": True},
+        "ticket_format.date": {"export_to_excel": True},
+        "ticket_format.banner": {"export_to_excel": True, "static_content": True},
+    }, "vendor")
+
+    assert plan["header.logo"].static_content
+    assert plan["ticket_format.banner"].static_content
+    assert not plan["ticket_format.date"].static_content
+    assert memo_scope("vendor", plan["header.logo"]) != memo_scope("other", plan["header.logo"])
+
+
+def test_hamming_and_lookup_on_plain_int_hashes(tmp_path):
+    memo = CropMemo(str(tmp_path / "memo.sqlite"), max_distance=2)
+    assert hamming(0b1011, 0b0001) == 2
+    memo.store("scope", 0xF0F0, "printed", "ACME", 0.8)
+    assert memo.lookup("scope", 0xF0F3) == ("printed", "ACME", 0.8)
+    assert memo.lookup("scope", 0x0F0F) is None
+    memo.close()
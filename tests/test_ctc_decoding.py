@@ -0,0 +1,46 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+ctc = pytest.importorskip('modular_analyzer.ctc_decoding')
+
+ALPHABET = "AB"
+BLANK = 2
+
+
+def _one_hot(paths, classes=3, p=0.9):
+    preds = np.full((len(paths), len(paths[0]), classes), (1 - p) / (classes - 1), dtype=np.float32)
+    for n, path in enumerate(paths):
+        for t, c in enumerate(path):
+            preds[n, t, c] = p
+    return preds
+
+
+def test_greedy_decodes_batch_with_char_confidences():
+    preds = _one_hot([
+        [0, 0, BLANK, 0, 1],      # "A A B" -> repeats collapse only without a blank between
+        [BLANK, BLANK, BLANK, BLANK, BLANK],
+        [1, 1, 1, BLANK, 1],
+    ])
+    decoded = ctc.greedy_decode(preds, alphabet=ALPHABET)
+    assert [text for text, _ in decoded] == ["AAB", "", "BB"]
+    assert decoded[0][1] == pytest.approx([0.9, 0.9, 0.9])
+    assert decoded[1][1] == []
+
+
+def test_greedy_accepts_raw_logits():
+    logits = np.log(_one_hot([[0, BLANK, 1]]))
+    assert ctc.greedy_decode(logits * 3.0, alphabet=ALPHABET)[0][0] == "AB"
+
+
+def test_beam_search_prefers_most_probable_labelling():
+    # Best path is blank-blank ("" with p=0.36), but "A" sums to 0.64 over its paths.
+    preds = np.array([[[0.4, 0.0, 0.6], [0.4, 0.0, 0.6]]], dtype=np.float32)
+    assert ctc.greedy_decode(preds, alphabet=ALPHABET)[0][0] == ""
+    text, confs = ctc.beam_decode(preds, alphabet=ALPHABET, beam_width=4)[0]
+    assert text == "A"
+    assert len(confs) == 1
+
+
+def test_decode_rejects_unknown_decoder():
+    with pytest.raises(ValueError):
+        ctc.decode(_one_hot([[0]]), decoder="lexicon", alphabet=ALPHABET)
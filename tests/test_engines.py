@@ -0,0 +1,83 @@
+import pytest
+
+engines = pytest.importorskip('modular_analyzer.engines')
+
+from modular_analyzer.types import EngineResult, FieldPlan
+
+
+def _plan(engine="auto"):
+    return FieldPlan(name="f", short_name="f", conf={}, action="ocr", engine=engine)
+
+
+def test_field_strategy_orders_engines():
+    assert engines.field_strategy(_plan("printed")) == ["printed"]
+    assert engines.field_strategy(_plan("handwriting")) == ["handwriting", "printed"]
+    assert engines.field_strategy(_plan(), handwriting_score=0.9) == ["handwriting", "printed"]
+    assert engines.field_strategy(_plan(), handwriting_score=0.1) == ["printed", "handwriting"]
+    assert engines.field_strategy(_plan(), use_onnx_fallback=False) == ["printed"]
+
+
+def test_each_engine_runs_at_most_once_per_crop(monkeypatch):
+    calls = {"printed": [], "handwriting": []}
+
+    def fake_printed(crops, plans):
+        calls["printed"].append(sorted(crops))
+        return {key: EngineResult("TEXT" if key == "date" else "") for key in crops}
+
+    def fake_handwriting(crops, plans):
+        calls["handwriting"].append(sorted(crops))
+        return {key: EngineResult("") for key in crops}
+
+    monkeypatch.setitem(engines.ENGINE_RUNNERS, "printed", fake_printed)
+    monkeypatch.setitem(engines.ENGINE_RUNNERS, "handwriting", fake_handwriting)
+
+    crops = {"date": object(), "truck": object(), "ticket": object()}
+    strategies = {
+        "date": ["printed", "handwriting"],
+        "truck": ["handwriting", "printed"],
+        "ticket": ["printed"],
+    }
+    plans = {key: _plan() for key in crops}
+    accepted, memo = engines.run_strategies(crops, strategies, plans)
+
+    assert accepted["date"][0] == "printed"
+    assert "truck" not in accepted and "ticket" not in accepted
+    # One batched printed call per round, and no crop ever repeats an engine.
+    assert calls["printed"] == [["date", "ticket"], ["truck"]]
+    assert calls["handwriting"] == [["truck"]]
+    assert set(memo.results_for("truck")) == {"printed", "handwriting"}
+
+
+class FakeOcrSession:
+    def __init__(self):
+        self.batch_shapes = []
+
+    def get_inputs(self):
+        from types import SimpleNamespace
+        return [SimpleNamespace(name="input", shape=["N", 1, 32, 128])]
+
+    def run(self, output_names, feeds):
+        import numpy as np
+        batch = feeds["input"]
+        self.batch_shapes.append(batch.shape)
+        # 3 time steps over alphabet + blank (38 classes): "A", blank, "B"
+        preds = np.zeros((batch.shape[0], 3, 38), dtype=np.float32)
+        preds[:, 0, 0] = preds[:, 1, 37] = preds[:, 2, 1] = 1.0
+        return [preds]
+
+
+def test_handwriting_runs_one_batched_inference(monkeypatch):
+    np = pytest.importorskip('numpy')
+    session = FakeOcrSession()
+    monkeypatch.setattr(engines, "get_model", lambda name: session)
+    crops = {
+        "truck": np.full((40, 160, 3), 255, dtype=np.uint8),
+        "driver": np.full((20, 90), 128, dtype=np.uint8),
+        "bad": np.zeros((0, 0), dtype=np.uint8),
+    }
+
+    results = engines._run_handwriting(crops, {})
+
+    assert session.batch_shapes == [(2, 1, 32, 128)]
+    assert results["truck"].text == results["driver"].text == "AB"
+    assert results["bad"].error and not results["bad"].text
@@ -0,0 +1,51 @@
+import pytest
+
+field_plan = pytest.importorskip('modular_analyzer.field_plan')
+
+FIELDS = {
+    "ticket_format.address": {"export_to_excel": False, "ocr_instruction": ""},
+    "ticket_format.load_chart": {"export_to_excel": False, "ocr_instruction": "extract table,  count marks"},
+    "ticket_format.date": {"export_to_excel": True, "ocr_instruction": "image"},
+    "ticket_format.ticket_number": {"export_to_excel": True, "ocr_instruction": "image extract and ocr"},
+    "ticket_format.truck_number": {"export_to_excel": True, "ocr_instruction": "image", "ocr_engine": "handwriting",
+                                   "ctc_decoder": "beam"},
+}
+
+
+def test_plan_follows_yaml_metadata():
+    plan = field_plan.compile_field_plan(FIELDS, "Lindamood")
+
+    assert plan["ticket_format.address"].action == "skip"
+    assert plan["ticket_format.load_chart"].action == "crop"
+    assert plan["ticket_format.date"].action == "ocr"
+    assert plan["ticket_format.date"].engine == "auto"
+    assert plan["ticket_format.ticket_number"].engine == "printed"
+    assert plan["ticket_format.ticket_number"].template_fallback
+    assert plan["ticket_format.truck_number"].engine == "handwriting"
+    assert plan["ticket_format.truck_number"].decoder == "beam"
+    assert plan["ticket_format.date"].decoder == "greedy"
+
+
+def test_field_subset_skips_everything_else():
+    plan = field_plan.compile_field_plan(FIELDS, "Lindamood", only_fields=["ticket_number"])
+
+    assert [name for name, fp in plan.items() if fp.action != "skip"] == ["ticket_format.ticket_number"]
+
+
+def test_field_subset_rejects_names_that_match_nothing(caplog):
+    with pytest.raises(ValueError):
+        field_plan.compile_field_plan(FIELDS, "Lindamood", only_fields=["tiket_number"])
+
+    plan = field_plan.compile_field_plan(FIELDS, "Lindamood", only_fields=["ticket_number", "tiket_number"])
+    assert plan["ticket_format.ticket_number"].action != "skip"
+    assert "tiket_number" in caplog.text
+
+
+def test_vendor_backend_overrides(monkeypatch):
+    monkeypatch.setattr(field_plan, "VENDOR_BACKENDS", {
+        "Lindamood": {"backend": "doctr_reco", "fields": {"date": "doctr"}},
+    })
+    plan = field_plan.compile_field_plan(FIELDS, "Lindamood")
+
+    assert plan["ticket_format.ticket_number"].printed_backend == "doctr_reco"
+    assert plan["ticket_format.date"].printed_backend == "doctr"
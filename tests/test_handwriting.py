@@ -0,0 +1,57 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+handwriting = pytest.importorskip('modular_analyzer.handwriting')
+
+from types import SimpleNamespace
+
+
+class FakeSession:
+    def __init__(self, batch_dim):
+        self.batch_dim = batch_dim
+        self.batch_sizes = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input", shape=[self.batch_dim, 1, 32, 96])]
+
+    def run(self, output_names, feeds):
+        batch = feeds["input"]
+        self.batch_sizes.append(batch.shape[0])
+        return [np.full((batch.shape[0], 1), 0.75, dtype=np.float32)]
+
+
+def test_run_onnx_batch_splits_fixed_batch_models():
+    session = FakeSession(batch_dim=1)
+    out = handwriting.run_onnx_batch(session, np.zeros((3, 1, 32, 96), dtype=np.float32))
+    assert session.batch_sizes == [1, 1, 1]
+    assert out.shape == (3, 1)
+
+
+def test_triage_classifies_candidates_in_one_call(monkeypatch):
+    session = FakeSession(batch_dim="N")
+    monkeypatch.setattr(handwriting, "get_model", lambda name: session)
+    yy, xx = np.indices((200, 600))
+    checker = ((yy // 20 + xx // 20) % 2 * 255).astype(np.uint8)
+    crops = {
+        "strokes": np.dstack([checker] * 3),
+        "blank_a": np.full((200, 600, 3), 255, dtype=np.uint8),
+        "blank_b": np.full((40, 100), 255, dtype=np.uint8),
+    }
+
+    scores = handwriting.triage_handwriting(crops)
+
+    assert scores["strokes"] == 1.0
+    assert scores["blank_a"] == pytest.approx(0.75)
+    assert scores["blank_b"] == pytest.approx(0.75)
+    assert session.batch_sizes == [2]
+
+
+def test_tensor_buffer_reuses_allocation():
+    from modular_analyzer.image_preprocessing import TensorBuffer, preprocess_batch_for_onnx
+    buf = TensorBuffer((1, 32, 128))
+    first = buf.take(4)
+    second = buf.take(2)
+    assert second.base is first.base
+    out = preprocess_batch_for_onnx([np.full((10, 50), 255, dtype=np.uint8)] * 2, out=second)
+    assert out.shape == (2, 1, 32, 128)
+    assert np.allclose(out, 1.0)
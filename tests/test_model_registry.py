@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modular_analyzer import model_registry
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    model_registry.clear_models()
+    yield
+    model_registry.clear_models()
+
+
+def test_model_loaded_once_per_process():
+    built = []
+    model_registry.register_loader("dummy", lambda: built.append(1) or object())
+
+    first = model_registry.get_model("dummy")
+    second = model_registry.get_model("dummy")
+
+    assert first is second
+    assert built == [1]
+    assert model_registry.drain_load_counts() == {"dummy": 1}
+    assert model_registry.drain_load_counts() == {}
+
+
+def test_init_worker_warms_up_models():
+    warmed = []
+    model_registry.register_loader("dummy", lambda: "model", warmup=warmed.append)
+
+    model_registry.init_worker(["dummy"], warmup=True)
+
+    assert warmed == ["model"]
+
+
+def test_unknown_model_raises():
+    with pytest.raises(ValueError):
+        model_registry.get_model("does-not-exist")
+
+
+def test_merge_load_counts():
+    results = [{"model_loads": {"doctr": 1}}, {"model_loads": {}}, {"model_loads": {"doctr": 1, "onnxruntime": 1}}]
+    assert model_registry.merge_load_counts(results) == {"doctr": 2, "onnxruntime": 1}
+
+
+def test_model_file_follows_config(monkeypatch):
+    config = pytest.importorskip("modular_analyzer.config")
+    monkeypatch.setitem(config.OCR_CONFIG, "model_files", {"onnxruntime": "handwriting_ocr_dynamic.onnx"})
+    assert model_registry.model_file("onnxruntime") == "handwriting_ocr_dynamic.onnx"
+    assert model_registry.model_file("handwriting_classifier") == "handwriting_classifier.onnx"
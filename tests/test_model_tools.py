@@ -0,0 +1,75 @@
+import csv
+
+import pytest
+
+np = pytest.importorskip('numpy')
+onnx = pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime.quantization')
+pytest.importorskip('cv2')
+model_tools = pytest.importorskip('modular_analyzer.model_tools')
+
+from onnx import TensorProto, helper, numpy_helper
+from PIL import Image
+
+
+def _write_ocr_model(path):
+    # (N, 1, 32, 128) -> (N, 32, 38): a linear projection standing in for the ICR model.
+    weight = np.random.default_rng(0).normal(size=(128, 38)).astype(np.float32)
+    graph = helper.make_graph(
+        [
+            helper.make_node("Reshape", ["x", "shape"], ["rows"]),
+            helper.make_node("MatMul", ["rows", "w"], ["y"]),
+        ],
+        "tiny_icr",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, ["N", 1, 32, 128])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, ["N", 32, 38])],
+        initializer=[
+            numpy_helper.from_array(np.array([-1, 32, 128], dtype=np.int64), "shape"),
+            numpy_helper.from_array(weight, "w"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def _write_crop_set(crops_dir):
+    crops_dir.mkdir()
+    with open(crops_dir / "labels.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["file", "label"])
+        for i, label in enumerate(["AB12", "TRUCK-7", "42"]):
+            Image.fromarray(np.full((40, 160, 3), 60 * i, dtype=np.uint8)).save(crops_dir / f"{i}.png")
+            writer.writerow([f"{i}.png", label])
+    return str(crops_dir)
+
+
+def test_character_error_rate():
+    assert model_tools.character_error_rate(["ABC", "12"], ["ABC", "12"]) == 0.0
+    assert model_tools.character_error_rate(["ABCD"], ["ABXD"]) == pytest.approx(0.25)
+    assert model_tools.character_error_rate(["AB"], [""]) == 1.0
+
+
+def test_quantize_and_compare(tmp_path, monkeypatch):
+    from modular_analyzer import onnx_sessions
+    monkeypatch.setattr(onnx_sessions, "CACHE_DIR", str(tmp_path / "cache"))
+    model_path = _write_ocr_model(tmp_path / "handwriting_ocr.onnx")
+    crops_dir = _write_crop_set(tmp_path / "crops")
+
+    int8_path = model_tools.quantize_model(model_path, mode="dynamic")
+    assert int8_path.endswith("handwriting_ocr.int8_dynamic.onnx")
+
+    rows = model_tools.compare_models([model_path, int8_path], crops_dir, batch_size=2)
+    assert [r["model"] for r in rows] == ["handwriting_ocr.onnx", "handwriting_ocr.int8_dynamic.onnx"]
+    for row in rows:
+        assert row["latency_ms"] > 0 and row["throughput"] > 0
+        assert 0.0 <= row["cer"]
+
+
+def test_variant_names_round_trip():
+    from modular_analyzer.onnx_sessions import base_model_name, variant_file_name
+    name = variant_file_name("handwriting_ocr.onnx", "int8_static")
+    assert name == "handwriting_ocr.int8_static.onnx"
+    assert base_model_name(name) == "handwriting_ocr.onnx"
+    assert variant_file_name("handwriting_ocr.onnx", "fp32") == "handwriting_ocr.onnx"
@@ -0,0 +1,61 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+onnx = pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+onnx_sessions = pytest.importorskip('modular_analyzer.onnx_sessions')
+
+from onnx import TensorProto, helper
+
+
+def _write_model(path):
+    graph = helper.make_graph(
+        [helper.make_node("Relu", ["x"], ["relu"]), helper.make_node("Add", ["relu", "relu"], ["y"])],
+        "double_relu",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, ["N", 4])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, ["N", 4])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return str(path)
+
+
+PROFILE = {
+    "intra_op_threads": 1,
+    "inter_op_threads": 1,
+    "execution_mode": "sequential",
+    "graph_optimization_level": "all",
+    "io_binding": True,
+}
+
+
+def test_optimized_graph_is_cached_and_reused(tmp_path, monkeypatch):
+    model_path = _write_model(tmp_path / "tiny.onnx")
+    monkeypatch.setattr(onnx_sessions, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(onnx_sessions, "PROFILES", {"default": PROFILE})
+
+    cached = onnx_sessions.optimized_model_path(model_path, PROFILE)
+    onnx_sessions.prepare_session_cache([model_path])
+    assert (tmp_path / "cache").exists() and cached.endswith(".onnx")
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == [cached.split("/")[-1]]
+
+    session = onnx_sessions.create_session(model_path, providers=["CPUExecutionProvider"])
+    assert session.session._model_path == cached
+
+
+def test_io_binding_runner_reuses_output_buffers(tmp_path, monkeypatch):
+    model_path = _write_model(tmp_path / "tiny.onnx")
+    monkeypatch.setattr(onnx_sessions, "PROFILES", {"default": dict(PROFILE, cache_optimized=False)})
+    runner = onnx_sessions.create_session(model_path, providers=["CPUExecutionProvider"])
+
+    x = np.array([[-1, 1, 2, -3]], dtype=np.float32)
+    first = runner.run(None, {"x": x})[0]
+    assert np.array_equal(first, [[0, 2, 4, 0]])
+    second = runner.run(None, {"x": x * 2})[0]
+    assert np.array_equal(second, [[0, 4, 8, 0]])
+    third = runner.run(None, {"x": x})[0]
+
+    assert np.array_equal(third, [[0, 2, 4, 0]])
+    assert second is third  # bound buffer reused for the same input shape
+    assert runner.get_inputs()[0].name == "x"
@@ -0,0 +1,61 @@
+import pytest
+
+orientation = pytest.importorskip('modular_analyzer.orientation')
+
+
+class FakeImage:
+    size = (100, 50)
+    width, height = size
+
+    def resize(self, size):
+        small = FakeImage()
+        small.size = size
+        return small
+
+
+def test_detect_rotations_batches_doctr(monkeypatch):
+    calls = []
+
+    def fake_angle_model(images):
+        calls.append(len(images))
+        return [0.0, 88.0, 181.0]
+
+    monkeypatch.setattr(orientation, "get_model", lambda name: fake_angle_model)
+    rotations = orientation.detect_rotations([FakeImage()] * 3, method="doctr")
+
+    assert calls == [3]
+    assert rotations == [0, 90, 180]
+
+
+def test_detect_rotations_tesseract_downscales(monkeypatch):
+    seen = []
+
+    def fake_osd(img):
+        seen.append(img.size)
+        return "Page number: 0\nRotate: 270\n"
+
+    monkeypatch.setattr(orientation.pytesseract, "image_to_osd", fake_osd, raising=False)
+    monkeypatch.setattr(orientation, "OSD_MAX_SIDE", 50)
+
+    assert orientation.detect_rotations([FakeImage()], method="tesseract") == [270]
+    assert seen == [(50, 25)]
+
+
+def test_plan_document_orientation_rechecks_only_outliers(monkeypatch, tmp_path):
+    fitz = pytest.importorskip("fitz")
+    pdf_path = tmp_path / "batch.pdf"
+    doc = fitz.open()
+    for _ in range(6):
+        doc.new_page(width=612, height=792)
+    doc.new_page(width=792, height=612)  # landscape outlier
+    rotated = doc.new_page(width=612, height=792)
+    rotated.set_rotation(90)
+    doc.save(str(pdf_path))
+    doc.close()
+
+    monkeypatch.setattr(orientation, "detect_rotations", lambda images, method, page_nums: [180] * len(images))
+    plan = orientation.plan_document_orientation(str(pdf_path), method="tesseract", sample_pages=3)
+
+    assert plan[:6] == [180] * 6
+    assert plan[6] is None
+    assert plan[7] == 0
@@ -0,0 +1,60 @@
+import json
+
+from modular_analyzer.page_journal import PageJournal, journal_path, load_journal
+
+
+def _result(page_idx):
+    return {"entry": {"Page": page_idx + 1}, "ticket_issue": "", "thumbnails": [],
+            "timing": {"Page": page_idx + 1, "DurationSeconds": 0.1}, "issue_log": [], "model_loads": {"doctr": 1}}
+
+
+def test_journal_is_written_per_page_and_resumed(tmp_path):
+    path = journal_path(str(tmp_path))
+    with PageJournal(path, "a.pdf", 3, "fp") as journal:
+        journal.append(2, _result(2))
+        journal.append(0, _result(0))
+        # Already on disk before the run ends.
+        assert len(open(path, encoding="utf-8").read().splitlines()) == 3
+
+    resumed = PageJournal(path, "a.pdf", 3, "fp", resume=True)
+    assert sorted(resumed.pages) == [0, 2]
+    resumed.append(1, _result(1))
+    resumed.close()
+
+    results = PageJournal(path, "a.pdf", 3, "fp", resume=True).results()
+    assert [r["entry"]["Page"] for r in results] == [1, 2, 3]
+    assert "model_loads" not in results[0]
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = journal_path(str(tmp_path))
+    with PageJournal(path, "a.pdf", 2, "fp") as journal:
+        journal.append(0, _result(0))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"page_idx": 1, "result": _result(1)})[:20])
+
+    assert list(load_journal(path, "a.pdf", 2, "fp")) == [0]
+    with PageJournal(path, "a.pdf", 2, "fp", resume=True):
+        pass
+    assert all(json.loads(line) for line in open(path, encoding="utf-8"))
+
+
+def test_journal_from_other_run_is_not_resumed(tmp_path):
+    path = journal_path(str(tmp_path))
+    with PageJournal(path, "a.pdf", 2, "fp") as journal:
+        journal.append(0, _result(0))
+
+    assert load_journal(path, "a.pdf", 2, "other-config") == {}
+    assert load_journal(path, "b.pdf", 2, "fp") == {}
+    assert PageJournal(path, "a.pdf", 2, "fp").pages == {}  # no --resume: start over
+
+
+def test_failed_pages_are_retried_on_resume(tmp_path):
+    path = journal_path(str(tmp_path))
+    failed = dict(_result(1), ticket_issue="PAGE_ERROR")
+    with PageJournal(path, "a.pdf", 3, "fp") as journal:
+        journal.append(0, _result(0))
+        journal.append(1, failed)
+        assert sorted(journal.pages) == [0, 1]  # still reported by this run
+
+    assert sorted(load_journal(path, "a.pdf", 3, "fp")) == [0]
@@ -26,3 +26,85 @@ def test_convert_pdf_to_images_closes_file(tmp_path):
     convert_pdf_to_images(str(pdf_path))
 
     assert str(pdf_path) not in _open_targets()
+
+
+def test_render_page_reuses_and_releases_handle(tmp_path):
+    from modular_analyzer.pdf_utils import render_page, close_cached_document, get_page_count
+
+    pdf_path = tmp_path / "two_pages.pdf"
+    doc = fitz.open()
+    doc.new_page(width=200, height=100)
+    doc.new_page(width=100, height=200)
+    doc.save(str(pdf_path))
+    doc.close()
+
+    assert get_page_count(str(pdf_path)) == 2
+    assert render_page(str(pdf_path), 0).size == (200, 100)
+    assert render_page(str(pdf_path), 1).size == (100, 200)
+
+    close_cached_document()
+    assert str(pdf_path) not in _open_targets()
+
+
+def _square(x):
+    return {"value": x * x}
+
+
+def _inherited_handle(x):
+    from modular_analyzer import pdf_utils
+    return {"value": pdf_utils._open_doc["doc"] is not None}
+
+
+def test_workers_do_not_inherit_the_parent_document(tmp_path):
+    from modular_analyzer.pdf_utils import imap_pages, render_page
+
+    pdf_path = tmp_path / "sample.pdf"
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(str(pdf_path))
+    doc.close()
+
+    render_page(str(pdf_path), 0)  # e.g. orientation sampling in the parent
+    results = list(imap_pages(range(4), _inherited_handle))
+    assert [r["value"] for r in results] == [False] * 4
+
+
+def test_imap_pages_keeps_task_order():
+    from modular_analyzer.pdf_utils import imap_pages
+
+    results = list(imap_pages(iter(range(10)), _square))
+    assert [r["value"] for r in results] == [x * x for x in range(10)]
+
+
+def test_imap_pages_with_budget_and_tuner_keeps_task_order():
+    from modular_analyzer.cpu_budget import ThroughputTuner
+    from modular_analyzer.pdf_utils import imap_pages
+    from modular_analyzer.types import CpuBudget
+
+    budget = CpuBudget(cores=2, workers=2, threads=1)
+    tuner = ThroughputTuner(budget, tune_pages=2)
+    results = list(imap_pages(iter(range(12)), _square, budget=budget, tuner=tuner))
+    assert [r["value"] for r in results] == [x * x for x in range(12)]
+    assert not tuner.tuning
+
+
+def test_render_clips_uses_per_clip_dpi(tmp_path):
+    from modular_analyzer.pdf_utils import render_clips, close_cached_document
+
+    pdf_path = tmp_path / "letter.pdf"
+    doc = fitz.open()
+    doc.new_page(width=612, height=792)
+    doc.save(str(pdf_path))
+    doc.close()
+
+    clips = {
+        "low": ((1.0, 1.0, 2.0, 1.5), 72),
+        "high": ((1.0, 1.0, 2.0, 1.5), 300),
+        "outside": ((20.0, 20.0, 21.0, 21.0), 300),
+    }
+    images = render_clips(str(pdf_path), 0, clips)
+    close_cached_document()
+
+    assert images["low"].size == (72, 36)
+    assert images["high"].size == (300, 150)
+    assert "outside" not in images
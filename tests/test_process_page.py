@@ -38,8 +38,11 @@ from modular_analyzer.types import PageTask
 def test_process_page_runs(monkeypatch, tmp_path):
     monkeypatch.setitem(sys.modules, "numpy", types.ModuleType("numpy"))
     import modular_analyzer.page_processor as pp
-    monkeypatch.setattr(pp, "initialize_reader", lambda backend="doctr": object())
+    import modular_analyzer.engines as engines
+    loaded = []
+    monkeypatch.setattr(engines, "get_model", lambda name: loaded.append(name) or object())
 
     task = PageTask(page_idx=0, img=object(), fields={}, output_dir=str(tmp_path), vendor="v", date="d")
     result = pp.process_page(task)
     assert result["issue_log"] == []
+    assert loaded == []  # no fields, so no engine loads a model
@@ -0,0 +1,59 @@
+import pytest
+
+ocr_utils = pytest.importorskip('modular_analyzer.ocr_utils')
+np = pytest.importorskip('numpy')
+
+from types import SimpleNamespace
+
+
+def _page(*words):
+    word_objs = [SimpleNamespace(value=w, confidence=c) for w, c in words]
+    line = SimpleNamespace(words=word_objs)
+    return SimpleNamespace(blocks=[SimpleNamespace(lines=[line])])
+
+
+class FakePredictor:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, pages):
+        self.calls.append(len(pages))
+        return SimpleNamespace(pages=[_page((f"w{int(p[0, 0, 0])}", 0.5)) for p in pages])
+
+
+def test_read_text_batch_maps_results_to_keys(monkeypatch):
+    predictor = FakePredictor()
+    monkeypatch.setattr(ocr_utils, "get_model", lambda name: predictor)
+    images = {f"field{i}": np.full((4, 4, 3), i, dtype=np.uint8) for i in range(5)}
+
+    results = ocr_utils.read_text_batch(images, batch_size=2)
+
+    assert predictor.calls == [2, 2, 1]
+    assert results == {f"field{i}": (f"w{i}", 0.5) for i in range(5)}
+
+
+def test_read_text_batch_empty_page_gives_empty_text(monkeypatch):
+    monkeypatch.setattr(ocr_utils, "get_model", lambda name: lambda pages: SimpleNamespace(pages=[_page()]))
+    results = ocr_utils.read_text_batch({"ticket": np.zeros((4, 4, 3), dtype=np.uint8)})
+    assert results == {"ticket": ("", 0.0)}
+
+
+def test_read_text_batch_rejects_empty_crop():
+    with pytest.raises(ValueError):
+        ocr_utils.read_text_batch({"ticket": np.zeros((0, 0, 3), dtype=np.uint8)})
+
+
+def test_read_text_batch_recognition_only(monkeypatch):
+    calls = []
+
+    def fake_reco(crops):
+        calls.append(len(crops))
+        return [(f" t{int(c[0, 0, 0])} ", 0.8) for c in crops]
+
+    monkeypatch.setattr(ocr_utils, "get_model", lambda name: fake_reco if name == "doctr_reco" else None)
+    images = {"a": np.full((4, 4), 1, dtype=np.uint8), "b": np.full((4, 4, 3), 2, dtype=np.uint8)}
+
+    results = ocr_utils.read_text_batch(images, backend="doctr_reco")
+
+    assert calls == [2]
+    assert results == {"a": ("t1", 0.8), "b": ("t2", 0.8)}
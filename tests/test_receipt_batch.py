@@ -0,0 +1,126 @@
+from receipt_processing import main as receipt_main
+from receipt_processing.log_store import ReceiptLogStore
+
+
+class FakePredictor:
+    """Stands in for the doctr predictor: each "page" is the text it contains."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, pages):
+        self.calls.append(list(pages))
+        return self
+
+    def export(self):
+        pages = self.calls[-1]
+        return {"pages": [{"blocks": [{"lines": [{"words": [{"value": line}]} for line in page]}]}
+                          for page in pages]}
+
+
+def _setup(monkeypatch, tmp_path, pages_per_call=16):
+    predictor = FakePredictor()
+    builds = []
+
+    def get_model():
+        builds.append(1)
+        return predictor
+
+    def load_pages(filepath):
+        if filepath.stem == "broken":
+            raise ValueError("cannot decode")
+        return [line.split("|") for line in filepath.read_text().split("\n---\n")]
+
+    monkeypatch.setattr(receipt_main, "_get_ocr_model", get_model)
+    monkeypatch.setattr(receipt_main, "load_pages", load_pages)
+    monkeypatch.setattr(receipt_main, "PAGES_PER_CALL", pages_per_call)
+    monkeypatch.setattr(receipt_main, "INPUT_DIR", tmp_path / "input")
+    monkeypatch.setattr(receipt_main, "OUTPUT_DIR", tmp_path / "processed")
+    monkeypatch.setattr(receipt_main, "LOG_FILE", tmp_path / "log.xlsx")
+    monkeypatch.setattr(receipt_main, "LOG_DB", tmp_path / "log.sqlite")
+    (tmp_path / "input").mkdir()
+    return predictor, builds
+
+
+def test_pages_of_several_files_share_predictor_calls(monkeypatch, tmp_path):
+    predictor, _ = _setup(monkeypatch, tmp_path, pages_per_call=3)
+    files = []
+    for name, text in [("a.pdf", "Shell|Total 10.00\n---\npage two"), ("b.jpg", "Subway|Total 5"),
+                       ("broken.png", ""), ("c.jpg", "Lowes|Total 7")]:
+        path = tmp_path / "input" / name
+        path.write_text(text)
+        files.append(path)
+
+    results = receipt_main.extract_text_batch(files)
+
+    assert [len(call) for call in predictor.calls] == [3, 1]
+    assert results[0] == ["Shell", "Total 10.00", "page two"]
+    assert results[1] == ["Subway", "Total 5"]
+    assert isinstance(results[2], ValueError)
+    assert results[3] == ["Lowes", "Total 7"]
+
+
+def test_run_batch_logs_in_file_order_then_moves(monkeypatch, tmp_path):
+    predictor, builds = _setup(monkeypatch, tmp_path)
+    for name, text in [("c.jpg", "Subway|Total 5"), ("a.jpg", "Shell|Total 10.00"),
+                       ("broken.png", ""), ("b.jpg", "Lowes|Total 7")]:
+        (tmp_path / "input" / name).write_text(text)
+    # A receipt with the same name was filed by an earlier run.
+    (tmp_path / "processed" / "fuel").mkdir(parents=True)
+    (tmp_path / "processed" / "fuel" / "a.jpg").write_text("earlier")
+
+    receipt_main.run_batch(workers=1)
+
+    assert len(builds) == 1
+    assert predictor.calls == [[["Shell", "Total 10.00"], ["Lowes", "Total 7"], ["Subway", "Total 5"]]]
+    store = ReceiptLogStore(tmp_path / "log.sqlite")
+    assert [(r["filename"], r["category"]) for r in store.query()] == [
+        ("a.jpg", "fuel"), ("b.jpg", "supplies"), ("c.jpg", "meals")
+    ]
+    store.close()
+    assert sorted(p.name for p in (tmp_path / "input").iterdir()) == ["broken.png"]
+    assert (tmp_path / "processed" / "fuel" / "a.jpg").read_text() == "earlier"
+    assert (tmp_path / "processed" / "fuel" / "a_1.jpg").read_text() == "Shell|Total 10.00"
+    assert (tmp_path / "processed" / "meals" / "c.jpg").exists()
+
+
+def test_field_errors_are_reported_per_file(monkeypatch, tmp_path):
+    _, builds = _setup(monkeypatch, tmp_path)
+    real_extract_fields = receipt_main.extract_fields
+
+    def extract_fields(lines, category_map):
+        if lines and lines[0] == "Odd":
+            raise IndexError("bad layout")
+        return real_extract_fields(lines, category_map)
+
+    monkeypatch.setattr(receipt_main, "extract_fields", extract_fields)
+    files = []
+    for name, text in [("a.jpg", "Odd|Total 1"), ("b.jpg", "Shell|Total 10.00")]:
+        (tmp_path / "input" / name).write_text(text)
+        files.append(tmp_path / "input" / name)
+
+    results = receipt_main.analyze_receipts(files, workers=1)
+    assert [(path.name, error) for path, _, error in results] == [("a.jpg", "bad layout"), ("b.jpg", None)]
+    assert results[1][1].vendor == "Shell"
+
+    builds.clear()
+    (tmp_path / "input" / "broken.png").write_text("")
+    assert isinstance(receipt_main.extract_text_batch([tmp_path / "input" / "broken.png"])[0], ValueError)
+    assert builds == []  # nothing decoded, so no model is loaded
+
+
+def test_ocr_model_is_built_once_per_process(monkeypatch):
+    import sys
+    import types
+
+    builds = []
+    models = types.ModuleType("doctr.models")
+    models.ocr_predictor = lambda **kwargs: builds.append(kwargs) or object()
+    monkeypatch.setitem(sys.modules, "doctr", types.ModuleType("doctr"))
+    monkeypatch.setitem(sys.modules, "doctr.models", models)
+    receipt_main._get_ocr_model.cache_clear()
+    try:
+        assert receipt_main._get_ocr_model() is receipt_main._get_ocr_model()
+        assert len(builds) == 1
+    finally:
+        receipt_main._get_ocr_model.cache_clear()
@@ -0,0 +1,52 @@
+from datetime import date
+
+import pytest
+
+from receipt_processing.log_store import ReceiptLogStore, normalize_date
+
+
+def _record(name, receipt_date, processed="2024-03-01T10:00:00"):
+    return {"filename": name, "vendor": "Shell", "date": receipt_date, "total": "45.67",
+            "category": "fuel", "processed_time": processed}
+
+
+def test_normalize_date():
+    assert normalize_date("01/02/2024") == "2024-01-02"
+    assert normalize_date("1-2-24") == "2024-01-02"
+    assert normalize_date("13/40/2024") is None
+    assert normalize_date("") is None
+
+
+def test_batches_append_and_filter_by_date(tmp_path):
+    store = ReceiptLogStore(tmp_path / "log.sqlite")
+    assert store.append([_record("a.jpg", "01/02/2024"), _record("b.jpg", "")]) == 2
+    store.append([_record("c.jpg", "02/15/2024", processed="2024-03-02T23:59:00")])
+
+    assert [r["filename"] for r in store.query()] == ["a.jpg", "b.jpg", "c.jpg"]
+    assert [r["filename"] for r in store.query(start=date(2024, 2, 1))] == ["c.jpg"]
+    assert [r["filename"] for r in store.query(end=date(2024, 1, 31))] == ["a.jpg"]
+    assert [r["filename"] for r in store.query(date(2024, 3, 2), date(2024, 3, 2), by="processed")] == ["c.jpg"]
+    store.close()
+
+    reopened = ReceiptLogStore(tmp_path / "log.sqlite")
+    assert len(reopened) == 3
+    reopened.close()
+
+
+def test_export_and_import_excel(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl.utils")
+    if not hasattr(pd, "read_excel"):
+        pytest.skip("pandas is stubbed by another test module")
+
+    store = ReceiptLogStore(tmp_path / "log.sqlite")
+    store.append([_record("a.jpg", "01/02/2024"), _record("c.jpg", "02/15/2024")])
+    assert store.export_excel(tmp_path / "jan.xlsx", end=date(2024, 1, 31)) == 1
+    assert pd.read_excel(tmp_path / "jan.xlsx", dtype=str)["filename"].tolist() == ["a.jpg"]
+
+    migrated = ReceiptLogStore(tmp_path / "migrated.sqlite")
+    assert store.export_excel(tmp_path / "all.xlsx") == 2
+    assert migrated.import_excel(tmp_path / "all.xlsx") == 2
+    assert migrated.query() == store.query()
+    store.close()
+    migrated.close()
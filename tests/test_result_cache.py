@@ -0,0 +1,136 @@
+import pytest
+
+pytest.importorskip('yaml')
+fitz = pytest.importorskip('fitz')
+
+from modular_analyzer.result_cache import PageResultCache, is_cacheable, page_cache_key
+from modular_analyzer.types import PageTask
+
+
+def _result(page, issue_type=None, thumbnails=()):
+    issues = [{"Page": page, "IssueType": issue_type}] if issue_type else []
+    return {"entry": {"Page": page}, "issue_log": issues, "thumbnails": list(thumbnails),
+            "ticket_issue": None, "timing": {"Page": page}, "model_loads": {"ocr": 1}}
+
+
+def _square_page(x):
+    return {"value": x * x}
+
+
+def test_put_and_get_many_roundtrip(tmp_path):
+    cache = PageResultCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    cache.put("a", _result(1))
+    cache.put("b", _result(2, issue_type="OCR_ERROR"))
+
+    found = cache.get_many(["a", "b", "c"])
+    assert list(found) == ["a"]
+    assert found["a"]["entry"] == {"Page": 1}
+    assert found["a"]["model_loads"] == {}
+    cache.close()
+
+
+def test_results_with_missing_thumbnails_are_not_reused(tmp_path):
+    thumb = tmp_path / "thumb.png"
+    thumb.write_bytes(b"png")
+    cache = PageResultCache(str(tmp_path / "cache.sqlite"))
+    cache.put("a", _result(1, thumbnails=[{"ThumbnailPath": str(thumb)}]))
+    assert "a" in cache.get_many(["a"])
+
+    thumb.unlink()
+    assert cache.get_many(["a"]) == {}
+    cache.close()
+
+
+def test_evict_drops_least_recently_used(tmp_path):
+    cache = PageResultCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, _result(1))
+    cache.get_many(["a"])
+
+    assert cache.evict() == 1
+    assert len(cache) == 2
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    cache.close()
+
+
+def test_is_cacheable():
+    assert is_cacheable(_result(1, issue_type="LOW_CONFIDENCE"))
+    assert not is_cacheable(_result(1, issue_type="HANDWRITING_ERROR"))
+    assert not is_cacheable(None)
+
+
+def test_page_cache_key_follows_page_content(tmp_path):
+    from modular_analyzer.pdf_utils import close_cached_document
+
+    def make_pdf(name, text):
+        path = tmp_path / name
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((72, 72), "header")
+        doc.new_page().insert_text((72, 72), text)
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+
+    first, second = make_pdf("a.pdf", "one"), make_pdf("b.pdf", "two")
+
+    def key(path, idx):
+        task = PageTask(page_idx=idx, img=None, fields={}, output_dir=str(tmp_path), vendor="v",
+                        date="20250101", pdf_path=path)
+        return page_cache_key(task, "fp")
+
+    try:
+        assert key(first, 0) == key(second, 0)
+        assert key(first, 1) != key(second, 1)
+        assert key(first, 0) != key(first, 1)
+    finally:
+        close_cached_document()
+
+
+def test_imap_pages_serves_hits_and_keeps_order(tmp_path):
+    from modular_analyzer.pdf_utils import imap_pages
+
+    cache = PageResultCache(str(tmp_path / "cache.sqlite"))
+    cache.put("k3", {"value": -1, "issue_log": []})
+
+    results = list(imap_pages(iter(range(6)), _square_page, cache=cache, cache_key=lambda x: f"k{x}"))
+    assert [r["value"] for r in results] == [0, 1, 4, -1, 16, 25]
+    assert len(cache) == 6
+
+    again = list(imap_pages(iter(range(6)), _square_page, cache=cache, cache_key=lambda x: f"k{x}"))
+    assert [r["value"] for r in again] == [0, 1, 4, -1, 16, 25]
+    cache.close()
+
+
+def test_cache_hits_are_tagged_for_the_requesting_task(tmp_path):
+    from modular_analyzer.pdf_utils import imap_pages
+
+    cache = PageResultCache(str(tmp_path / "cache.sqlite"))
+    cache.put("k", dict(_result(1), pdf_path="old/a.pdf", page_idx=0))
+    task = PageTask(page_idx=0, img=None, fields={}, output_dir=str(tmp_path), vendor="v",
+                    date="20250101", pdf_path="new/a.pdf")
+
+    (hit,) = imap_pages([task], None, cache=cache, cache_key=lambda t: "k")
+    assert (hit["pdf_path"], hit["page_idx"]) == ("new/a.pdf", 0)
+    assert "pdf_path" not in cache.get_many(["k"])["k"]
+    cache.close()
+
+
+def test_cache_keys_leave_no_document_open_in_the_parent(tmp_path):
+    from modular_analyzer import pdf_utils
+
+    pdf_path = tmp_path / "a.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "one")
+    doc.save(str(pdf_path))
+    doc.close()
+    task = PageTask(page_idx=0, img=None, fields={}, output_dir=str(tmp_path), vendor="v",
+                    date="20250101", pdf_path=str(pdf_path))
+    key = page_cache_key(task, "fp")
+    pdf_utils.close_cached_document()
+
+    cache = PageResultCache(str(tmp_path / "cache.sqlite"))
+    cache.put(key, _result(1))
+    assert len(list(pdf_utils.imap_pages([task], None, cache=cache, cache_key=lambda t: page_cache_key(t, "fp")))) == 1
+    assert pdf_utils._open_doc["doc"] is None
+    cache.close()
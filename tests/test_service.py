@@ -0,0 +1,101 @@
+import json
+import threading
+import urllib.error
+
+import pytest
+
+fitz = pytest.importorskip('fitz')
+pytest.importorskip('numpy')
+pytest.importorskip('yaml')
+service = pytest.importorskip('modular_analyzer.service')
+
+from modular_analyzer.types import CpuBudget
+
+VENDOR_YAML = """
+ticket_format:
+  ticket_number:
+    position_inches: [0.5, 0.5]
+    size_inches: [2.0, 0.4]
+"""
+
+
+def _fake_page(task):
+    if "Broken" in task.pdf_path and task.page_idx == 1:
+        raise RuntimeError("corrupt page")
+    fields = sorted(task.plan) if task.plan else None
+    return {"entry": {"Page": task.page_idx + 1, "Fields": fields}, "ticket_issue": "", "thumbnails": [],
+            "timing": {"Page": task.page_idx + 1, "DurationSeconds": 0.0}, "issue_log": [], "model_loads": {}}
+
+
+def _no_models(*args, **kwargs):
+    pass
+
+
+@pytest.fixture
+def running_service(tmp_path, monkeypatch):
+    configs = tmp_path / "configs"
+    configs.mkdir()
+    (configs / "Acme.yaml").write_text(VENDOR_YAML)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("modular_analyzer.page_processor.process_page", _fake_page)
+    monkeypatch.setattr(service, "init_page_worker", _no_models)
+    monkeypatch.setattr(service, "prepare_onnx_models", lambda names: None)
+    monkeypatch.setattr(service, "PAGE_CACHE_ENABLED", False)
+    monkeypatch.setattr("modular_analyzer.batch_runner.plan_document_orientation", lambda pdf, **kw: [0] * 4)
+
+    svc = service.AnalysisService(str(configs), str(tmp_path / "out"), budget=CpuBudget(cores=1, workers=1, threads=1))
+    svc.start()
+    server = service.make_server(svc, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_port
+    server.shutdown()
+    server.server_close()
+    svc.stop()
+
+
+def test_job_streams_pages_in_order(running_service, tmp_path):
+    pdf_path = tmp_path / "Acme_0412.pdf"
+    doc = fitz.open()
+    for _ in range(3):
+        doc.new_page()
+    doc.save(str(pdf_path))
+    doc.close()
+
+    events = list(service.submit_job(str(pdf_path), port=running_service, write=False))
+    assert [e["event"] for e in events] == ["job", "page", "page", "page", "done"]
+    assert events[0]["vendor"] == "Acme"
+    assert [e["page"] for e in events[1:4]] == [1, 2, 3]
+    assert events[1]["result"]["entry"]["Fields"] is None
+
+    subset = list(service.submit_job(str(pdf_path), vendor="Acme", fields=["ticket_number"],
+                                     port=running_service, write=False))
+    assert subset[1]["result"]["entry"]["Fields"] == ["ticket_format.ticket_number"]
+
+
+def test_failed_page_is_reported_and_job_finishes(running_service, tmp_path):
+    pdf_path = tmp_path / "Acme_Broken.pdf"
+    doc = fitz.open()
+    for _ in range(3):
+        doc.new_page()
+    doc.save(str(pdf_path))
+    doc.close()
+
+    events = list(service.submit_job(str(pdf_path), port=running_service, write=False))
+    assert [e["event"] for e in events] == ["job", "page", "page", "page", "done"]
+    assert [e.get("error") for e in events[1:4]] == [None, "corrupt page", None]
+    assert events[2]["result"]["ticket_issue"] == "PAGE_ERROR"
+
+
+def test_invalid_job_is_rejected(running_service, tmp_path):
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        list(service.submit_job(str(tmp_path / "missing.pdf"), port=running_service))
+    assert excinfo.value.code == 400
+
+
+def test_unreadable_pdf_gets_a_json_error(running_service, tmp_path):
+    pdf_path = tmp_path / "Acme_corrupt.pdf"
+    pdf_path.write_bytes(b"not a pdf")
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        list(service.submit_job(str(pdf_path), port=running_service))
+    assert excinfo.value.code == 500
+    assert "error" in json.loads(excinfo.value.read())
@@ -0,0 +1,54 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+template_engine = pytest.importorskip('modular_analyzer.template_engine')
+
+
+def _pattern(h, w, seed):
+    rng = np.random.default_rng(seed)
+    return cv2.GaussianBlur((rng.random((h, w)) * 255).astype(np.uint8), (5, 5), 0)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    template_engine.clear_template_cache()
+    yield
+    template_engine.clear_template_cache()
+
+
+def test_pyramid_match_finds_template_at_full_resolution():
+    template = _pattern(60, 120, seed=1)
+    image = _pattern(300, 500, seed=2)
+    image[130:190, 217:337] = template
+
+    score, loc = template_engine.match_pyramid(image, template_engine.build_pyramid(template))
+
+    assert score > 0.99
+    assert loc == (217, 130)
+
+
+def test_template_larger_than_crop_is_no_match():
+    pyramid = template_engine.build_pyramid(_pattern(80, 80, seed=3))
+    assert template_engine.match_pyramid(_pattern(40, 200, seed=4), pyramid) == (-1.0, None)
+
+
+def test_vendor_templates_are_loaded_once(tmp_path, monkeypatch):
+    vendor_dir = tmp_path / "Acme"
+    vendor_dir.mkdir()
+    stamp, logo = _pattern(40, 90, seed=5), _pattern(40, 90, seed=6)
+    cv2.imwrite(str(vendor_dir / "a_stamp.png"), stamp)
+    cv2.imwrite(str(vendor_dir / "b_logo.png"), logo)
+    monkeypatch.setattr(template_engine, "TEMPLATE_DIR", str(tmp_path))
+
+    reads = []
+    real_imread = cv2.imread
+    monkeypatch.setattr(template_engine.cv2, "imread", lambda *a: reads.append(a[0]) or real_imread(*a))
+
+    crop = _pattern(120, 300, seed=7)
+    crop[50:90, 150:240] = logo
+    for _ in range(3):
+        matched, path, score, loc = template_engine.match_vendor_templates(crop, "acme")
+
+    assert matched and path.endswith("b_logo.png") and loc == (150, 50)
+    assert sorted(reads) == [str(vendor_dir / "a_stamp.png"), str(vendor_dir / "b_logo.png")]
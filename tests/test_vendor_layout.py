@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('yaml')
+vendor_layout = pytest.importorskip('modular_analyzer.vendor_layout')
+
+from modular_analyzer.image_utils import sanitize_box
+
+YAML = """
+ticket_format:
+  ticket_number:
+    position_inches: [5.5, 0.5]
+    size_inches: [2.0, 0.4]
+  date:
+    box: [150, 300, 600, 390]
+  notes:
+    export_to_excel: false
+  broken:
+    position_inches: [1.0]
+    size_inches: [1.0, 1.0]
+"""
+
+
+@pytest.fixture
+def yaml_path(tmp_path):
+    path = tmp_path / "Acme.yaml"
+    path.write_text(YAML)
+    return str(path)
+
+
+def test_box_tables_match_per_field_geometry(yaml_path, tmp_path):
+    layout = vendor_layout.load_vendor_layout("Acme", yaml_path, cache_dir=str(tmp_path / "cache"))
+    names = list(layout.fields)
+    boxes, has_box = vendor_layout.field_pixel_boxes(layout, names, 200)
+
+    assert has_box.tolist() == [True, True, False, False]
+    # ticket_number from position/size in inches; date from a raw box stored at box_dpi (300).
+    assert boxes[:2].tolist() == [[1100, 100, 1500, 180], [100, 200, 400, 260]]
+
+    clamped, valid = vendor_layout.clamp_boxes(
+        np.array([[-10, 5, 50, 60], [100, 0, 300, 50], [150, 10, 180, 20]]), 100, 100
+    )
+    assert valid.tolist() == [True, False, False]
+    assert tuple(clamped[0]) == sanitize_box((-10, 5, 50, 60), 100, 100)
+
+
+def test_layout_cache_keyed_by_mtime_and_hash(yaml_path, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    compiled = []
+    real_compile = vendor_layout.compile_vendor_layout
+    monkeypatch.setattr(vendor_layout, "compile_vendor_layout",
+                        lambda *a: compiled.append(a[0]) or real_compile(*a))
+
+    vendor_layout.load_vendor_layout("Acme", yaml_path, cache_dir=cache_dir)
+    vendor_layout.load_vendor_layout("Acme", yaml_path, cache_dir=cache_dir)
+    stat = os.stat(yaml_path)
+    os.utime(yaml_path, (stat.st_atime, stat.st_mtime + 10))  # touched, same content
+    vendor_layout.load_vendor_layout("Acme", yaml_path, cache_dir=cache_dir)
+    assert compiled == ["Acme"]
+
+    with open(yaml_path, "a") as f:
+        f.write("  truck_number:\n    position_inches: [1, 1]\n    size_inches: [1, 1]\n")
+    os.utime(yaml_path, (stat.st_atime, stat.st_mtime + 20))
+    layout = vendor_layout.load_vendor_layout("Acme", yaml_path, cache_dir=cache_dir)
+    assert compiled == ["Acme", "Acme"]
+    assert "ticket_format.truck_number" in layout.names
+
+
+def test_cached_layout_picks_up_templates_added_later(yaml_path, tmp_path, monkeypatch):
+    from modular_analyzer import template_engine
+
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    monkeypatch.setattr(template_engine, "TEMPLATE_DIR", str(templates))
+    monkeypatch.setattr(template_engine, "VENDOR_TEMPLATES", {})
+    monkeypatch.setattr(template_engine, "DEFAULT_TEMPLATES", ["ticket_template.jpg"])
+    cache_dir = str(tmp_path / "cache")
+
+    assert vendor_layout.load_vendor_layout("Acme", yaml_path, cache_dir=cache_dir).template_paths == []
+    (templates / "ticket_template.jpg").write_bytes(b"jpg")
+    layout = vendor_layout.load_vendor_layout("Acme", yaml_path, cache_dir=cache_dir)
+    assert layout.template_paths == [str(templates / "ticket_template.jpg")]